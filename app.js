@@ -115,7 +115,7 @@ let lastPlacementNormal = null;
 // --- Initialization ---
 function init() {
     // Version and logging setup
-    const BOLLER3D_VERSION = "1.0.99";
+    const BOLLER3D_VERSION = "1.0.125";
 
     // --- Initial Setup ---
     console.log(`%cBoller3D v${BOLLER3D_VERSION} - Clean logging with bold user interactions`, 'font-weight: bold;');
@@ -3176,6 +3176,40 @@ function createFilenameKey(filename) {
     return 'file_' + btoa(filename).replace(/[^a-z0-9]/gi, '_');
 }
 
+// --- STL Transport Helpers ---
+// Meshes are exchanged with the server as binary STL (base64 inside the JSON body),
+// which is several times smaller and faster to parse than ASCII STL.
+function arrayBufferToBase64(buffer) {
+    const bytes = new Uint8Array(buffer);
+    const chunkSize = 0x8000; // Avoid call stack limits in String.fromCharCode
+    let binaryString = '';
+    for (let i = 0; i < bytes.length; i += chunkSize) {
+        binaryString += String.fromCharCode.apply(null, bytes.subarray(i, i + chunkSize));
+    }
+    return btoa(binaryString);
+}
+
+function base64ToArrayBuffer(base64) {
+    const binaryString = atob(base64);
+    const bytes = new Uint8Array(binaryString.length);
+    for (let i = 0; i < binaryString.length; i++) {
+        bytes[i] = binaryString.charCodeAt(i);
+    }
+    return bytes.buffer;
+}
+
+// Exports an object (with world transforms applied) as base64-encoded binary STL
+function exportStlBase64(exporter, object3d) {
+    const dataView = exporter.parse(object3d, { binary: true });
+    return arrayBufferToBase64(dataView.buffer);
+}
+
+// Returns a server STL result in a form STLLoader.parse accepts (ArrayBuffer for binary, string for ASCII)
+function decodeStlResult(result, key) {
+    const stlData = result[key];
+    return result.stlEncoding === 'base64' ? base64ToArrayBuffer(stlData) : stlData;
+}
+
 // Combined function to convert SVG to STL and match to logo position
 function convertAndMatchLogoStl() {
     // Convert SVG to STL
@@ -3214,10 +3248,10 @@ async function repairStl() {
         // 1. Ensure the group's world matrix is up-to-date for export
         svgToStlGroup.updateMatrixWorld(true);
         
-        // 2. Export the entire group directly to a TEXT STL string
-        console.log("Exporting SVG-to-STL group to TEXT STL...");
+        // 2. Export the entire group directly to a binary STL (base64)
+        console.log("Exporting SVG-to-STL group to binary STL...");
         const exporter = new STLExporter();
-        const stlString = exporter.parse(svgToStlGroup, { binary: false }); // Use TEXT STL
+        const stlBase64 = exportStlBase64(exporter, svgToStlGroup);
 
         // No need for buffer check with text STL
         /*
@@ -3233,15 +3267,14 @@ async function repairStl() {
         );
         */
 
-        // 3. Send plain STL text data to the server endpoint
-        console.log(`Sending Text STL data (${(stlString.length / 1024).toFixed(1)} KB) to /api/repair-stl...`);
+        // 3. Send binary STL data to the server endpoint
+        console.log(`Sending binary STL data (${(stlBase64.length / 1024).toFixed(1)} KB base64) to /api/repair-stl...`);
         const response = await fetch('/api/repair-stl', {
             method: 'POST',
             headers: {
                 'Content-Type': 'application/json',
             },
-            // Send plain text string, remove isBinary flag
-            body: JSON.stringify({ stlData: stlString }), 
+            body: JSON.stringify({ stlBase64 }), 
         });
 
         if (!response.ok) {
@@ -3251,10 +3284,10 @@ async function repairStl() {
         }
 
         const result = await response.json();
-        console.log("Received repaired STL data (Text) from server.");
+        console.log("Received repaired STL data from server.");
             
-        // 4. Parse the repaired TEXT STL string back into geometry
-        const repairedStlString = result.repairedStlData; // Expecting text string
+        // 4. Parse the repaired STL back into geometry
+        const repairedStlData = decodeStlResult(result, 'repairedStlData');
         
         // Remove Base64 decoding
         /*
@@ -3269,10 +3302,10 @@ async function repairStl() {
         
         // REMOVE local instantiation - use imported loader instance
         // const loader = new STLLoader(); // This line should be deleted
-        const repairedGeometry = loader.parse(repairedStlString); // Parse the text string
+        const repairedGeometry = loader.parse(repairedStlData);
 
         if (!repairedGeometry || repairedGeometry.type !== 'BufferGeometry') {
-            throw new Error("Failed to parse repaired text STL from server.");
+            throw new Error("Failed to parse repaired STL from server.");
         }
         repairedGeometry.computeVertexNormals(); // Ensure normals are calculated
         repairedGeometry.computeBoundingSphere(); // Ensure bounding sphere is updated
@@ -3389,18 +3422,18 @@ async function cutLogoWithModel() {
     console.log("Assuming logo STL is aligned. Proceeding with export...");
 
     try {
-        // 3. Export Meshes to Text STL Strings
+        // 3. Export Meshes to binary STL (base64)
         const exporter = new STLExporter();
         
         // Export Model (Apply world transform)
         model.updateMatrixWorld(true);
-        const modelStlString = exporter.parse(model, { binary: false });
-        console.log(`Exported model STL string (${(modelStlString.length / 1024).toFixed(1)} KB)`);
+        const modelStlBase64 = exportStlBase64(exporter, model);
+        console.log(`Exported model binary STL (${(modelStlBase64.length / 1024).toFixed(1)} KB base64)`);
 
         // Export Logo (Apply world transform - group transform is needed)
         svgToStlGroup.updateMatrixWorld(true); // Ensure group's transform is up-to-date
-        const logoStlString = exporter.parse(svgToStlGroup, { binary: false }); // Export the group
-        console.log(`Exported logo STL string (${(logoStlString.length / 1024).toFixed(1)} KB)`);
+        const logoStlBase64 = exportStlBase64(exporter, svgToStlGroup); // Export the group
+        console.log(`Exported logo binary STL (${(logoStlBase64.length / 1024).toFixed(1)} KB base64)`);
 
         // 4. Send to Node.js Server Endpoint (which will run Python script with intersection operation)
         const nodeApiUrl = '/api/intersect-stl-scripted'; // Use the new intersection endpoint
@@ -3411,8 +3444,8 @@ async function cutLogoWithModel() {
                 'Content-Type': 'application/json',
             },
             body: JSON.stringify({ 
-                modelStlData: modelStlString,
-                logoStlData: logoStlString 
+                modelStlBase64,
+                logoStlBase64 
             }),
         });
 
@@ -3423,14 +3456,14 @@ async function cutLogoWithModel() {
         }
 
         const result = await response.json();
-        const intersectedStlString = result.intersectedStlData;
-        console.log("Received intersected STL data (Text) from server.");
+        const intersectedStlData = decodeStlResult(result, 'intersectedStlData');
+        console.log("Received intersected STL data from server.");
 
         // 5. Parse Result and Update Model
         let intersectedGeometry;
         try {
-            // Parse the STL string into geometry using the global loader
-            intersectedGeometry = loader.parse(intersectedStlString);
+            // Parse the STL into geometry using the global loader
+            intersectedGeometry = loader.parse(intersectedStlData);
             console.log("STL parsing completed successfully.");
         } catch (parseError) {
             console.error("Failed to parse intersected STL data:", parseError);
@@ -3552,18 +3585,18 @@ async function cutoutLogoFromModel() {
     console.log("Assuming logo STL is aligned. Proceeding with export...");
 
     try {
-        // 3. Export Meshes to Text STL Strings
+        // 3. Export Meshes to binary STL (base64)
         const exporter = new STLExporter();
         
         // Export Model (Apply world transform)
         model.updateMatrixWorld(true);
-        const modelStlString = exporter.parse(model, { binary: false });
-        console.log(`Exported model STL string (${(modelStlString.length / 1024).toFixed(1)} KB)`);
+        const modelStlBase64 = exportStlBase64(exporter, model);
+        console.log(`Exported model binary STL (${(modelStlBase64.length / 1024).toFixed(1)} KB base64)`);
 
         // Export Logo (Apply world transform - group transform is needed)
         svgToStlGroup.updateMatrixWorld(true); // Ensure group's transform is up-to-date
-        const logoStlString = exporter.parse(svgToStlGroup, { binary: false }); // Export the group
-        console.log(`Exported logo STL string (${(logoStlString.length / 1024).toFixed(1)} KB)`);
+        const logoStlBase64 = exportStlBase64(exporter, svgToStlGroup); // Export the group
+        console.log(`Exported logo binary STL (${(logoStlBase64.length / 1024).toFixed(1)} KB base64)`);
 
         // 4. Send to Node.js Server Endpoint (which will run Python script)
         const nodeApiUrl = '/api/subtract-stl-scripted'; // Use the same reliable endpoint as cutout
@@ -3574,8 +3607,8 @@ async function cutoutLogoFromModel() {
                 'Content-Type': 'application/json',
             },
             body: JSON.stringify({ 
-                modelStlData: modelStlString,
-                logoStlData: logoStlString 
+                modelStlBase64,
+                logoStlBase64 
             }),
         });
 
@@ -3586,8 +3619,8 @@ async function cutoutLogoFromModel() {
         }
 
         const result = await response.json();
-        const subtractedStlString = result.subtractedStlData;
-        console.log("Received subtracted STL data (Text) from server.");
+        const subtractedStlData = decodeStlResult(result, 'subtractedStlData'); // ArrayBuffer (binary) or string (ASCII)
+        console.log("Received subtracted STL data from server.");
 
         // 5. Parse Result and Update Model
         // REMOVE local instantiation - use imported loader instance
@@ -3595,11 +3628,11 @@ async function cutoutLogoFromModel() {
         let subtractedGeometry;
 
         // --- Explicit Check for ASCII String --- 
-        if (typeof subtractedStlString === 'string' && subtractedStlString.trim().startsWith('solid')) {
+        if (typeof subtractedStlData === 'string' && subtractedStlData.trim().startsWith('solid')) {
             console.log("Parsing received data as ASCII STL string.");
             try {
                 // Pass the string directly to the loader
-                subtractedGeometry = loader.parse(subtractedStlString);
+                subtractedGeometry = loader.parse(subtractedStlData);
             } catch (parseError) {
                 console.error("STLLoader failed to parse ASCII string:", parseError);
                 // Provide a hint if the known TypeError occurs
@@ -3608,18 +3641,18 @@ async function cutoutLogoFromModel() {
                 }
                 throw new Error("STLLoader failed to parse the received ASCII STL string.");
             }
-        } else if (subtractedStlString instanceof ArrayBuffer) {
-             // Handle unexpected binary data (shouldn't happen with current server setup)
+        } else if (subtractedStlData instanceof ArrayBuffer) {
+             // Binary STL (the server's default output format)
              console.log("Parsing received data as ArrayBuffer (Binary STL).");
              try {
-                 subtractedGeometry = loader.parse(subtractedStlString);
+                 subtractedGeometry = loader.parse(subtractedStlData);
              } catch (parseError) {
                  console.error("STLLoader failed to parse ArrayBuffer:", parseError);
                  throw new Error("STLLoader failed to parse received Binary STL data.");
              }
         } else {
             // Handle other unexpected data types
-             console.error("Received unexpected data format from server for subtraction result:", typeof subtractedStlString);
+             console.error("Received unexpected data format from server for subtraction result:", typeof subtractedStlData);
              throw new Error("Received unexpected data format from server for subtracted STL.");
         }
         // --- End Explicit Check --- 
@@ -3720,27 +3753,36 @@ async function performCutoutOperation(operationType, meshToSubtract, operationNa
     console.log(`Assuming ${operationName} mesh is aligned. Proceeding with export...`);
 
     try {
-        // Export Meshes to Text STL Strings
+        // Export Meshes to binary STL (base64)
         const exporter = new STLExporter();
         
         // Export Model (Apply world transform)
         model.updateMatrixWorld(true);
-        let currentModelStlString = exporter.parse(model, { binary: false });
-        console.log(`Exported model STL string (${(currentModelStlString.length / 1024).toFixed(1)} KB)`);
+        const modelStlBase64 = exportStlBase64(exporter, model);
+        console.log(`Exported model binary STL (${(modelStlBase64.length / 1024).toFixed(1)} KB base64)`);
 
         // Export the result mesh (Apply world transform)
         meshToSubtract.updateMatrixWorld(true);
-        const logoStlString = exporter.parse(meshToSubtract, { binary: false });
-        console.log(`Exported ${operationName} STL string (${(logoStlString.length / 1024).toFixed(1)} KB)`);
+        const logoStlBase64 = exportStlBase64(exporter, meshToSubtract);
+        console.log(`Exported ${operationName} binary STL (${(logoStlBase64.length / 1024).toFixed(1)} KB base64)`);
 
-        // First subtraction: subtract the main mesh
-        console.log(`Performing first subtraction: model - main ${operationName}...`);
-        let response = await fetch('/api/subtract-stl-scripted', {
+        // Logos to subtract: the main mesh, plus the mirrored STL when enabled. They are sent together
+        // so the server combines them and runs a single subtraction against the model.
+        const logoStlsBase64 = [logoStlBase64];
+        if (hasMirroredStl) {
+            mirroredStlGroup.updateMatrixWorld(true);
+            const mirroredStlBase64 = exportStlBase64(exporter, mirroredStlGroup);
+            console.log(`Exported mirrored binary STL (${(mirroredStlBase64.length / 1024).toFixed(1)} KB base64)`);
+            logoStlsBase64.push(mirroredStlBase64);
+        }
+
+        console.log(`Performing subtraction: model - ${logoStlsBase64.length} ${operationName} mesh(es) in one pass...`);
+        const response = await fetch('/api/subtract-stl-scripted', {
             method: 'POST',
             headers: { 'Content-Type': 'application/json' },
             body: JSON.stringify({ 
-                modelStlData: currentModelStlString,
-                logoStlData: logoStlString 
+                modelStlBase64,
+                logoStlsBase64 
             }),
         });
 
@@ -3750,46 +3792,16 @@ async function performCutoutOperation(operationType, meshToSubtract, operationNa
             throw new Error(`Server ${operationName} failed: ${errorData.error || response.statusText}`);
         }
 
-        let result = await response.json();
-        let subtractedStlString = result.subtractedStlData;
-        console.log(`First subtraction completed.`);
-
-        // If mirrored STL exists, perform second subtraction
-        if (hasMirroredStl) {
-            console.log(`Performing second subtraction: result - mirrored ${operationName}...`);
-            
-            // Export mirrored STL
-            mirroredStlGroup.updateMatrixWorld(true);
-            const mirroredStlString = exporter.parse(mirroredStlGroup, { binary: false });
-            console.log(`Exported mirrored STL string (${(mirroredStlString.length / 1024).toFixed(1)} KB)`);
-
-            // Second subtraction using the result from first subtraction
-            response = await fetch('/api/subtract-stl-scripted', {
-                method: 'POST',
-                headers: { 'Content-Type': 'application/json' },
-                body: JSON.stringify({ 
-                    modelStlData: subtractedStlString, // Use result from first subtraction
-                    logoStlData: mirroredStlString 
-                }),
-            });
-
-            if (!response.ok) {
-                const errorData = await response.json();
-                console.error(`Server mirrored ${operationName} failed:`, errorData);
-                throw new Error(`Server mirrored ${operationName} failed: ${errorData.error || response.statusText}`);
-            }
-
-            result = await response.json();
-            subtractedStlString = result.subtractedStlData;
-            console.log(`Second subtraction (mirrored) completed.`);
-        }
+        const result = await response.json();
+        const subtractedStlData = decodeStlResult(result, 'subtractedStlData'); // ArrayBuffer (binary) or string (ASCII)
+        console.log(`Subtraction completed.`);
 
-        console.log(`Received final ${operationName} STL data (Text) from server.`);
+        console.log(`Received final ${operationName} STL data from server.`);
 
         // Parse Result and Update Model
         let subtractedGeometry;
         try {
-            subtractedGeometry = loader.parse(subtractedStlString);
+            subtractedGeometry = loader.parse(subtractedStlData);
             console.log("STL parsing completed successfully.");
         } catch (parseError) {
             console.error(`Failed to parse ${operationName} STL data:`, parseError);
@@ -3993,19 +4005,19 @@ async function repairBaseModel() {
         // 1. Ensure the model's world matrix is up-to-date for export
         model.updateMatrixWorld(true);
         
-        // 2. Export the model to a TEXT STL string
-        console.log("Exporting base model to TEXT STL...");
+        // 2. Export the model to a binary STL (base64)
+        console.log("Exporting base model to binary STL...");
         const exporter = new STLExporter();
-        const stlString = exporter.parse(model, { binary: false }); // Use TEXT STL
+        const stlBase64 = exportStlBase64(exporter, model);
 
-        // 3. Send plain STL text data to the server endpoint
-        console.log(`Sending Base Model Text STL data (${(stlString.length / 1024).toFixed(1)} KB) to /api/repair-stl...`);
+        // 3. Send binary STL data to the server endpoint
+        console.log(`Sending Base Model binary STL data (${(stlBase64.length / 1024).toFixed(1)} KB base64) to /api/repair-stl...`);
         const response = await fetch('/api/repair-stl', {
             method: 'POST',
             headers: {
                 'Content-Type': 'application/json',
             },
-            body: JSON.stringify({ stlData: stlString }), // Use the same API endpoint as logo repair
+            body: JSON.stringify({ stlBase64 }), // Use the same API endpoint as logo repair
         });
 
         if (!response.ok) {
@@ -4015,14 +4027,14 @@ async function repairBaseModel() {
         }
 
         const result = await response.json();
-        console.log("Received repaired base model STL data (Text) from server.");
+        console.log("Received repaired base model STL data from server.");
             
-        // 4. Parse the repaired TEXT STL string back into geometry
-        const repairedStlString = result.repairedStlData; // Expecting text string
-        const repairedGeometry = loader.parse(repairedStlString); // Use the global loader instance
+        // 4. Parse the repaired STL back into geometry
+        const repairedStlData = decodeStlResult(result, 'repairedStlData');
+        const repairedGeometry = loader.parse(repairedStlData); // Use the global loader instance
 
         if (!repairedGeometry || repairedGeometry.type !== 'BufferGeometry' || repairedGeometry.attributes.position.count === 0) {
-            throw new Error("Failed to parse repaired base model text STL from server.");
+            throw new Error("Failed to parse repaired base model STL from server.");
         }
         repairedGeometry.computeVertexNormals(); 
         repairedGeometry.computeBoundingSphere(); 
@@ -4258,18 +4270,18 @@ async function cutThinLogoWithModel() {
     console.log("Assuming logo STL is aligned. Proceeding with export...");
 
     try {
-        // 3. Export Meshes to Text STL Strings
+        // 3. Export Meshes to binary STL (base64)
         const exporter = new STLExporter();
         
         // Export Model (Apply world transform)
         model.updateMatrixWorld(true);
-        const modelStlString = exporter.parse(model, { binary: false });
-        console.log(`Exported model STL string (${(modelStlString.length / 1024).toFixed(1)} KB)`);
+        const modelStlBase64 = exportStlBase64(exporter, model);
+        console.log(`Exported model binary STL (${(modelStlBase64.length / 1024).toFixed(1)} KB base64)`);
 
         // Export Logo (Apply world transform - group transform is needed)
         svgToStlGroup.updateMatrixWorld(true); // Ensure group's transform is up-to-date
-        const logoStlString = exporter.parse(svgToStlGroup, { binary: false }); // Export the group
-        console.log(`Exported logo STL string (${(logoStlString.length / 1024).toFixed(1)} KB)`);
+        const logoStlBase64 = exportStlBase64(exporter, svgToStlGroup); // Export the group
+        console.log(`Exported logo binary STL (${(logoStlBase64.length / 1024).toFixed(1)} KB base64)`);
 
         // 4. Get thickness delta from UI
         const thicknessDeltaInput = document.getElementById('logo-thickness-delta');
@@ -4285,8 +4297,8 @@ async function cutThinLogoWithModel() {
                 'Content-Type': 'application/json',
             },
             body: JSON.stringify({ 
-                modelStlData: modelStlString,
-                logoStlData: logoStlString,
+                modelStlBase64,
+                logoStlBase64,
                 thicknessDelta: thicknessDelta
             }),
         });
@@ -4298,14 +4310,14 @@ async function cutThinLogoWithModel() {
         }
 
         const result = await response.json();
-        const thinIntersectedStlString = result.thinIntersectedStlData;
-        console.log("Received thin intersected STL data (Text) from server.");
+        const thinIntersectedStlData = decodeStlResult(result, 'thinIntersectedStlData');
+        console.log("Received thin intersected STL data from server.");
 
         // 6. Parse Result and Update Model
         let thinIntersectedGeometry;
         try {
-            // Parse the STL string into geometry using the global loader
-            thinIntersectedGeometry = loader.parse(thinIntersectedStlString);
+            // Parse the STL into geometry using the global loader
+            thinIntersectedGeometry = loader.parse(thinIntersectedStlData);
             console.log("STL parsing completed successfully.");
         } catch (parseError) {
             console.error("Failed to parse thin intersected STL data:", parseError);
@@ -102,130 +102,289 @@ try {
     process.exit(1);
 }
 
-// --- NEW API Endpoint for STL Repair --- 
-app.post('/api/repair-stl', async (req, res) => {
-    console.log("Received request for /api/repair-stl");
-    // Expecting { stlData: "<STL string>" }
-    const stlDataString = req.body.stlData; 
+// --- Persistent Python Mesh Worker ---
+// Boolean, repair and subtract jobs are sent to a long-lived `mesh_worker.py` process pool instead of
+// spawning a fresh interpreter per request, so trimesh/PyVista/PyMeshFix are imported once.
+// The worker queues jobs and admits them by core count and estimated memory (preview jobs first),
+// reports queued/started/progress events, and cancels jobs whose client disconnected.
+// Messages are length-prefixed JSON frames: <4-byte big-endian length><UTF-8 JSON>.
+const PYTHON_EXECUTABLE = process.env.BOLLER_PYTHON || 'python'; // Or specify full path
+const MESH_WORKER_SCRIPT = path.join(__dirname, 'mesh_worker.py');
+const MESH_WORKER_COUNT = parseInt(process.env.BOLLER_MESH_WORKERS || '2', 10);
+// Modules each worker imports before reporting ready: 'all', 'boolean', 'repair' (PyVista only) or 'none'
+const MESH_WORKER_WARM = process.env.BOLLER_MESH_WARM || 'all';
+// Estimated peak memory in MB that running jobs may reserve together (default: 80% of the memory available when the worker starts)
+const MESH_WORKER_MEMORY_LIMIT_MB = process.env.BOLLER_MESH_MEMORY_LIMIT_MB || null;
+// Boolean engine mode: 'sequential' (Trimesh, then PyVista) or 'race' (both in parallel, first valid wins)
+const MESH_ENGINE_MODE = process.env.BOLLER_ENGINE_MODE || 'sequential';
+const MESH_TIME_BUDGET_SECONDS = process.env.BOLLER_TIME_BUDGET ? parseFloat(process.env.BOLLER_TIME_BUDGET) : null;
+// Spatial cropping: run booleans only on the model region around the logo (BOLLER_CROP=1 to enable by default)
+const MESH_CROP_DEFAULT = process.env.BOLLER_CROP === '1';
+const MESH_CROP_MARGIN = parseFloat(process.env.BOLLER_CROP_MARGIN || '2.0');
+// Per-stage timing/memory reports: returned as `report` when the request sets `profile: true` (or always with BOLLER_PROFILE=1)
+const MESH_PROFILE_DEFAULT = process.env.BOLLER_PROFILE === '1';
+// Quality tier for boolean requests: 'preview' and 'standard' simplify the logo first, 'final' keeps full resolution
+const MESH_QUALITY_TIERS = ['preview', 'standard', 'final'];
+const MESH_QUALITY_DEFAULT = MESH_QUALITY_TIERS.includes(process.env.BOLLER_QUALITY) ? process.env.BOLLER_QUALITY : 'final';
+// Thin intersection offset: 'z' shifts the model up by thicknessDelta, 'normal' offsets it along the surface normals
+const MESH_THIN_OFFSETS = ['z', 'normal'];
+const MESH_THIN_OFFSET_DEFAULT = MESH_THIN_OFFSETS.includes(process.env.BOLLER_THIN_OFFSET) ? process.env.BOLLER_THIN_OFFSET : 'z';
+// Peak memory budget per boolean job in MB: jobs degrade to crop/sequential/preview to fit, or fail instead of being OOM-killed
+const MESH_MEMORY_BUDGET_MB = process.env.BOLLER_MEMORY_BUDGET_MB ? parseFloat(process.env.BOLLER_MEMORY_BUDGET_MB) : null;
+// Grid cells across the model/logo overlap for the voxel engine, the last resort when the exact engines fail (0 turns it off)
+const MESH_VOXEL_RESOLUTION = parseInt(process.env.BOLLER_VOXEL_RESOLUTION || '128', 10);
+
+let meshWorkerProcess = null;
+let meshWorkerBuffer = Buffer.alloc(0);
+let meshWorkerNextJobId = 1;
+const meshWorkerPendingJobs = new Map(); // jobId -> { resolve, reject, workerProcess, label }
+
+function failMeshWorkerJobs(workerProcess, reason) {
+    for (const [jobId, pendingJob] of meshWorkerPendingJobs) {
+        if (pendingJob.workerProcess !== workerProcess) continue;
+        meshWorkerPendingJobs.delete(jobId);
+        pendingJob.reject(new Error(reason));
+    }
+}
 
-    if (!stlDataString) {
-        console.error("No stlData found in request body");
-        return res.status(400).json({ error: 'Missing stlData in request body' });
+function handleMeshWorkerFrame(message) {
+    if (message.event === 'ready') {
+        console.log(`[Mesh Worker] Ready with ${message.workers} worker(s), memory limit ${message.memory_limit_mb ?? 'none'} MB.`);
+        return;
     }
-    
-    // Define temporary file paths
-    const tempDir = path.join(__dirname, 'temp_repair');
-    const inputFilename = `input_${Date.now()}.stl`;
-    const outputFilename = `output_${Date.now()}.stl`;
-    const inputPath = path.join(tempDir, inputFilename);
-    const outputPath = path.join(tempDir, outputFilename);
-    
-    try {
-        // Ensure temp directory exists
-        if (!fs.existsSync(tempDir)){
-            console.log(`Creating temp directory: ${tempDir}`);
-            fs.mkdirSync(tempDir);
+    const pendingJob = meshWorkerPendingJobs.get(message.id);
+    if (!pendingJob) {
+        if (!message.event) console.warn(`[Mesh Worker] Received response for unknown job ${message.id}`);
+        return;
+    }
+    if (message.event === 'queued') {
+        console.log(`[Mesh Job ${message.id}] ${pendingJob.label} queued (${message.priority} priority, position ${message.position}, ~${message.estimated_mb} MB).`);
+        return;
+    }
+    if (message.event === 'started') {
+        console.log(`[Mesh Job ${message.id}] Started after ${message.queued_s}s in the queue.`);
+        return;
+    }
+    if (message.event === 'progress') {
+        console.log(`[Mesh Job ${message.id}] ${message.stage} (${message.elapsed_s}s)`);
+        return;
+    }
+    meshWorkerPendingJobs.delete(message.id);
+    pendingJob.resolve(message);
+}
+
+function startMeshWorker() {
+    const workerArgs = [MESH_WORKER_SCRIPT, '--workers', String(MESH_WORKER_COUNT), '--warm', MESH_WORKER_WARM];
+    if (MESH_WORKER_MEMORY_LIMIT_MB) workerArgs.push('--memory-limit', String(MESH_WORKER_MEMORY_LIMIT_MB));
+    console.log(`[Mesh Worker] Starting: ${PYTHON_EXECUTABLE} ${workerArgs.join(' ')}`);
+    const workerProcess = child_process.spawn(PYTHON_EXECUTABLE, workerArgs, { cwd: __dirname });
+    meshWorkerProcess = workerProcess;
+    meshWorkerBuffer = Buffer.alloc(0);
+
+    workerProcess.stdout.on('data', (chunk) => {
+        meshWorkerBuffer = Buffer.concat([meshWorkerBuffer, chunk]);
+        while (meshWorkerBuffer.length >= 4) {
+            const frameLength = meshWorkerBuffer.readUInt32BE(0);
+            if (meshWorkerBuffer.length < 4 + frameLength) break;
+            const payload = meshWorkerBuffer.subarray(4, 4 + frameLength).toString('utf8');
+            meshWorkerBuffer = meshWorkerBuffer.subarray(4 + frameLength);
+            try {
+                handleMeshWorkerFrame(JSON.parse(payload));
+            } catch (parseError) {
+                console.error('[Mesh Worker] Could not parse response frame:', parseError);
+            }
         }
-        
-        // 1. Write the received text STL string to a temporary input file
-        console.log(`Writing input STL (UTF8) to: ${inputPath}`);
-        await fs.promises.writeFile(inputPath, stlDataString, 'utf8'); // Write as text
-        console.log(`Input STL written successfully.`);
+    });
 
-        // 2. Execute the Python repair script
-        const pythonExecutable = 'python'; // Or specify full path if needed
-        const scriptPath = path.join(__dirname, 'repair_script.py');
-        console.log(`Executing Python script: ${pythonExecutable} ${scriptPath} ${inputPath} ${outputPath}`);
+    workerProcess.stderr.on('data', (data) => {
+        console.error(`[Mesh Worker STDERR] ${data.toString().trim()}`);
+    });
 
-        // Correct arguments for the 'repair' operation
-        const pythonArgs = [scriptPath, 'repair', outputPath, '--input_file', inputPath];
-        console.log(`Corrected Python script execution: ${pythonExecutable} ${pythonArgs.join(' ')}`); // Log the corrected command
-        const pythonProcess = child_process.spawn(pythonExecutable, pythonArgs);
+    workerProcess.stdin.on('error', (writeError) => {
+        console.error('[Mesh Worker] Could not write to worker stdin:', writeError.message);
+    });
 
-        let scriptOutput = '';
-        let scriptError = '';
+    workerProcess.on('error', (spawnError) => {
+        console.error('[Mesh Worker] Failed to start Python mesh worker.', spawnError);
+        if (meshWorkerProcess === workerProcess) meshWorkerProcess = null;
+        failMeshWorkerJobs(workerProcess, `Failed to start Python mesh worker: ${spawnError.message}`);
+    });
 
-        pythonProcess.stdout.on('data', (data) => {
-            const outputChunk = data.toString();
-            scriptOutput += outputChunk;
-            console.log(`[Python STDOUT] ${outputChunk.trim()}`);
-        });
+    workerProcess.on('exit', (code, signal) => {
+        console.warn(`[Mesh Worker] Exited with code ${code}${signal ? ` (signal ${signal})` : ''}`);
+        if (meshWorkerProcess === workerProcess) meshWorkerProcess = null;
+        failMeshWorkerJobs(workerProcess, `Python mesh worker exited with code ${code}`);
+    });
+}
 
-        pythonProcess.stderr.on('data', (data) => {
-            const errorChunk = data.toString();
-            scriptError += errorChunk;
-            console.error(`[Python STDERR] ${errorChunk.trim()}`);
-        });
+function writeMeshWorkerFrame(workerProcess, message) {
+    const payload = Buffer.from(JSON.stringify(message), 'utf8');
+    const header = Buffer.alloc(4);
+    header.writeUInt32BE(payload.length, 0);
+    workerProcess.stdin.write(Buffer.concat([header, payload]));
+}
 
-        pythonProcess.on('close', async (code) => {
-            console.log(`Python script exited with code ${code}`);
+// Sends one job to the worker pool. Resolves with { ok, stdout, stderr, error, cancelled? }.
+// Aborting `signal` cancels the job, whether it is still queued or already running.
+function runMeshJob(op, args, { profile = false, priority = null, signal = null } = {}) {
+    if (!meshWorkerProcess) startMeshWorker();
+    const workerProcess = meshWorkerProcess;
+    const jobId = meshWorkerNextJobId++;
+    return new Promise((resolve, reject) => {
+        meshWorkerPendingJobs.set(jobId, { resolve, reject, workerProcess, label: op });
+        writeMeshWorkerFrame(workerProcess, { id: jobId, op, args, profile, ...(priority ? { priority } : {}) });
+        if (signal) {
+            signal.addEventListener('abort', () => {
+                if (!meshWorkerPendingJobs.has(jobId) || workerProcess.exitCode !== null) return;
+                console.log(`[Mesh Job ${jobId}] Client disconnected. Cancelling...`);
+                writeMeshWorkerFrame(workerProcess, { id: jobId, op: 'cancel' });
+            }, { once: true });
+        }
+    });
+}
 
-            // Keep input file cleanup commented out to inspect the input file on error
-            /* 
-            try {
-                 console.log(`Cleaning up input file: ${inputPath}`);
-                 await fs.promises.unlink(inputPath); 
-            } catch (unlinkErr) {
-                 console.warn(`Could not delete temp input file ${inputPath}:`, unlinkErr);
-            }
-            */
-           console.warn(`Input file cleanup still disabled for debugging: ${inputPath}`); // Keep this warning active
-
-            if (code !== 0) {
-                console.error(`Python script failed. Error: ${scriptError}`);
-                // Attempt to clean up output file if it exists
-                 try {
-                     if (fs.existsSync(outputPath)) await fs.promises.unlink(outputPath);
-                 } catch (unlinkErr) {}
-                return res.status(500).json({ 
-                     error: 'Python repair script failed.', 
-                     details: scriptError || 'Unknown Python error', 
-                     output: scriptOutput 
-                });
-            }
+// An AbortSignal that fires when the client goes away before the response has been sent.
+function clientDisconnectSignal(res) {
+    const controller = new AbortController();
+    res.on('close', () => {
+        if (!res.writableFinished) controller.abort();
+    });
+    return controller.signal;
+}
 
-            // 3. Read the repaired STL file content as TEXT
-            try {
-                console.log(`Reading repaired STL (UTF8) from: ${outputPath}`);
-                const repairedStlString = await fs.promises.readFile(outputPath, 'utf8'); // Read as text
-                console.log(`Repaired STL read successfully.`);
-                
-                // 4. Send the repaired text STL string back to the client
-                res.json({ repairedStlData: repairedStlString }); // Send text string
-                
-                 // 5. Clean up the output file after successful response
-                 try {
-                     console.log(`Cleaning up output file: ${outputPath}`);
-                     await fs.promises.unlink(outputPath);
-                 } catch (unlinkErr) {
-                     console.warn(`Could not delete temp output file ${outputPath}:`, unlinkErr);
-                 }
-
-            } catch (readError) {
-                console.error(`Error reading repaired STL file ${outputPath}:`, readError);
-                return res.status(500).json({ error: 'Could not read repaired STL file.' });
-            }
-        });
+// Logs a job's profile report as a single JSON line (for aggregation) and returns the fields to merge into the response.
+function meshReportFields(endpoint, jobResult) {
+    if (!jobResult.report) return {};
+    console.log(`[Mesh Report] ${JSON.stringify({ endpoint, ...jobResult.report })}`);
+    return { report: jobResult.report };
+}
+// --- END Persistent Python Mesh Worker ---
 
-        pythonProcess.on('error', (spawnError) => {
-             console.error('Failed to start Python subprocess.', spawnError);
-             // Attempt to clean up input file
-             try {
-                 if (fs.existsSync(inputPath)) fs.promises.unlink(inputPath);
-             } catch (unlinkErr) {}
-             res.status(500).json({ error: 'Failed to execute Python repair script.', details: spawnError.message });
-        });
+// --- STL Transport Helpers ---
+// Clients send STL either as binary (`<name>Base64`, preferred) or as ASCII text (`<name>Data`).
+// Results are returned as binary STL (base64) unless the client asks for `outputFormat: 'ascii'`.
+const STL_OUTPUT_FORMATS = ['binary', 'ascii'];
 
-    } catch (error) {
-        console.error('Error in /api/repair-stl:', error);
-        // Attempt cleanup on general error
+function getStlPayload(body, baseName) {
+    if (body[`${baseName}Base64`]) return Buffer.from(body[`${baseName}Base64`], 'base64');
+    if (body[`${baseName}Data`]) return Buffer.from(body[`${baseName}Data`], 'utf8');
+    return null;
+}
+
+// Several STLs sent as an array under `${baseName}sBase64` / `${baseName}sData`, falling back to the
+// single-STL fields. Returns an array of Buffers (empty if nothing was sent).
+function getStlPayloads(body, baseName) {
+    if (Array.isArray(body[`${baseName}sBase64`])) return body[`${baseName}sBase64`].map(data => Buffer.from(data, 'base64'));
+    if (Array.isArray(body[`${baseName}sData`])) return body[`${baseName}sData`].map(data => Buffer.from(data, 'utf8'));
+    const single = getStlPayload(body, baseName);
+    return single ? [single] : [];
+}
+
+function getStlOutputFormat(body) {
+    return STL_OUTPUT_FORMATS.includes(body.outputFormat) ? body.outputFormat : 'binary';
+}
+
+// Numeric request option: a number or numeric string, otherwise NaN (null, '', booleans and objects included).
+function parseNumberOption(value) {
+    if (typeof value === 'number') return value;
+    if (typeof value === 'string' && value.trim() !== '') return Number(value);
+    return NaN;
+}
+
+// Encodes a result STL buffer for JSON: base64 for binary output, plain text for ASCII output.
+function encodeStlResult(stlBuffer, outputFormat) {
+    return outputFormat === 'binary'
+        ? { data: stlBuffer.toString('base64'), stlEncoding: 'base64' }
+        : { data: stlBuffer.toString('utf8'), stlEncoding: 'utf8' };
+}
+
+// Each request writes its files into its own directory under the endpoint's temp dir, so concurrent
+// requests never share a file name. The directory is removed with its inputs and output once the request is done.
+async function makeRequestTempDir(tempDirName) {
+    const tempDir = path.join(__dirname, tempDirName);
+    await fs.promises.mkdir(tempDir, { recursive: true });
+    return fs.promises.mkdtemp(path.join(tempDir, 'req_'));
+}
+
+async function removeRequestTempDir(requestDir) {
+    if (!requestDir) return;
+    try {
+        await fs.promises.rm(requestDir, { recursive: true, force: true });
+    } catch (rmErr) {
+        console.warn(`Could not delete temp directory ${requestDir}:`, rmErr);
+    }
+}
+// --- END STL Transport Helpers ---
+
+// --- NEW API Endpoint for STL Repair --- 
+app.post('/api/repair-stl', async (req, res) => {
+    console.log("Received request for /api/repair-stl");
+    // Expecting { stlBase64: "<binary STL, base64>" } or { stlData: "<STL string>" }, plus optional outputFormat and profile
+    const stlBuffer = getStlPayload(req.body, 'stl');
+    const outputFormat = getStlOutputFormat(req.body);
+    const { profile = MESH_PROFILE_DEFAULT } = req.body;
+
+    if (!stlBuffer) {
+        console.error("No stlBase64/stlData found in request body");
+        return res.status(400).json({ error: 'Missing stlBase64 or stlData in request body' });
+    }
+    
+    let requestDir = null;
+    try {
+        // Temporary file paths, in a directory of this request's own
+        requestDir = await makeRequestTempDir('temp_repair');
+        const inputPath = path.join(requestDir, 'input.stl');
+        const outputPath = path.join(requestDir, 'output.stl');
+        
+        // 1. Write the received STL bytes (binary or text) to a temporary input file
+        console.log(`Writing input STL (${stlBuffer.length} bytes) to: ${inputPath}`);
+        await fs.promises.writeFile(inputPath, stlBuffer);
+        console.log(`Input STL written successfully.`);
+
+        // 2. Run the repair job on the persistent Python worker
+        console.log(`Submitting repair job to mesh worker: ${inputPath} -> ${outputPath}`);
+        let jobResult;
+        try {
+            jobResult = await runMeshJob('repair', { input_file: inputPath, output_file: outputPath, output_format: outputFormat },
+                                         { profile, signal: clientDisconnectSignal(res) });
+        } catch (workerError) {
+            console.error('Python mesh worker unavailable.', workerError);
+            return res.status(500).json({ error: 'Failed to execute Python repair script.', details: workerError.message });
+        }
+        console.log(`Python repair job finished (ok=${jobResult.ok})`);
+
+        if (!jobResult.ok) {
+            console.error(`Python repair job failed. Error: ${jobResult.stderr || jobResult.error}`);
+            if (jobResult.cancelled) return; // The client has already gone
+            return res.status(500).json({ 
+                 error: 'Python repair script failed.', 
+                 details: jobResult.stderr || jobResult.error || 'Unknown Python error', 
+                 output: jobResult.stdout,
+                 ...meshReportFields('/api/repair-stl', jobResult)
+            });
+        }
+
+        // 3. Read the repaired STL file content
         try {
-            if (fs.existsSync(inputPath)) await fs.promises.unlink(inputPath);
-            if (fs.existsSync(outputPath)) await fs.promises.unlink(outputPath);
-        } catch (unlinkErr) {
-             console.warn("Error during cleanup:", unlinkErr);
+            console.log(`Reading repaired STL (${outputFormat}) from: ${outputPath}`);
+            const repairedStlBuffer = await fs.promises.readFile(outputPath);
+            console.log(`Repaired STL read successfully.`);
+            
+            // 4. Send the repaired STL back to the client (base64 for binary, text for ASCII)
+            const { data, stlEncoding } = encodeStlResult(repairedStlBuffer, outputFormat);
+            res.json({ repairedStlData: data, stlEncoding, ...meshReportFields('/api/repair-stl', jobResult) });
+
+        } catch (readError) {
+            console.error(`Error reading repaired STL file ${outputPath}:`, readError);
+            return res.status(500).json({ error: 'Could not read repaired STL file.' });
         }
+
+    } catch (error) {
+        console.error('Error in /api/repair-stl:', error);
         res.status(500).json({ error: 'Server error during STL repair process.' });
+    } finally {
+        // 5. Clean up the input and output files, whatever the outcome
+        await removeRequestTempDir(requestDir);
     }
 });
 // --- END STL Repair Endpoint ---
@@ -242,627 +401,216 @@ app.post('/api/subtract-stl', async (req, res) => {
         return res.status(400).json({ error: 'Missing modelStlData or logoStlData in request body' });
     }
     
-    // Define temporary file paths
-    const tempDir = path.join(__dirname, 'temp_subtract');
-    const modelFilename = `model_${Date.now()}.stl`;
-    const logoFilename = `logo_${Date.now()}.stl`;
-    const outputFilename = `output_${Date.now()}.stl`;
-    const modelPath = path.join(tempDir, modelFilename);
-    const logoPath = path.join(tempDir, logoFilename);
-    const outputPath = path.join(tempDir, outputFilename);
-    
-    let filesCreated = []; // Keep track of created files for cleanup
-
+    let requestDir = null;
     try {
-        // Ensure temp directory exists
-        if (!fs.existsSync(tempDir)){
-            console.log(`Creating temp directory: ${tempDir}`);
-            fs.mkdirSync(tempDir);
-        }
+        // Temporary file paths, in a directory of this request's own
+        requestDir = await makeRequestTempDir('temp_subtract');
+        const modelPath = path.join(requestDir, 'model.stl');
+        const logoPath = path.join(requestDir, 'logo.stl');
+        const outputPath = path.join(requestDir, 'output.stl');
         
         // 1. Write the received text STL strings to temporary input files
         console.log(`Writing model STL (UTF8) to: ${modelPath}`);
         await fs.promises.writeFile(modelPath, modelStlData, 'utf8');
-        filesCreated.push(modelPath);
         console.log(`Model STL written successfully.`);
         
         console.log(`Writing logo STL (UTF8) to: ${logoPath}`);
         await fs.promises.writeFile(logoPath, logoStlData, 'utf8');
-        filesCreated.push(logoPath);
         console.log(`Logo STL written successfully.`);
 
-        // 2. Execute the Python subtraction script
-        const pythonExecutable = 'python'; // Or specify full path
-        const scriptPath = path.join(__dirname, 'subtract_script.py');
-        const args = [
-            scriptPath,
-            'subtract',          // operation
-            outputPath,          // output_file
-            '--model_file', modelPath,
-            '--tool_file', logoPath
-        ];
-        console.log(`Executing Python script: ${pythonExecutable} ${args.join(' ')}`);
-
-        const pythonProcess = child_process.spawn(pythonExecutable, args);
-
-        let scriptOutput = '';
-        let scriptError = '';
-
-        pythonProcess.stdout.on('data', (data) => {
-            const outputChunk = data.toString();
-            scriptOutput += outputChunk;
-            console.log(`[Python STDOUT] ${outputChunk.trim()}`);
-        });
-
-        pythonProcess.stderr.on('data', (data) => {
-            const errorChunk = data.toString();
-            scriptError += errorChunk;
-            console.error(`[Python STDERR] ${errorChunk.trim()}`);
-        });
-
-        pythonProcess.on('close', async (code) => {
-            console.log(`Python script exited with code ${code}`);
-
-            // Clean up input files regardless of outcome
-            for (const filePath of filesCreated) {
-                if (filePath !== outputPath) { // Don't delete output yet
-                    try { await fs.promises.unlink(filePath); } catch (e) { console.warn(`Could not delete temp file ${filePath}:`, e); }
-                }
-            }
-
-            if (code !== 0) {
-                console.error(`Python script failed. Error: ${scriptError}`);
-                try { if (fs.existsSync(outputPath)) await fs.promises.unlink(outputPath); } catch (e) {} // Clean up potential failed output
-                return res.status(500).json({ 
-                     error: 'Python subtraction script failed.', 
-                     details: scriptError || 'Unknown Python error', 
-                     output: scriptOutput 
-                });
-            }
-
-            // 3. Read the resulting STL file content as TEXT
-            try {
-                console.log(`Reading result STL (UTF8) from: ${outputPath}`);
-                const resultStlString = await fs.promises.readFile(outputPath, 'utf8');
-                console.log(`Result STL read successfully.`);
-                
-                // 4. Send the result text STL string back to the client
-                res.json({ subtractedStlData: resultStlString });
-                
-                 // 5. Clean up the output file after successful response
-                 try {
-                     await fs.promises.unlink(outputPath);
-                 } catch (unlinkErr) {
-                     console.warn(`Could not delete temp output file ${outputPath}:`, unlinkErr);
-                 }
-
-            } catch (readError) {
-                console.error(`Error reading result STL file ${outputPath}:`, readError);
-                return res.status(500).json({ error: 'Could not read result STL file from Python script.' });
-            }
-        });
-
-        pythonProcess.on('error', (spawnError) => {
-             console.error('Failed to start Python subprocess.', spawnError);
-             // Attempt cleanup on spawn error (use synchronous unlink here)
-             for (const filePath of filesCreated) {
-                 try {
-                      if (fs.existsSync(filePath)) {
-                           console.warn(`Sync cleanup on spawn error: ${filePath}`);
-                           fs.unlinkSync(filePath);
-                      }
-                 } catch (e) { console.warn(`Could not delete temp file ${filePath} synchronously:`, e); }
-             }
-             res.status(500).json({ error: 'Failed to execute Python subtraction script.', details: spawnError.message });
-        });
-
-    } catch (error) {
-        console.error('Error in /api/subtract-stl:', error);
-        // Attempt cleanup on general error (use synchronous unlink here)
-        for (const filePath of filesCreated) {
-             try {
-                  if (fs.existsSync(filePath)) {
-                       console.warn(`Sync cleanup on general error: ${filePath}`);
-                       fs.unlinkSync(filePath);
-                  }
-             } catch (e) { console.warn(`Could not delete temp file ${filePath} synchronously:`, e); }
-        }
-        if (fs.existsSync(outputPath)) {
-             try {
-                  console.warn(`Sync cleanup on general error (output): ${outputPath}`);
-                  fs.unlinkSync(outputPath);
-             } catch (e) { console.warn(`Could not delete temp output file ${outputPath} synchronously:`, e); }
+        // 2. Run the subtract job on the persistent Python worker (text STL out, as this endpoint returns a string)
+        console.log(`Submitting subtract job to mesh worker: ${modelPath} - ${logoPath} -> ${outputPath}`);
+        let jobResult;
+        try {
+            jobResult = await runMeshJob('subtract', { model_file: modelPath, tool_file: logoPath, output_file: outputPath, output_format: 'ascii' },
+                                         { signal: clientDisconnectSignal(res) });
+        } catch (workerError) {
+            console.error('Python mesh worker unavailable.', workerError);
+            jobResult = { ok: false, stdout: '', stderr: '', error: workerError.message };
         }
-        res.status(500).json({ error: 'Server error during STL subtraction process.' });
-    }
-});
-// --- END STL Subtraction Endpoint ---
-
-// --- NEW Scripted Subtraction Endpoint ---
-app.post('/api/subtract-stl-scripted', async (req, res) => {
-    console.log("Received request for /api/subtract-stl-scripted");
-    
-    // Expecting { modelStlData: "<STL string>", logoStlData: "<STL string>" }
-    const { modelStlData, logoStlData } = req.body;
-
-    if (!modelStlData || !logoStlData) {
-        console.error("Missing modelStlData or logoStlData in request body for subtraction");
-        return res.status(400).json({ error: 'Missing modelStlData or logoStlData in request body' });
-    }
-    
-    // Define temporary file paths for subtraction
-    const tempDir = path.join(__dirname, 'temp_subtract'); // Use a separate temp dir
-    const modelInputFilename = `model_in_${Date.now()}.stl`;
-    const logoInputFilename = `logo_in_${Date.now()}.stl`;
-    const outputFilename = `subtract_out_${Date.now()}.stl`;
-    
-    const modelInputPath = path.join(tempDir, modelInputFilename);
-    const logoInputPath = path.join(tempDir, logoInputFilename);
-    const outputPath = path.join(tempDir, outputFilename);
-    
-    try {
-        // Ensure temp directory exists
-        if (!fs.existsSync(tempDir)){
-            console.log(`Creating temp directory: ${tempDir}`);
-            fs.mkdirSync(tempDir);
+        console.log(`Python subtract job finished (ok=${jobResult.ok})`);
+
+        if (!jobResult.ok) {
+            console.error(`Python subtract job failed. Error: ${jobResult.stderr || jobResult.error}`);
+            if (jobResult.cancelled) return; // The client has already gone
+            return res.status(500).json({ 
+                 error: 'Python subtraction script failed.', 
+                 details: jobResult.stderr || jobResult.error || 'Unknown Python error', 
+                 output: jobResult.stdout 
+            });
         }
-        
-        // 1. Write the received STL strings to temporary input files (UTF8/ASCII)
-        console.log(`Writing model STL to: ${modelInputPath}`);
-        await fs.promises.writeFile(modelInputPath, modelStlData, 'utf8'); 
-        console.log(`Writing logo STL to: ${logoInputPath}`);
-        await fs.promises.writeFile(logoInputPath, logoStlData, 'utf8'); 
-        console.log(`Input STLs written successfully.`);
 
-        // 2. Execute the Python subtraction script
-        const pythonExecutable = 'python'; // Or specify full path
-        const scriptPath = path.join(__dirname, 'subtract_script.py');
-        
-        // --- Add Python Path/Version Logging ---
+        // 3. Read the resulting STL file content as TEXT
         try {
-            console.log("Checking Python executable used by Node.js...");
-            const pyVersion = child_process.execSync(`${pythonExecutable} -V`).toString().trim();
-            const pyPath = child_process.execSync(`${pythonExecutable} -c "import sys; print(sys.executable)"`).toString().trim();
-            console.log(`Node.js will use Python Version: ${pyVersion}`);
-            console.log(`Node.js will use Python Path: ${pyPath}`);
-        } catch (pyCheckError) {
-            console.error(`Failed to check Python version/path using '${pythonExecutable}':`, pyCheckError.message);
-            console.error("Ensure Python is installed and accessible in the system PATH, or specify the full path in 'pythonExecutable'.");
-            // Don't proceed if we can't even find Python
-            return res.status(500).json({ error: 'Python executable not found or failed to execute.', details: pyCheckError.message });
+            console.log(`Reading result STL (UTF8) from: ${outputPath}`);
+            const resultStlString = await fs.promises.readFile(outputPath, 'utf8');
+            console.log(`Result STL read successfully.`);
+            
+            // 4. Send the result text STL string back to the client
+            res.json({ subtractedStlData: resultStlString });
+
+        } catch (readError) {
+            console.error(`Error reading result STL file ${outputPath}:`, readError);
+            return res.status(500).json({ error: 'Could not read result STL file from Python script.' });
         }
-        // --- End Logging ---
-        
-        // Arguments: script_path model_input_path logo_input_path output_path
-        const pythonArgs = [scriptPath, modelInputPath, logoInputPath, outputPath];
-        console.log(`Executing Python subtraction script: ${pythonExecutable} ${pythonArgs.join(' ')}`);
-        
-        const pythonProcess = child_process.spawn(pythonExecutable, pythonArgs);
-
-        let scriptOutput = '';
-        let scriptError = '';
-
-        pythonProcess.stdout.on('data', (data) => {
-            const outputChunk = data.toString();
-            scriptOutput += outputChunk;
-            console.log(`[Subtract Script STDOUT] ${outputChunk.trim()}`);
-        });
-
-        pythonProcess.stderr.on('data', (data) => {
-            const errorChunk = data.toString();
-            scriptError += errorChunk;
-            console.error(`[Subtract Script STDERR] ${errorChunk.trim()}`);
-        });
-
-        pythonProcess.on('close', async (code) => {
-            console.log(`Python subtraction script exited with code ${code}`);
-
-            // --- Cleanup Input Files ---
-            // Always try to delete input files regardless of outcome
-            // Keep commented out for debugging if needed
-            /*
-            try {
-                console.log(`Cleaning up input file: ${modelInputPath}`);
-                await fs.promises.unlink(modelInputPath); 
-                console.log(`Cleaning up input file: ${logoInputPath}`);
-                await fs.promises.unlink(logoInputPath); 
-            } catch (unlinkErr) {
-                console.warn(`Could not delete temp input files:`, unlinkErr);
-            }
-            */
-           console.warn(`Input file cleanup disabled for debugging: ${modelInputPath}, ${logoInputPath}`);
-
-
-            if (code !== 0) {
-                // Log the FULL error message
-                console.error(`Python subtraction script failed. Full STDERR: ${scriptError}`); 
-                // Attempt to clean up output file if it exists on error
-                 try {
-                     if (fs.existsSync(outputPath)) await fs.promises.unlink(outputPath);
-                 } catch (unlinkErr) {}
-                return res.status(500).json({ 
-                     error: 'Python subtraction script failed.', 
-                     // Send the full error back in details for easier debugging client-side too
-                     details: scriptError || 'Unknown Python error', 
-                     output: scriptOutput 
-                });
-            }
-
-            // 3. Read the result STL file content as TEXT
-            try {
-                console.log(`Reading subtracted STL (UTF8) from: ${outputPath}`);
-                const subtractedStlString = await fs.promises.readFile(outputPath, 'utf8'); 
-                console.log(`Subtracted STL read successfully.`);
-                
-                // 4. Send the result text STL string back to the client
-                // IMPORTANT: Use the same JSON key as before ('subtractedStlData')
-                res.json({ subtractedStlData: subtractedStlString }); 
-                
-                 // 5. Clean up the output file after successful response
-                 try {
-                     console.log(`Cleaning up output file: ${outputPath}`);
-                     await fs.promises.unlink(outputPath);
-                 } catch (unlinkErr) {
-                     console.warn(`Could not delete temp output file ${outputPath}:`, unlinkErr);
-                 }
-
-            } catch (readError) {
-                console.error(`Error reading subtracted STL file ${outputPath}:`, readError);
-                 // Clean up output file on read error too
-                 try {
-                     if (fs.existsSync(outputPath)) await fs.promises.unlink(outputPath);
-                 } catch (unlinkErr) {}
-                return res.status(500).json({ error: 'Could not read subtracted STL file.' });
-            }
-        });
-
-        pythonProcess.on('error', (spawnError) => {
-             console.error('Failed to start Python subtraction subprocess.', spawnError);
-             // Attempt to clean up input files
-             try {
-                 if (fs.existsSync(modelInputPath)) fs.promises.unlink(modelInputPath);
-                 if (fs.existsSync(logoInputPath)) fs.promises.unlink(logoInputPath);
-             } catch (unlinkErr) {}
-             res.status(500).json({ error: 'Failed to execute Python subtraction script.', details: spawnError.message });
-        });
 
     } catch (error) {
-        console.error('Error in /api/subtract-stl-scripted:', error);
-        // Attempt cleanup on general error
-        try {
-            if (fs.existsSync(modelInputPath)) await fs.promises.unlink(modelInputPath);
-            if (fs.existsSync(logoInputPath)) await fs.promises.unlink(logoInputPath);
-            if (fs.existsSync(outputPath)) await fs.promises.unlink(outputPath);
-        } catch (unlinkErr) {
-             console.warn("Error during cleanup:", unlinkErr);
-        }
+        console.error('Error in /api/subtract-stl:', error);
         res.status(500).json({ error: 'Server error during STL subtraction process.' });
+    } finally {
+        // 5. Clean up the input and output files, whatever the outcome
+        await removeRequestTempDir(requestDir);
     }
 });
-// --- END Scripted Subtraction Endpoint ---
-
-// --- NEW Scripted Intersection Endpoint ---
-app.post('/api/intersect-stl-scripted', async (req, res) => {
-    console.log("Received request for /api/intersect-stl-scripted");
-    
-    // Expecting { modelStlData: "<STL string>", logoStlData: "<STL string>" }
-    const { modelStlData, logoStlData } = req.body;
+// --- END STL Subtraction Endpoint ---
 
-    if (!modelStlData || !logoStlData) {
-        console.error("Missing modelStlData or logoStlData in request body for intersection");
-        return res.status(400).json({ error: 'Missing modelStlData or logoStlData in request body' });
+// --- Scripted Boolean Endpoints (subtract_script.py via the mesh worker) ---
+// Shared handler for the subtraction, intersection and thin intersection endpoints.
+// Expecting { modelStlBase64 | modelStlData, logoStlBase64 | logoStlData, thicknessDelta?: number, outputFormat?: 'binary' | 'ascii',
+//             engineMode?: 'sequential' | 'race', timeBudget?: seconds, crop?: boolean, cropMargin?: number, profile?: boolean,
+//             preflight?: boolean, quality?: 'preview' | 'standard' | 'final', thinOffset?: 'z' | 'normal', voxelResolution?: number }
+// With `profile: true` the response also carries `report`, the job's per-stage timing and memory record.
+async function handleScriptedBooleanRequest(req, res, { endpoint, label, tempDirName, outputPrefix, resultKey, operation }) {
+    console.log(`Received request for ${endpoint}`);
+    const { thicknessDelta = 1.0, engineMode = MESH_ENGINE_MODE, timeBudget = MESH_TIME_BUDGET_SECONDS,
+            crop = MESH_CROP_DEFAULT, cropMargin = MESH_CROP_MARGIN, profile = MESH_PROFILE_DEFAULT,
+            preflight = true, quality = MESH_QUALITY_DEFAULT, thinOffset = MESH_THIN_OFFSET_DEFAULT,
+            voxelResolution = MESH_VOXEL_RESOLUTION } = req.body;
+    const modelStlBuffer = getStlPayload(req.body, 'modelStl');
+    // One logo, or several (logoStlsBase64/logoStlsData) that the script applies in a single pass
+    const logoStlBuffers = getStlPayloads(req.body, 'logoStl');
+    const outputFormat = getStlOutputFormat(req.body);
+
+    if (!modelStlBuffer || logoStlBuffers.length === 0) {
+        console.error(`Missing model or logo STL in request body for ${label}`);
+        return res.status(400).json({ error: 'Missing modelStlBase64/modelStlData or logoStlBase64/logoStlData (or logoStlsBase64/logoStlsData) in request body' });
+    }
+    // Numeric options are checked here so bad input gets a 400 instead of failing inside the Python job
+    const thickness = parseNumberOption(thicknessDelta);
+    const margin = parseNumberOption(cropMargin);
+    const budget = timeBudget ? parseNumberOption(timeBudget) : null; // 0/empty means no budget, as before
+    if (!Number.isFinite(thickness) || (operation === 'thin_intersection' && thickness <= 0)) {
+        console.error(`Invalid thicknessDelta for ${label}: ${thicknessDelta}`);
+        return res.status(400).json({ error: 'thicknessDelta must be a number (greater than 0 for thin intersection)' });
+    }
+    if (!Number.isFinite(margin) || margin < 0 || (budget !== null && !(Number.isFinite(budget) && budget > 0))) {
+        console.error(`Invalid cropMargin/timeBudget for ${label}: ${cropMargin}/${timeBudget}`);
+        return res.status(400).json({ error: 'cropMargin must be a number >= 0 and timeBudget a number of seconds > 0' });
     }
-    
-    // Define temporary file paths for intersection
-    const tempDir = path.join(__dirname, 'temp_intersect'); // Use a separate temp dir for intersection
-    const modelInputFilename = `model_in_${Date.now()}.stl`;
-    const logoInputFilename = `logo_in_${Date.now()}.stl`;
-    const outputFilename = `intersect_out_${Date.now()}.stl`;
-    
-    const modelInputPath = path.join(tempDir, modelInputFilename);
-    const logoInputPath = path.join(tempDir, logoInputFilename);
-    const outputPath = path.join(tempDir, outputFilename);
-    
-    try {
-        // Ensure temp directory exists
-        if (!fs.existsSync(tempDir)){
-            console.log(`Creating temp directory: ${tempDir}`);
-            fs.mkdirSync(tempDir);
-        }
-        
-        // 1. Write the received STL strings to temporary input files (UTF8/ASCII)
-        console.log(`Writing model STL to: ${modelInputPath}`);
-        await fs.promises.writeFile(modelInputPath, modelStlData, 'utf8'); 
-        console.log(`Writing logo STL to: ${logoInputPath}`);
-        await fs.promises.writeFile(logoInputPath, logoStlData, 'utf8'); 
-        console.log(`Input STLs written successfully.`);
 
-        // 2. Execute the Python intersection script with --operation intersection
-        const pythonExecutable = 'python'; // Or specify full path
-        const scriptPath = path.join(__dirname, 'subtract_script.py'); // Use the same script but with intersection operation
+    let requestDir = null;
+    try {
+        // Temporary file paths, in a directory of this request's own (under a separate temp dir per operation)
+        requestDir = await makeRequestTempDir(tempDirName);
+        const modelInputPath = path.join(requestDir, 'model_in.stl');
+        const logoInputPaths = logoStlBuffers.map((_, index) => path.join(requestDir, `logo_in_${index}.stl`));
+        const outputPath = path.join(requestDir, `${outputPrefix}_out.stl`);
         
-        // --- Add Python Path/Version Logging ---
-        try {
-            console.log("Checking Python executable used by Node.js...");
-            const pyVersion = child_process.execSync(`${pythonExecutable} -V`).toString().trim();
-            const pyPath = child_process.execSync(`${pythonExecutable} -c "import sys; print(sys.executable)"`).toString().trim();
-            console.log(`Node.js will use Python Version: ${pyVersion}`);
-            console.log(`Node.js will use Python Path: ${pyPath}`);
-        } catch (pyCheckError) {
-            console.error(`Failed to check Python version/path using '${pythonExecutable}':`, pyCheckError.message);
-            console.error("Ensure Python is installed and accessible in the system PATH, or specify the full path in 'pythonExecutable'.");
-            // Don't proceed if we can't even find Python
-            return res.status(500).json({ error: 'Python executable not found or failed to execute.', details: pyCheckError.message });
+        // 1. Write the received STL bytes (binary or text) to temporary input files
+        console.log(`Writing model STL (${modelStlBuffer.length} bytes) to: ${modelInputPath}`);
+        await fs.promises.writeFile(modelInputPath, modelStlBuffer); 
+        for (let i = 0; i < logoStlBuffers.length; i++) {
+            console.log(`Writing logo STL ${i + 1}/${logoStlBuffers.length} (${logoStlBuffers[i].length} bytes) to: ${logoInputPaths[i]}`);
+            await fs.promises.writeFile(logoInputPaths[i], logoStlBuffers[i]);
         }
-        // --- End Logging ---
-        
-        // Arguments: script_path model_input_path logo_input_path output_path --operation intersection
-        const pythonArgs = [scriptPath, modelInputPath, logoInputPath, outputPath, '--operation', 'intersection'];
-        console.log(`Executing Python intersection script: ${pythonExecutable} ${pythonArgs.join(' ')}`);
-        
-        const pythonProcess = child_process.spawn(pythonExecutable, pythonArgs);
-
-        let scriptOutput = '';
-        let scriptError = '';
-
-        pythonProcess.stdout.on('data', (data) => {
-            const outputChunk = data.toString();
-            scriptOutput += outputChunk;
-            console.log(`[Intersect Script STDOUT] ${outputChunk.trim()}`);
-        });
-
-        pythonProcess.stderr.on('data', (data) => {
-            const errorChunk = data.toString();
-            scriptError += errorChunk;
-            console.error(`[Intersect Script STDERR] ${errorChunk.trim()}`);
-        });
-
-        pythonProcess.on('close', async (code) => {
-            console.log(`Python intersection script exited with code ${code}`);
-
-            // --- Cleanup Input Files ---
-            // Always try to delete input files regardless of outcome
-            // Keep commented out for debugging if needed
-            /*
-            try {
-                console.log(`Cleaning up input file: ${modelInputPath}`);
-                await fs.promises.unlink(modelInputPath); 
-                console.log(`Cleaning up input file: ${logoInputPath}`);
-                await fs.promises.unlink(logoInputPath); 
-            } catch (unlinkErr) {
-                console.warn(`Could not delete temp input files:`, unlinkErr);
-            }
-            */
-           console.warn(`Input file cleanup disabled for debugging: ${modelInputPath}, ${logoInputPath}`);
-
-            if (code !== 0) {
-                // Log the FULL error message
-                console.error(`Python intersection script failed. Full STDERR: ${scriptError}`); 
-                // Attempt to clean up output file if it exists on error
-                 try {
-                     if (fs.existsSync(outputPath)) await fs.promises.unlink(outputPath);
-                 } catch (unlinkErr) {}
-                return res.status(500).json({ 
-                     error: 'Python intersection script failed.', 
-                     // Send the full error back in details for easier debugging client-side too
-                     details: scriptError || 'Unknown Python error', 
-                     output: scriptOutput 
-                });
-            }
-
-            // 3. Read the result STL file content as TEXT
-            try {
-                console.log(`Reading intersected STL (UTF8) from: ${outputPath}`);
-                const intersectedStlString = await fs.promises.readFile(outputPath, 'utf8'); 
-                console.log(`Intersected STL read successfully.`);
-                
-                // 4. Send the result text STL string back to the client
-                // Use a consistent JSON key for intersection results
-                res.json({ intersectedStlData: intersectedStlString }); 
-                
-                 // 5. Clean up the output file after successful response
-                 try {
-                     console.log(`Cleaning up output file: ${outputPath}`);
-                     await fs.promises.unlink(outputPath);
-                 } catch (unlinkErr) {
-                     console.warn(`Could not delete temp output file ${outputPath}:`, unlinkErr);
-                 }
-
-            } catch (readError) {
-                console.error(`Error reading intersected STL file ${outputPath}:`, readError);
-                 // Clean up output file on read error too
-                 try {
-                     if (fs.existsSync(outputPath)) await fs.promises.unlink(outputPath);
-                 } catch (unlinkErr) {}
-                return res.status(500).json({ error: 'Could not read intersected STL file.' });
-            }
-        });
-
-        pythonProcess.on('error', (spawnError) => {
-             console.error('Failed to start Python intersection subprocess.', spawnError);
-             // Attempt to clean up input files
-             try {
-                 if (fs.existsSync(modelInputPath)) fs.promises.unlink(modelInputPath);
-                 if (fs.existsSync(logoInputPath)) fs.promises.unlink(logoInputPath);
-             } catch (unlinkErr) {}
-             res.status(500).json({ error: 'Failed to execute Python intersection script.', details: spawnError.message });
-        });
+        console.log(`Input STLs written successfully.`);
 
-    } catch (error) {
-        console.error('Error in /api/intersect-stl-scripted:', error);
-        // Attempt cleanup on general error
+        // 2. Run boolean_operation from subtract_script.py on the persistent Python worker
+        const jobArgs = {
+            model_file_path: modelInputPath,
+            logo_file_path: logoInputPaths.length === 1 ? logoInputPaths[0] : logoInputPaths,
+            output_file_path: outputPath,
+            operation,
+            thickness_delta: thickness,
+            output_format: outputFormat,
+            engine_mode: engineMode === 'race' ? 'race' : 'sequential',
+            time_budget: budget,
+            crop: Boolean(crop),
+            crop_margin: margin,
+            preflight: preflight !== false, // Reject logos that miss the model before running the boolean
+            quality: MESH_QUALITY_TIERS.includes(quality) ? quality : MESH_QUALITY_DEFAULT,
+            thin_offset: MESH_THIN_OFFSETS.includes(thinOffset) ? thinOffset : MESH_THIN_OFFSET_DEFAULT,
+            memory_budget: MESH_MEMORY_BUDGET_MB,
+            voxel_resolution: Math.max(0, parseInt(voxelResolution, 10) || 0),
+        };
+        console.log(`Submitting ${label} job to mesh worker: ${JSON.stringify(jobArgs)}`);
+        let jobResult;
         try {
-            if (fs.existsSync(modelInputPath)) await fs.promises.unlink(modelInputPath);
-            if (fs.existsSync(logoInputPath)) await fs.promises.unlink(logoInputPath);
-            if (fs.existsSync(outputPath)) await fs.promises.unlink(outputPath);
-        } catch (unlinkErr) {
-             console.warn("Error during cleanup:", unlinkErr);
+            jobResult = await runMeshJob('boolean', jobArgs, { profile, signal: clientDisconnectSignal(res) });
+        } catch (workerError) {
+            console.error(`Python mesh worker unavailable for ${label}.`, workerError);
+            return res.status(500).json({ error: `Failed to execute Python ${label} script.`, details: workerError.message });
         }
-        res.status(500).json({ error: 'Server error during STL intersection process.' });
-    }
-});
-// --- END Scripted Intersection Endpoint ---
-
-// --- NEW Scripted Thin Intersection Endpoint ---
-app.post('/api/intersect-thin-stl-scripted', async (req, res) => {
-    console.log("Received request for /api/intersect-thin-stl-scripted");
-    
-    // Expecting { modelStlData: "<STL string>", logoStlData: "<STL string>", thicknessDelta: number }
-    const { modelStlData, logoStlData, thicknessDelta = 1.0 } = req.body;
-
-    if (!modelStlData || !logoStlData) {
-        console.error("Missing modelStlData or logoStlData in request body for thin intersection");
-        return res.status(400).json({ error: 'Missing modelStlData or logoStlData in request body' });
-    }
-    
-    // Define temporary file paths for thin intersection
-    const tempDir = path.join(__dirname, 'temp_intersect_thin'); // Use a separate temp dir for thin intersection
-    const modelInputFilename = `model_in_${Date.now()}.stl`;
-    const logoInputFilename = `logo_in_${Date.now()}.stl`;
-    const outputFilename = `intersect_thin_out_${Date.now()}.stl`;
-    
-    const modelInputPath = path.join(tempDir, modelInputFilename);
-    const logoInputPath = path.join(tempDir, logoInputFilename);
-    const outputPath = path.join(tempDir, outputFilename);
-    
-    try {
-        // Ensure temp directory exists
-        if (!fs.existsSync(tempDir)){
-            console.log(`Creating temp directory: ${tempDir}`);
-            fs.mkdirSync(tempDir);
+        console.log(`Python ${label} job finished (ok=${jobResult.ok})`);
+
+        if (!jobResult.ok) {
+            // Log the FULL error message
+            console.error(`Python ${label} job failed. Full STDERR: ${jobResult.stderr || jobResult.error}`); 
+            if (jobResult.cancelled) return; // The client has already gone
+            return res.status(500).json({ 
+                 error: `Python ${label} script failed.`, 
+                 // Send the full error back in details for easier debugging client-side too
+                 details: jobResult.stderr || jobResult.error || 'Unknown Python error', 
+                 output: jobResult.stdout,
+                 ...meshReportFields(endpoint, jobResult)
+            });
         }
-        
-        // 1. Write the received STL strings to temporary input files (UTF8/ASCII)
-        console.log(`Writing model STL to: ${modelInputPath}`);
-        await fs.promises.writeFile(modelInputPath, modelStlData, 'utf8'); 
-        console.log(`Writing logo STL to: ${logoInputPath}`);
-        await fs.promises.writeFile(logoInputPath, logoStlData, 'utf8'); 
-        console.log(`Input STLs written successfully.`);
 
-        // 2. Execute the Python thin intersection script with --operation thin_intersection
-        const pythonExecutable = 'python'; // Or specify full path
-        const scriptPath = path.join(__dirname, 'subtract_script.py'); // Use the same script but with thin_intersection operation
-        
-        // --- Add Python Path/Version Logging ---
+        // 3. Read the result STL file content
         try {
-            console.log("Checking Python executable used by Node.js...");
-            const pyVersion = child_process.execSync(`${pythonExecutable} -V`).toString().trim();
-            const pyPath = child_process.execSync(`${pythonExecutable} -c "import sys; print(sys.executable)"`).toString().trim();
-            console.log(`Node.js will use Python Version: ${pyVersion}`);
-            console.log(`Node.js will use Python Path: ${pyPath}`);
-        } catch (pyCheckError) {
-            console.error(`Failed to check Python version/path using '${pythonExecutable}':`, pyCheckError.message);
-            console.error("Ensure Python is installed and accessible in the system PATH, or specify the full path in 'pythonExecutable'.");
-            // Don't proceed if we can't even find Python
-            return res.status(500).json({ error: 'Python executable not found or failed to execute.', details: pyCheckError.message });
+            console.log(`Reading ${label} result STL (${outputFormat}) from: ${outputPath}`);
+            const resultStlBuffer = await fs.promises.readFile(outputPath); 
+            console.log(`${label} result STL read successfully.`);
+            
+            // 4. Send the result STL back to the client under the endpoint's JSON key
+            const { data, stlEncoding } = encodeStlResult(resultStlBuffer, outputFormat);
+            res.json({ [resultKey]: data, stlEncoding, ...meshReportFields(endpoint, jobResult) }); 
+
+        } catch (readError) {
+            console.error(`Error reading ${label} result STL file ${outputPath}:`, readError);
+            return res.status(500).json({ error: `Could not read ${label} result STL file.` });
         }
-        // --- End Logging ---
-        
-        // Arguments: script_path model_input_path logo_input_path output_path --operation thin_intersection --thickness-delta value
-        const pythonArgs = [scriptPath, modelInputPath, logoInputPath, outputPath, '--operation', 'thin_intersection', '--thickness-delta', thicknessDelta.toString()];
-        console.log(`Executing Python thin intersection script: ${pythonExecutable} ${pythonArgs.join(' ')}`);
-        
-        const pythonProcess = child_process.spawn(pythonExecutable, pythonArgs);
-
-        let scriptOutput = '';
-        let scriptError = '';
-
-        pythonProcess.stdout.on('data', (data) => {
-            const outputChunk = data.toString();
-            scriptOutput += outputChunk;
-            console.log(`[Thin Intersect Script STDOUT] ${outputChunk.trim()}`);
-        });
-
-        pythonProcess.stderr.on('data', (data) => {
-            const errorChunk = data.toString();
-            scriptError += errorChunk;
-            console.error(`[Thin Intersect Script STDERR] ${errorChunk.trim()}`);
-        });
-
-        pythonProcess.on('close', async (code) => {
-            console.log(`Python thin intersection script exited with code ${code}`);
 
-            // --- Cleanup Input Files ---
-            // Always try to delete input files regardless of outcome
-            // Keep commented out for debugging if needed
-            /*
-            try {
-                console.log(`Cleaning up input file: ${modelInputPath}`);
-                await fs.promises.unlink(modelInputPath); 
-                console.log(`Cleaning up input file: ${logoInputPath}`);
-                await fs.promises.unlink(logoInputPath); 
-            } catch (unlinkErr) {
-                console.warn(`Could not delete temp input files:`, unlinkErr);
-            }
-            */
-           console.warn(`Input file cleanup disabled for debugging: ${modelInputPath}, ${logoInputPath}`);
-
-            if (code !== 0) {
-                // Log the FULL error message
-                console.error(`Python thin intersection script failed. Full STDERR: ${scriptError}`); 
-                // Attempt to clean up output file if it exists on error
-                 try {
-                     if (fs.existsSync(outputPath)) await fs.promises.unlink(outputPath);
-                 } catch (unlinkErr) {}
-                return res.status(500).json({ 
-                     error: 'Python thin intersection script failed.', 
-                     // Send the full error back in details for easier debugging client-side too
-                     details: scriptError || 'Unknown Python error', 
-                     output: scriptOutput 
-                });
-            }
+    } catch (error) {
+        console.error(`Error in ${endpoint}:`, error);
+        res.status(500).json({ error: `Server error during STL ${label} process.` });
+    } finally {
+        // 5. Clean up the input and output files, whatever the outcome
+        await removeRequestTempDir(requestDir);
+    }
+}
 
-            // 3. Read the result STL file content as TEXT
-            try {
-                console.log(`Reading thin intersected STL (UTF8) from: ${outputPath}`);
-                const thinIntersectedStlString = await fs.promises.readFile(outputPath, 'utf8'); 
-                console.log(`Thin intersected STL read successfully.`);
-                
-                // 4. Send the result text STL string back to the client
-                // Use a consistent JSON key for thin intersection results
-                res.json({ thinIntersectedStlData: thinIntersectedStlString }); 
-                
-                 // 5. Clean up the output file after successful response
-                 try {
-                     console.log(`Cleaning up output file: ${outputPath}`);
-                     await fs.promises.unlink(outputPath);
-                 } catch (unlinkErr) {
-                     console.warn(`Could not delete temp output file ${outputPath}:`, unlinkErr);
-                 }
-
-            } catch (readError) {
-                console.error(`Error reading thin intersected STL file ${outputPath}:`, readError);
-                 // Clean up output file on read error too
-                 try {
-                     if (fs.existsSync(outputPath)) await fs.promises.unlink(outputPath);
-                 } catch (unlinkErr) {}
-                return res.status(500).json({ error: 'Could not read thin intersected STL file.' });
-            }
-        });
+// --- NEW Scripted Subtraction Endpoint ---
+app.post('/api/subtract-stl-scripted', (req, res) => handleScriptedBooleanRequest(req, res, {
+    endpoint: '/api/subtract-stl-scripted',
+    label: 'subtraction',
+    tempDirName: 'temp_subtract',
+    outputPrefix: 'subtract',
+    resultKey: 'subtractedStlData', // IMPORTANT: Keep the same JSON key as before
+    operation: 'subtraction',
+}));
+// --- END Scripted Subtraction Endpoint ---
 
-        pythonProcess.on('error', (spawnError) => {
-             console.error('Failed to start Python thin intersection subprocess.', spawnError);
-             // Attempt to clean up input files
-             try {
-                 if (fs.existsSync(modelInputPath)) fs.promises.unlink(modelInputPath);
-                 if (fs.existsSync(logoInputPath)) fs.promises.unlink(logoInputPath);
-             } catch (unlinkErr) {}
-             res.status(500).json({ error: 'Failed to execute Python thin intersection script.', details: spawnError.message });
-        });
+// --- NEW Scripted Intersection Endpoint ---
+app.post('/api/intersect-stl-scripted', (req, res) => handleScriptedBooleanRequest(req, res, {
+    endpoint: '/api/intersect-stl-scripted',
+    label: 'intersection',
+    tempDirName: 'temp_intersect',
+    outputPrefix: 'intersect',
+    resultKey: 'intersectedStlData',
+    operation: 'intersection',
+}));
+// --- END Scripted Intersection Endpoint ---
 
-    } catch (error) {
-        console.error('Error in /api/intersect-thin-stl-scripted:', error);
-        // Attempt cleanup on general error
-        try {
-            if (fs.existsSync(modelInputPath)) await fs.promises.unlink(modelInputPath);
-            if (fs.existsSync(logoInputPath)) await fs.promises.unlink(logoInputPath);
-            if (fs.existsSync(outputPath)) await fs.promises.unlink(outputPath);
-        } catch (unlinkErr) {
-             console.warn("Error during cleanup:", unlinkErr);
-        }
-        res.status(500).json({ error: 'Server error during STL thin intersection process.' });
-    }
-});
+// --- NEW Scripted Thin Intersection Endpoint ---
+app.post('/api/intersect-thin-stl-scripted', (req, res) => handleScriptedBooleanRequest(req, res, {
+    endpoint: '/api/intersect-thin-stl-scripted',
+    label: 'thin intersection',
+    tempDirName: 'temp_intersect_thin',
+    outputPrefix: 'intersect_thin',
+    resultKey: 'thinIntersectedStlData',
+    operation: 'thin_intersection',
+}));
 // --- END Scripted Thin Intersection Endpoint ---
 
 // Add logging functionality
@@ -908,6 +656,8 @@ let serverInstance = null; // Keep a reference to the server
 try {
     serverInstance = app.listen(PORT, () => { // Store the server instance
         console.log(`Boller3D Server running on port ${PORT}`);
+        // Warm the Python mesh worker pool up front so the first request doesn't pay for imports
+        if (!meshWorkerProcess) startMeshWorker();
     });
     serverInstance.on('error', (error) => {
         console.error(`CRITICAL SERVER ERROR on listen (${PORT}):`, error);
@@ -924,6 +674,9 @@ try {
 // Graceful shutdown logic
 function gracefulShutdown(signal) {
     console.log(`\nReceived ${signal}. Shutting down gracefully...`);
+    if (meshWorkerProcess) {
+        meshWorkerProcess.stdin.end(); // Worker pool exits once its input closes
+    }
     if (serverInstance) {
         serverInstance.close(() => {
             console.log('HTTP server closed.');
@@ -0,0 +1,540 @@
+"""Offline benchmark for the mesh boolean and repair pipeline.
+
+Runs subtraction, intersection and thin_intersection of every bundled model
+(`models/*.STL`) against generated logo meshes of increasing complexity:
+
+* synthetic star prisms with 8, 64 and 512 points (`star-8`, ...), and
+* extrusions of the bundled `models/*.svg` outlines (`svg-<name>`). Paths are flattened
+  with all SVG path commands and element/group transforms; anything else raises.
+
+Each run is a fresh `subtract_script.py` process with `--report-json`, so the
+numbers come from the same per-stage report the server collects (mesh_profile.py)
+and import time is excluded. `repair_script.py` is benchmarked on each model too.
+Cold-start import cost is measured separately (`import|<module>` cases) with
+`python -X importtime`, together with the heavy backends each import pulls in, so a
+new top-level import of trimesh/PyVista/VTK/PyMeshFix shows up as a regression.
+Per case the benchmark records latency percentiles, peak RSS, the engine hit rate
+and the fallbacks taken, writes them as JSON and compares them with a saved
+baseline to flag regressions:
+
+    python mesh_benchmark.py --save-baseline           # record a baseline
+    python mesh_benchmark.py                           # compare against it
+
+A baseline recorded with other settings (engine mode, crop, quality, ...) is not compared.
+
+No network access is needed; logos are generated into a temporary directory.
+"""
+import argparse
+import glob
+import json
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import time
+import xml.etree.ElementTree as ET
+
+import numpy as np
+
+from stl_io import export_stl_mesh, load_stl_mesh
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+SUBTRACT_SCRIPT = os.path.join(REPO_DIR, 'subtract_script.py')
+REPAIR_SCRIPT = os.path.join(REPO_DIR, 'repair_script.py')
+DEFAULT_BASELINE = os.path.join(REPO_DIR, 'mesh_benchmark_baseline.json')
+BENCHMARK_OPERATIONS = ('subtraction', 'intersection', 'thin_intersection')
+STAR_POINTS = (8, 64, 512)
+# Entry points whose cold-start import cost is tracked, and the heavy backends to watch for.
+IMPORT_MODULES = ('subtract_script', 'repair_script', 'mesh_worker')
+HEAVY_BACKENDS = ('trimesh', 'pyvista', 'vtk', 'vtkmodules.vtkFiltersCore', 'pymeshfix', 'scipy')
+# A case regresses when it is this much slower (or larger) than the baseline...
+DEFAULT_THRESHOLD = 0.2
+# ...and the difference is above the noise floor.
+MIN_LATENCY_DELTA_S = 0.05
+MIN_MEMORY_DELTA_MB = 16.0
+
+# --- Logo Generation ---
+_SVG_NUMBER = r'[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?'
+# A command letter and its argument text ('e'/'E' only occur inside numbers).
+_SVG_COMMAND = re.compile(r'([A-DF-Za-df-z])([^A-DF-Za-df-z]*)')
+# Arc flags are single digits and may be written without separators ("a5 5 0 0110 10").
+_SVG_ARC_ARGUMENTS = re.compile(r'\s*,?\s*'.join([f'({_SVG_NUMBER})'] * 3 + ['([01])'] * 2 + [f'({_SVG_NUMBER})'] * 2))
+_SVG_TRANSFORM = re.compile(r'([A-Za-z]+)\s*\(([^)]*)\)')
+# Arguments per path command; 'M' pairs after the first are implicit line-tos.
+_SVG_ARITY = {'M': 2, 'L': 2, 'H': 1, 'V': 1, 'C': 6, 'S': 4, 'Q': 4, 'T': 2, 'A': 7, 'Z': 0}
+
+def _svg_arguments(kind, text):
+    """Splits a path command's argument text into groups of its arity; raises ValueError on a bad count."""
+    if kind == 'A':
+        groups, rest = [], text.strip()
+        while rest.strip(' \t\r\n,'):
+            match = _SVG_ARC_ARGUMENTS.match(rest.lstrip(' \t\r\n,'))
+            if match is None:
+                raise ValueError(f"Malformed SVG arc arguments: {text.strip()!r}")
+            groups.append(np.array([float(v) for v in match.groups()]))
+            rest = rest.lstrip(' \t\r\n,')[match.end():]
+        return groups
+    values = [float(v) for v in re.findall(_SVG_NUMBER, text)]
+    arity = _SVG_ARITY[kind]
+    if arity == 0:
+        if values:
+            raise ValueError(f"SVG path command 'Z' takes no arguments, got {text.strip()!r}")
+        return [np.zeros(0)]
+    if not values or len(values) % arity:
+        raise ValueError(f"SVG path command '{kind}' needs a multiple of {arity} arguments, got {len(values)}")
+    return [np.array(values[i:i + arity]) for i in range(0, len(values), arity)]
+
+def _arc_points(start, rx, ry, angle, large_arc, sweep, end, curve_steps):
+    """Samples an SVG elliptical arc (endpoint parametrisation, SVG 1.1 F.6.5) after start."""
+    rx, ry = abs(rx), abs(ry)
+    if rx == 0 or ry == 0 or np.allclose(start, end):
+        return [end]
+    phi = np.radians(angle)
+    rotation = np.array([[np.cos(phi), -np.sin(phi)], [np.sin(phi), np.cos(phi)]])
+    x1, y1 = rotation.T @ ((start - end) / 2)
+    scale = (x1 / rx) ** 2 + (y1 / ry) ** 2
+    if scale > 1:  # Radii too small to reach the end point are scaled up
+        rx, ry = rx * np.sqrt(scale), ry * np.sqrt(scale)
+    factor = np.sqrt(max(0.0, (rx * ry) ** 2 - (rx * y1) ** 2 - (ry * x1) ** 2) / ((rx * y1) ** 2 + (ry * x1) ** 2))
+    if large_arc == sweep:
+        factor = -factor
+    center_rotated = factor * np.array([rx * y1 / ry, -ry * x1 / rx])
+    center = rotation @ center_rotated + (start + end) / 2
+    theta1 = np.arctan2((y1 - center_rotated[1]) / ry, (x1 - center_rotated[0]) / rx)
+    theta2 = np.arctan2((-y1 - center_rotated[1]) / ry, (-x1 - center_rotated[0]) / rx)
+    delta = (theta2 - theta1) % (2 * np.pi)
+    if not sweep:
+        delta -= 2 * np.pi
+    steps = max(curve_steps, int(np.ceil(curve_steps * abs(delta) / (np.pi / 2))))
+    theta = theta1 + delta * np.linspace(0.0, 1.0, steps + 1)[1:]
+    points = center + np.column_stack([rx * np.cos(theta), ry * np.sin(theta)]) @ rotation.T
+    points[-1] = end
+    return list(points)
+
+def flatten_svg_path(d, curve_steps=8):
+    """Flattens an SVG path's `d` attribute (M, L, H, V, C, S, Q, T, A, Z, absolute or relative)
+    into closed (n, 2) loops. Raises ValueError on commands it does not know or bad argument counts."""
+    loops, current = [], []
+    position = np.zeros(2)
+    start = np.zeros(2)
+    last_cubic = last_quadratic = None
+    t = np.linspace(0.0, 1.0, curve_steps + 1)[1:, None]
+
+    def close_loop():
+        if len(current) > 2:
+            loops.append(np.array(current))
+
+    stray = re.sub(r'[\s,]', '', _SVG_COMMAND.split(d)[0])
+    if stray:
+        raise ValueError(f"SVG path data does not start with a command: {d[:20]!r}")
+    for command, text in _SVG_COMMAND.findall(d):
+        kind, relative = command.upper(), command.islower()
+        if kind not in _SVG_ARITY:
+            raise ValueError(f"Unsupported SVG path command '{command}'")
+        for index, args in enumerate(_svg_arguments(kind, text)):
+            origin = position if relative else np.zeros(2)
+            cubic = quadratic = None
+            if kind == 'Z':
+                close_loop()
+                current, position = [], start.copy()
+            elif kind == 'M' and index == 0:
+                close_loop()
+                position = origin + args
+                start, current = position.copy(), [position.copy()]
+            elif kind in 'ML':
+                position = origin + args
+                current.append(position.copy())
+            elif kind == 'H':
+                position = np.array([origin[0] + args[0], position[1]])
+                current.append(position.copy())
+            elif kind == 'V':
+                position = np.array([position[0], origin[1] + args[0]])
+                current.append(position.copy())
+            elif kind in 'CS':
+                if kind == 'C':
+                    control1, control2, end = args.reshape(3, 2) + origin
+                else:
+                    control2, end = args.reshape(2, 2) + origin
+                    control1 = 2 * position - last_cubic if last_cubic is not None else position.copy()
+                current.extend((1 - t) ** 3 * position + 3 * (1 - t) ** 2 * t * control1 + 3 * (1 - t) * t ** 2 * control2 + t ** 3 * end)
+                position, cubic = end.copy(), control2
+            elif kind in 'QT':
+                if kind == 'Q':
+                    control, end = args.reshape(2, 2) + origin
+                else:
+                    end = args + origin
+                    control = 2 * position - last_quadratic if last_quadratic is not None else position.copy()
+                current.extend((1 - t) ** 2 * position + 2 * (1 - t) * t * control + t ** 2 * end)
+                position, quadratic = end.copy(), control
+            else:  # 'A'
+                end = args[5:7] + origin
+                current.extend(_arc_points(position, args[0], args[1], args[2], bool(args[3]), bool(args[4]), end, curve_steps))
+                position = end.copy()
+            last_cubic, last_quadratic = cubic, quadratic
+    close_loop()
+    return loops
+
+def parse_svg_transform(text):
+    """Returns the 3x3 matrix of an SVG `transform` attribute (matrix, translate, scale, rotate,
+    skewX, skewY). Raises ValueError on anything else."""
+    matrix = np.eye(3)
+    remainder = _SVG_TRANSFORM.sub('', text or '')
+    if re.sub(r'[\s,]', '', remainder):
+        raise ValueError(f"Malformed SVG transform: {text!r}")
+    for name, arguments in _SVG_TRANSFORM.findall(text or ''):
+        v = [float(x) for x in re.findall(_SVG_NUMBER, arguments)]
+        if name == 'matrix' and len(v) == 6:
+            step = np.array([[v[0], v[2], v[4]], [v[1], v[3], v[5]], [0, 0, 1]])
+        elif name == 'translate' and len(v) in (1, 2):
+            step = np.array([[1, 0, v[0]], [0, 1, v[1] if len(v) == 2 else 0], [0, 0, 1]])
+        elif name == 'scale' and len(v) in (1, 2):
+            step = np.diag([v[0], v[-1], 1.0])
+        elif name == 'rotate' and len(v) in (1, 3):
+            a = np.radians(v[0])
+            step = np.array([[np.cos(a), -np.sin(a), 0], [np.sin(a), np.cos(a), 0], [0, 0, 1]])
+            if len(v) == 3:
+                step = parse_svg_transform(f"translate({v[1]},{v[2]})") @ step @ parse_svg_transform(f"translate({-v[1]},{-v[2]})")
+        elif name in ('skewX', 'skewY') and len(v) == 1:
+            step = np.eye(3)
+            step[(0, 1) if name == 'skewX' else (1, 0)] = np.tan(np.radians(v[0]))
+        else:
+            raise ValueError(f"Unsupported SVG transform: {name}({arguments})")
+        matrix = matrix @ step
+    return matrix
+
+def load_svg_loops(svg_path, curve_steps=8):
+    """Returns the closed outline loops of an SVG's <path> and <polygon> elements, with the
+    `transform` of each element and its parent groups applied."""
+    loops = []
+
+    def visit(element, parent_matrix):
+        matrix = parent_matrix @ parse_svg_transform(element.get('transform'))
+        tag = element.tag.split('}')[-1]
+        found = []
+        if tag == 'path':
+            found = flatten_svg_path(element.get('d', ''), curve_steps)
+        elif tag == 'polygon':
+            values = [float(v) for v in re.split(r'[\s,]+', element.get('points', '').strip()) if v]
+            if len(values) >= 6:
+                found = [np.array(values[:len(values) // 2 * 2]).reshape(-1, 2)]
+        for loop in found:
+            loops.append(loop if np.array_equal(matrix, np.eye(3)) else loop @ matrix[:2, :2].T + matrix[:2, 2])
+        for child in element:
+            visit(child, matrix)
+
+    try:
+        visit(ET.parse(svg_path).getroot(), np.eye(3))
+    except ValueError as e:
+        raise ValueError(f"{os.path.basename(svg_path)}: {e}") from e
+    return loops
+
+def star_loops(points, inner_ratio=0.6):
+    """Returns a single star outline with the given number of points."""
+    angles = np.linspace(0.0, 2 * np.pi, 2 * points, endpoint=False)
+    radii = np.where(np.arange(2 * points) % 2 == 0, 1.0, inner_ratio)
+    return [np.column_stack([radii * np.cos(angles), radii * np.sin(angles)])]
+
+def extrude_loops(loops, height):
+    """Extrudes closed 2D loops (outer outlines and holes, even-odd) into a trimesh.Trimesh prism."""
+    import pyvista as pv
+    import trimesh
+    import vtk
+
+    cleaned = []
+    for loop in loops:
+        loop = loop[np.r_[True, np.linalg.norm(np.diff(loop, axis=0), axis=1) > 1e-9]]
+        if np.linalg.norm(loop[0] - loop[-1]) <= 1e-9:
+            loop = loop[:-1]
+        if len(loop) >= 3:
+            cleaned.append(loop)
+    points = np.vstack(cleaned)
+    offsets = np.cumsum([0] + [len(loop) for loop in cleaned])
+    lines = np.concatenate([np.r_[len(loop) + 1, np.arange(o, o + len(loop)), o] for loop, o in zip(cleaned, offsets)])
+
+    triangulator = vtk.vtkContourTriangulator()
+    triangulator.SetInputData(pv.PolyData(np.column_stack([points, np.zeros(len(points))]), lines=lines))
+    triangulator.Update()
+    caps = pv.wrap(triangulator.GetOutput()).faces.reshape(-1, 4)[:, 1:]
+
+    # Orient the caps counter-clockwise seen from +z, then build walls along the cap boundary.
+    a, b, c = points[caps[:, 0]], points[caps[:, 1]], points[caps[:, 2]]
+    ccw = (b[:, 0] - a[:, 0]) * (c[:, 1] - a[:, 1]) - (b[:, 1] - a[:, 1]) * (c[:, 0] - a[:, 0]) > 0
+    caps = np.where(ccw[:, None], caps, caps[:, ::-1])
+    edges = np.concatenate([caps[:, [0, 1]], caps[:, [1, 2]], caps[:, [2, 0]]])
+    _, inverse, counts = np.unique(np.sort(edges, axis=1), axis=0, return_inverse=True, return_counts=True)
+    boundary = edges[counts[inverse.reshape(-1)] == 1]
+    n = len(points)
+    walls = np.concatenate([
+        np.column_stack([boundary[:, 0], boundary[:, 1], boundary[:, 1] + n]),
+        np.column_stack([boundary[:, 0], boundary[:, 1] + n, boundary[:, 0] + n]),
+    ])
+    vertices = np.vstack([np.column_stack([points, np.zeros(n)]), np.column_stack([points, np.full(n, height)])])
+    return trimesh.Trimesh(vertices=vertices, faces=np.concatenate([caps[:, ::-1], caps + n, walls]), process=False)
+
+def place_logo(logo_mesh, model_mesh, size_fraction=0.3, depth=2.0):
+    """Scales a flat logo prism to a fraction of the model's footprint and a height of
+    2 * depth, centred on the model's top surface near its area-weighted centre."""
+    logo = logo_mesh.copy()
+    logo.apply_translation(-logo.bounds.mean(axis=0))
+    scale = model_mesh.extents[:2].min() * size_fraction / max(logo.extents[:2].max(), 1e-9)
+    logo.apply_scale([scale, scale, 2 * depth / max(logo.extents[2], 1e-9)])
+
+    # Upward-facing faces near the top of the model (not the floors of pockets or slots).
+    top = model_mesh.bounds[1][2] - 0.1 * model_mesh.extents[2]
+    up = (model_mesh.face_normals[:, 2] > 0.9) & (model_mesh.triangles_center[:, 2] >= top)
+    if not up.any():
+        up = model_mesh.triangles_center[:, 2] >= top
+    centers = model_mesh.triangles_center[up]
+    target = np.average(centers[:, :2], axis=0, weights=model_mesh.area_faces[up])
+    logo.apply_translation(centers[np.argmin(np.linalg.norm(centers[:, :2] - target, axis=1))])
+    return logo
+
+def generate_logos(model_path, output_dir, sources, size_fraction=0.3, depth=2.0):
+    """Writes the benchmark logos for one model and returns [(logo_name, path, faces)]."""
+    model = load_stl_mesh(model_path)
+    outlines = []
+    if 'synthetic' in sources:
+        outlines += [(f"star-{points}", star_loops(points)) for points in STAR_POINTS]
+    if 'svg' in sources:
+        for svg_path in sorted(glob.glob(os.path.join(REPO_DIR, 'models', '*.svg'))):
+            name = os.path.splitext(os.path.basename(svg_path))[0]
+            outlines.append((f"svg-{re.sub(r'[^A-Za-z0-9]+', '-', name).strip('-').lower()}", load_svg_loops(svg_path)))
+
+    logos = []
+    model_name = os.path.splitext(os.path.basename(model_path))[0]
+    for logo_name, loops in outlines:
+        if not loops:
+            continue
+        logo = extrude_loops(loops, 1.0)
+        logo.apply_scale([1.0, -1.0, 1.0])  # SVG y points down (trimesh keeps the winding outward)
+        logo = place_logo(logo, model, size_fraction, depth)
+        path = os.path.join(output_dir, f"{model_name}__{logo_name}.stl")
+        export_stl_mesh(logo, path)
+        logos.append((logo_name, path, len(logo.faces)))
+    logos.sort(key=lambda item: item[2])
+    return logos
+
+# --- Running Cases ---
+def _run_with_report(command, report_path, timeout):
+    """Runs a script with --report-json and returns its report (or a failure record)."""
+    start = time.perf_counter()
+    try:
+        completed = subprocess.run(command, cwd=REPO_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, timeout=timeout)
+        returncode, stderr = completed.returncode, completed.stderr.decode('utf-8', 'replace')
+    except subprocess.TimeoutExpired:
+        returncode, stderr = None, 'timeout'
+    elapsed = time.perf_counter() - start
+    try:
+        with open(report_path, 'r', encoding='utf-8') as f:
+            report = json.load(f)
+        os.remove(report_path)
+    except (OSError, ValueError):
+        report = {'ok': False, 'wall_s': None, 'stages': [], 'fallbacks': []}
+    report['ok'] = bool(report.get('ok')) and returncode == 0
+    report['process_wall_s'] = round(elapsed, 4)
+    if not report['ok']:
+        report['error_tail'] = stderr.strip().splitlines()[-1:] if stderr else []
+    return report
+
+def run_boolean_case(model_path, logo_path, operation, work_dir, args):
+    output_path = os.path.join(work_dir, 'out.stl')
+    report_path = os.path.join(work_dir, 'report.json')
+    command = [sys.executable, SUBTRACT_SCRIPT, model_path, logo_path, output_path,
+               '--operation', operation, '--engine-mode', args.engine_mode, '--report-json', report_path]
+    if not args.use_cache:
+        command.append('--no-cache')
+    if args.crop:
+        command.append('--crop')
+    if args.quality:
+        command.extend(['--quality', args.quality])
+    if args.memory_budget:
+        command.extend(['--memory-budget', str(args.memory_budget)])
+    return _run_with_report(command, report_path, args.timeout)
+
+def run_repair_case(model_path, work_dir, args):
+    output_path = os.path.join(work_dir, 'repaired.stl')
+    report_path = os.path.join(work_dir, 'report.json')
+    command = [sys.executable, REPAIR_SCRIPT, 'repair', output_path, '--input_file', model_path, '--report_json', report_path]
+    return _run_with_report(command, report_path, args.timeout)
+
+def run_import_case(module, args):
+    """Imports a module in a fresh interpreter under -X importtime; wall_s is its cumulative import time."""
+    probe = f"import sys, json, {module}; print(json.dumps([m for m in {HEAVY_BACKENDS!r} if m in sys.modules]))"
+    try:
+        completed = subprocess.run([sys.executable, '-X', 'importtime', '-c', probe], cwd=REPO_DIR,
+                                   capture_output=True, timeout=args.timeout)
+    except subprocess.TimeoutExpired:
+        return {'ok': False, 'wall_s': None, 'stages': [], 'fallbacks': [], 'error_tail': ['timeout']}
+    stderr = completed.stderr.decode('utf-8', 'replace')
+    cumulative_us = None
+    for line in stderr.splitlines():
+        # "import time:  self [us] | cumulative | imported package"
+        parts = line.split('|')
+        if line.startswith('import time:') and len(parts) == 3 and parts[2].strip() == module:
+            cumulative_us = int(parts[1])
+    if completed.returncode != 0 or cumulative_us is None:
+        errors = [line for line in stderr.splitlines() if not line.startswith('import time:')]
+        return {'ok': False, 'wall_s': None, 'stages': [], 'fallbacks': [], 'error_tail': errors[-1:]}
+    return {'ok': True, 'wall_s': cumulative_us / 1e6, 'stages': [], 'fallbacks': [],
+            'backends': json.loads(completed.stdout.decode('utf-8').strip().splitlines()[-1])}
+
+# --- Summaries and Baseline Comparison ---
+def _percentiles(values):
+    if not values:
+        return {'p50': None, 'p90': None, 'p95': None, 'max': None}
+    p50, p90, p95 = np.percentile(values, [50, 90, 95])
+    return {'p50': round(float(p50), 4), 'p90': round(float(p90), 4), 'p95': round(float(p95), 4), 'max': round(float(max(values)), 4)}
+
+def summarize_case(reports, count_engines=True):
+    """Aggregates the per-run reports of one case."""
+    ok_reports = [r for r in reports if r.get('ok')]
+    engines = {}
+    if count_engines:
+        for report in reports:
+            engine = report.get('engine') or 'none'
+            engines[engine] = engines.get(engine, 0) + 1
+    fallbacks = {}
+    stage_totals = {}
+    for report in ok_reports:
+        for fallback in report.get('fallbacks', []):
+            fallbacks[fallback] = fallbacks.get(fallback, 0) + 1
+        # Stages repeat within a run (e.g. several heals), so total them per run by stage kind.
+        run_totals = {}
+        for record in report.get('stages', []):
+            kind = record['name'].split(':')[0]
+            run_totals[kind] = run_totals.get(kind, 0.0) + record['wall_s']
+        for kind, total in run_totals.items():
+            stage_totals.setdefault(kind, []).append(total)
+    peak_rss = [r['peak_rss_mb'] for r in ok_reports if r.get('peak_rss_mb') is not None]
+    return {
+        'runs': len(reports),
+        'success_rate': round(len(ok_reports) / len(reports), 4) if reports else 0.0,
+        'latency_s': _percentiles([r['wall_s'] for r in ok_reports if r.get('wall_s') is not None]),
+        'peak_rss_mb': max(peak_rss) if peak_rss else None,
+        'engine_hits': engines,
+        'primary_engine_rate': round(engines.get('trimesh', 0) / len(reports), 4) if count_engines and reports else None,
+        'fallbacks': fallbacks,
+        'stage_p50_s': {kind: round(float(np.median(totals)), 4) for kind, totals in sorted(stage_totals.items())},
+        'script_version': next((r.get('version') for r in ok_reports if r.get('version')), None),
+        'errors': sorted({line for r in reports for line in r.get('error_tail', [])}),
+    }
+
+def settings_mismatch(settings, baseline_settings):
+    """Returns the settings (other than the repeat count) that differ from the baseline's, as
+    'name: baseline -> current' strings. Results recorded with other settings are not comparable."""
+    names = sorted((set(settings) | set(baseline_settings)) - {'repeat'})
+    return [f"{name}: {baseline_settings.get(name)!r} -> {settings.get(name)!r}"
+            for name in names if settings.get(name) != baseline_settings.get(name)]
+
+def compare_with_baseline(cases, baseline_cases, threshold):
+    """Returns a list of human-readable regression descriptions."""
+    regressions = []
+    for key, case in sorted(cases.items()):
+        base = baseline_cases.get(key)
+        if base is None:
+            continue
+        current_p50, base_p50 = case['latency_s']['p50'], base['latency_s']['p50']
+        if current_p50 is not None and base_p50 is not None and current_p50 > base_p50 * (1 + threshold) and current_p50 - base_p50 > MIN_LATENCY_DELTA_S:
+            regressions.append(f"{key}: p50 latency {base_p50:.3f}s -> {current_p50:.3f}s")
+        current_rss, base_rss = case['peak_rss_mb'], base['peak_rss_mb']
+        if current_rss is not None and base_rss is not None and current_rss > base_rss * (1 + threshold) and current_rss - base_rss > MIN_MEMORY_DELTA_MB:
+            regressions.append(f"{key}: peak RSS {base_rss:.1f} MB -> {current_rss:.1f} MB")
+        if case['success_rate'] < base['success_rate']:
+            regressions.append(f"{key}: success rate {base['success_rate']:.2f} -> {case['success_rate']:.2f}")
+        current_primary, base_primary = case.get('primary_engine_rate'), base.get('primary_engine_rate')
+        if current_primary is not None and base_primary is not None and current_primary < base_primary:
+            regressions.append(f"{key}: primary engine hit rate {base_primary:.2f} -> {current_primary:.2f}")
+        new_backends = sorted(set(case.get('backends', [])) - set(base.get('backends', [])))
+        if new_backends and 'backends' in base:
+            regressions.append(f"{key}: now imports {', '.join(new_backends)}")
+    return regressions
+
+def run_benchmark(args):
+    model_paths = sorted(glob.glob(os.path.join(REPO_DIR, args.models)))
+    if not model_paths:
+        raise SystemExit(f"No models match {args.models}")
+    sources = set(args.logos.split(','))
+    cases = {}
+    if args.imports:
+        for module in IMPORT_MODULES:
+            key = f"import|{module}"
+            reports = [run_import_case(module, args) for _ in range(args.repeat)]
+            cases[key] = summarize_case(reports, count_engines=False)
+            cases[key]['backends'] = sorted({b for r in reports for b in r.get('backends', [])})
+            print(f"[Benchmark] {key}: p50 {cases[key]['latency_s']['p50']}s, loads {cases[key]['backends']}", file=sys.stderr)
+    with tempfile.TemporaryDirectory(prefix='mesh_benchmark_') as work_dir:
+        for model_path in model_paths:
+            model_name = os.path.splitext(os.path.basename(model_path))[0]
+            if args.repair:
+                key = f"{model_name}|repair"
+                reports = [run_repair_case(model_path, work_dir, args) for _ in range(args.repeat)]
+                cases[key] = summarize_case(reports, count_engines=False)
+                print(f"[Benchmark] {key}: p50 {cases[key]['latency_s']['p50']}s", file=sys.stderr)
+            for logo_name, logo_path, logo_faces in generate_logos(model_path, work_dir, sources, args.logo_size):
+                for operation in args.operations:
+                    key = f"{model_name}|{logo_name}|{operation}"
+                    reports = [run_boolean_case(model_path, logo_path, operation, work_dir, args) for _ in range(args.repeat)]
+                    cases[key] = summarize_case(reports)
+                    cases[key]['logo_faces'] = logo_faces
+                    summary = cases[key]
+                    print(f"[Benchmark] {key}: p50 {summary['latency_s']['p50']}s, peak {summary['peak_rss_mb']} MB, "
+                          f"engines {summary['engine_hits']}, ok {summary['success_rate']:.0%}", file=sys.stderr)
+    return {
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'settings': {'engine_mode': args.engine_mode, 'crop': args.crop, 'quality': args.quality, 'memory_budget': args.memory_budget, 'use_cache': args.use_cache,
+                     'repeat': args.repeat, 'logo_size': args.logo_size},
+        'cases': cases,
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Offline benchmark for subtract_script.py and repair_script.py.')
+    parser.add_argument('--models', default=os.path.join('models', '*.STL'), help='Glob (relative to the repo) of model STLs.')
+    parser.add_argument('--logos', default='synthetic,svg', help="Comma-separated logo sources: 'synthetic', 'svg'.")
+    parser.add_argument('--operations', nargs='+', choices=BENCHMARK_OPERATIONS, default=list(BENCHMARK_OPERATIONS))
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per case.')
+    parser.add_argument('--logo-size', type=float, default=0.3, help="Logo width as a fraction of the model's smaller XY extent.")
+    parser.add_argument('--engine-mode', choices=('sequential', 'race'), default='sequential')
+    parser.add_argument('--crop', action='store_true', help='Benchmark with spatial cropping enabled.')
+    parser.add_argument('--quality', choices=('preview', 'standard', 'final'), default=None,
+                        help="Quality tier passed to subtract_script.py (default: the script's own default).")
+    parser.add_argument('--memory-budget', type=float, default=None, metavar='MB', help='Pass a peak memory budget to subtract_script.py.')
+    parser.add_argument('--use-cache', action='store_true', help='Allow the mesh cache (measures warm runs after the first).')
+    parser.add_argument('--no-repair', dest='repair', action='store_false', help='Skip the repair_script.py cases.')
+    parser.add_argument('--no-imports', dest='imports', action='store_false', help='Skip the cold-start import cases.')
+    parser.add_argument('--timeout', type=float, default=600.0, help='Per-run timeout in seconds.')
+    parser.add_argument('--output', default=None, help='Write the results JSON to this path.')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help='Baseline results JSON to compare against.')
+    parser.add_argument('--save-baseline', action='store_true', help='Store these results as the new baseline instead of comparing.')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD, help='Relative slowdown/growth that counts as a regression.')
+    args = parser.parse_args()
+
+    results = run_benchmark(args)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+
+    if args.save_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"[Benchmark] Baseline saved to {args.baseline}")
+        sys.exit(0)
+
+    if not os.path.exists(args.baseline):
+        print(f"[Benchmark] No baseline at {args.baseline}; run with --save-baseline to create one.")
+        sys.exit(0)
+    with open(args.baseline, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+    mismatch = settings_mismatch(results['settings'], baseline.get('settings', {}))
+    if mismatch:
+        print(f"[Benchmark] Not comparing: {args.baseline} was recorded with other settings "
+              f"({'; '.join(mismatch)}). Re-run with the baseline's settings or save a new baseline.")
+        sys.exit(2)
+    regressions = compare_with_baseline(results['cases'], baseline.get('cases', {}), args.threshold)
+    if regressions:
+        print(f"[Benchmark] {len(regressions)} regression(s) against {args.baseline}:")
+        for line in regressions:
+            print(f"  REGRESSION {line}")
+        sys.exit(1)
+    print(f"[Benchmark] No regressions against {args.baseline} ({len(results['cases'])} cases).")
+    sys.exit(0)
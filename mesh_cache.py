@@ -0,0 +1,181 @@
+"""Content-addressed cache for healed meshes, derived mesh artifacts and boolean results.
+
+Entries are keyed by a SHA-256 of the source mesh file bytes plus a variant tag
+(e.g. "healed" or "healed_offset_z_1.0"). Meshes are stored on disk as
+uncompressed .npy vertex/face arrays, so loads are memory-mapped instead of
+parsed. Arrays are stored as float32/int32 wherever that is lossless (see
+mesh_memory.compact_arrays), which halves both tiers for STL-sourced meshes; finished results are stored as raw STL bytes. Recently used entries are
+also kept in process memory, which persists across jobs in the mesh worker pool.
+Both tiers use LRU eviction with a size cap.
+"""
+import hashlib
+import os
+import shutil
+import sys
+import tempfile
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+# Bump when the healing pipeline changes so stale entries are not reused.
+MESH_CACHE_VERSION = 2
+CACHE_DIR = os.environ.get('BOLLER_MESH_CACHE_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), '.mesh_cache'))
+CACHE_MAX_BYTES = int(float(os.environ.get('BOLLER_MESH_CACHE_MAX_MB', 1024)) * 1024 * 1024)
+MEMORY_MAX_BYTES = int(float(os.environ.get('BOLLER_MESH_CACHE_MEMORY_MB', 256)) * 1024 * 1024)
+
+def file_digest(file_path, chunk_size=1 << 20):
+    """Returns the SHA-256 hex digest of a file's bytes."""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+class MeshCache:
+    """Two-tier (memory + disk) LRU cache of vertex/face arrays and raw result bytes."""
+
+    def __init__(self, cache_dir=CACHE_DIR, max_bytes=CACHE_MAX_BYTES, memory_max_bytes=MEMORY_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.memory_max_bytes = memory_max_bytes
+        self._memory = OrderedDict()  # key -> (value, nbytes); value is (vertices, faces) or bytes
+        self._memory_bytes = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(digest, variant):
+        """Builds a cache key from a content digest and an artifact variant tag."""
+        return hashlib.sha256(f"{digest}:{variant}:v{MESH_CACHE_VERSION}".encode('utf-8')).hexdigest()
+
+    def _entry_dir(self, key):
+        return os.path.join(self.cache_dir, key[:2], key)
+
+    # --- Memory Tier ---
+    def _remember(self, key, value, nbytes):
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                return
+            self._memory[key] = (value, nbytes)
+            self._memory_bytes += nbytes
+            while self._memory_bytes > self.memory_max_bytes and len(self._memory) > 1:
+                _, (_, old_nbytes) = self._memory.popitem(last=False)
+                self._memory_bytes -= old_nbytes
+
+    def _recall(self, key):
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is None:
+                return None
+            self._memory.move_to_end(key)
+            return entry[0]
+
+    # --- Disk Tier ---
+    def _store_files(self, key, write_files):
+        """Writes an entry's files via write_files(staging_dir) and publishes it atomically."""
+        entry_dir = self._entry_dir(key)
+        try:
+            os.makedirs(os.path.dirname(entry_dir), exist_ok=True)
+            # Write into a private directory first so concurrent workers never see partial entries.
+            staging_dir = tempfile.mkdtemp(prefix='.staging_', dir=os.path.dirname(entry_dir))
+            write_files(staging_dir)
+            try:
+                os.rename(staging_dir, entry_dir)
+            except OSError:
+                shutil.rmtree(staging_dir, ignore_errors=True)  # Another worker stored it first
+            self._evict_disk()
+        except OSError as e:
+            print(f"[Mesh Cache] Could not write entry {key[:12]}: {e}", file=sys.stderr)
+
+    # --- Public API ---
+    def get_arrays(self, key):
+        """Returns cached (vertices, faces) arrays for a key, or None on a miss."""
+        entry = self._recall(key)
+        if entry is not None:
+            return entry
+        entry_dir = self._entry_dir(key)
+        try:
+            vertices = np.load(os.path.join(entry_dir, 'vertices.npy'), mmap_mode='r')
+            faces = np.load(os.path.join(entry_dir, 'faces.npy'), mmap_mode='r')
+            os.utime(entry_dir)  # Mark as recently used for disk LRU eviction
+        except (OSError, ValueError):
+            return None
+        self._remember(key, (vertices, faces), vertices.nbytes + faces.nbytes)
+        return vertices, faces
+
+    def put_arrays(self, key, vertices, faces):
+        """Stores vertex/face arrays under a key in both tiers."""
+        vertices = np.ascontiguousarray(vertices)
+        faces = np.ascontiguousarray(faces)
+        def write_files(staging_dir):
+            np.save(os.path.join(staging_dir, 'vertices.npy'), vertices)
+            np.save(os.path.join(staging_dir, 'faces.npy'), faces)
+        self._store_files(key, write_files)
+        self._remember(key, (vertices, faces), vertices.nbytes + faces.nbytes)
+
+    def get_bytes(self, key):
+        """Returns cached raw bytes (e.g. a finished STL) for a key, or None on a miss."""
+        data = self._recall(key)
+        if data is not None:
+            return data
+        entry_dir = self._entry_dir(key)
+        try:
+            with open(os.path.join(entry_dir, 'data.bin'), 'rb') as f:
+                data = f.read()
+            os.utime(entry_dir)
+        except OSError:
+            return None
+        self._remember(key, data, len(data))
+        return data
+
+    def put_bytes(self, key, data):
+        """Stores raw bytes under a key in both tiers."""
+        def write_files(staging_dir):
+            with open(os.path.join(staging_dir, 'data.bin'), 'wb') as f:
+                f.write(data)
+        self._store_files(key, write_files)
+        self._remember(key, data, len(data))
+
+    def get_mesh(self, key):
+        """Returns a cached trimesh.Trimesh for a key, or None on a miss."""
+        entry = self.get_arrays(key)
+        if entry is None:
+            return None
+        import trimesh
+        vertices, faces = entry
+        # One copy straight into trimesh's dtypes (entries may be stored compact).
+        return trimesh.Trimesh(vertices=np.array(vertices, dtype=np.float64), faces=np.array(faces, dtype=np.int64), process=False)
+
+    def put_mesh(self, key, mesh):
+        """Stores a trimesh.Trimesh's vertex/face arrays under a key, narrowed where lossless."""
+        from mesh_memory import compact_arrays
+        self.put_arrays(key, *compact_arrays(mesh.vertices, mesh.faces))
+
+    def _evict_disk(self):
+        """Removes least recently used disk entries until the cache fits its size cap."""
+        entries = []
+        total_bytes = 0
+        for shard in os.scandir(self.cache_dir):
+            if not shard.is_dir():
+                continue
+            for entry in os.scandir(shard.path):
+                if not entry.is_dir() or entry.name.startswith('.staging_'):
+                    continue
+                size = sum(f.stat().st_size for f in os.scandir(entry.path) if f.is_file())
+                entries.append((entry.stat().st_mtime, size, entry.path))
+                total_bytes += size
+        for _, size, path in sorted(entries):
+            if total_bytes <= self.max_bytes:
+                break
+            shutil.rmtree(path, ignore_errors=True)
+            total_bytes -= size
+
+_default_cache = None
+
+def get_default_cache():
+    """Returns the process-wide cache instance (shared across jobs in a worker process)."""
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = MeshCache()
+    return _default_cache
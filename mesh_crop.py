@@ -0,0 +1,416 @@
+"""Spatial cropping for boolean operations.
+
+The logo only touches a small patch of the model, so the boolean can run on the
+part of the model inside the logo's bounding box (plus a margin) instead of the
+whole mesh:
+
+1. The model is split by the box planes with a shared vertex array, giving
+   the untouched outer surface and the exact seam vertices.
+2. The split model is clipped to the box as a closed, capped solid (VTK's
+   vtkClipClosedSurface). Because the seam vertices already lie on the planes,
+   the clipped region reuses them instead of cutting its own, and the boolean
+   runs on that small solid.
+3. For a difference, the boolean result loses its box caps and its open boundary is snapped onto
+   the seam vertices, so the patch and the outer surface share seam vertices
+   exactly and the merged mesh stays watertight.
+
+An intersection lies entirely inside the box, so it needs no stitching.
+
+An engine whose result only approximates the model surface (the voxel engine) cannot be
+stitched onto the seam vertices. `bridged_boolean` runs it on the region clipped to a
+slightly larger box instead, keeps the result's part inside the box, and joins each seam
+loop of the model to the matching loop of the result with a strip of triangles
+(`bridge_into_model`), so only the box is re-meshed.
+
+VTK's clip can leave the capped region open (slivers where the cut runs along a box edge),
+and a boolean on an open region gives wrong geometry, so an open region raises CropError
+(the caller then runs on the full model). The boolean can also fail on a closed region when
+the tool comes close to the caps, so its result must be closed too, and an intersection must
+lie within the tool's bounding box; stray faces out towards the box are left over from the
+region's caps.
+
+With a region tolerance (preview quality), the model faces inside the box are
+simplified before clipping. The faces touching the seam are left alone, so stitching
+is unchanged.
+"""
+import numpy as np
+from mesh_profile import stage
+from mesh_vtk import arrays_from_polydata, polydata_from_arrays
+
+# Skip cropping when the region would still contain most of the model.
+CROP_MAX_REGION_FRACTION = 0.6
+
+class CropError(Exception):
+    """Raised when a cropped result cannot be stitched back into the model."""
+
+def crop_bounds(model_mesh, tool_mesh, margin):
+    """Returns the (2, 3) crop box around the tool, or None if cropping would not help."""
+    bounds = np.array(tool_mesh.bounds, dtype=np.float64)
+    bounds[0] -= margin
+    bounds[1] += margin
+    model_bounds = np.asarray(model_mesh.bounds)
+    if np.any(bounds[0] >= model_bounds[1]) or np.any(bounds[1] <= model_bounds[0]):
+        return None  # No overlap at all; leave it to the full pipeline to report
+    if region_face_count(model_mesh, bounds) > CROP_MAX_REGION_FRACTION * len(model_mesh.faces):
+        return None
+    return bounds
+
+def region_face_count(model_mesh, bounds, chunk_faces=1 << 16):
+    """Number of model faces whose centroid lies in the crop box. Centroids are computed a chunk
+    at a time rather than through trimesh's cached triangles (96 bytes per face kept alive)."""
+    vertices, faces = model_mesh.vertices, model_mesh.faces
+    count = 0
+    for start in range(0, len(faces), chunk_faces):
+        centroids = vertices[faces[start:start + chunk_faces]].mean(axis=1)
+        count += int(np.count_nonzero(np.all((centroids >= bounds[0]) & (centroids <= bounds[1]), axis=1)))
+    return count
+
+# --- Plane / Box Splitting (shared vertex array, exact seam) ---
+def split_by_plane(vertices, faces, axis, value, eps=1e-7):
+    """Splits triangles by the plane x[axis] == value.
+
+    Returns (vertices, faces_below, faces_above). New seam vertices are appended
+    to the vertex array once per crossed edge and shared by both sides.
+    """
+    vertices = np.array(vertices, dtype=np.float64)
+    distance = vertices[:, axis] - value
+    on_plane = np.abs(distance) <= eps
+    distance[on_plane] = 0.0
+    vertices[on_plane, axis] = value  # Snap near-plane vertices onto the plane to avoid slivers
+    signs = np.sign(distance).astype(np.int8)
+    face_signs = signs[faces]
+
+    below = np.all(face_signs <= 0, axis=1)
+    above = np.all(face_signs >= 0, axis=1) & ~below
+    straddle = ~(below | above)
+    if not straddle.any():
+        return vertices, faces[below], faces[above]
+
+    crossing = faces[straddle]
+    crossing_signs = face_signs[straddle]
+    has_zero = np.any(crossing_signs == 0, axis=1)
+
+    # Rotate each face (keeping winding) so its special vertex comes first: the vertex on
+    # the plane if there is one, otherwise the lone vertex on its own side.
+    sign_sum = crossing_signs.sum(axis=1)
+    lone_sign = np.where(sign_sum > 0, -1, 1)
+    special = np.where(has_zero, np.argmax(crossing_signs == 0, axis=1), np.argmax(crossing_signs == lone_sign[:, None], axis=1))
+    roll = (special[:, None] + np.arange(3)) % 3
+    rolled = np.take_along_axis(crossing, roll, axis=1)
+    a, b, c = rolled[:, 0], rolled[:, 1], rolled[:, 2]
+
+    # Unique crossed edges -> one new vertex each
+    one_cut = has_zero
+    two_cut = ~has_zero
+    edges = np.concatenate([
+        np.stack([a[two_cut], b[two_cut]], axis=1),
+        np.stack([c[two_cut], a[two_cut]], axis=1),
+        np.stack([b[one_cut], c[one_cut]], axis=1),
+    ])
+    edges.sort(axis=1)
+    unique_edges, edge_index = np.unique(edges, axis=0, return_inverse=True)
+    edge_index = edge_index.reshape(-1)
+    start, end = unique_edges[:, 0], unique_edges[:, 1]
+    t = distance[start] / (distance[start] - distance[end])
+    new_points = vertices[start] + t[:, None] * (vertices[end] - vertices[start])
+    new_points[:, axis] = value
+    new_ids = len(vertices) + edge_index
+    vertices = np.vstack([vertices, new_points])
+
+    n_two = int(two_cut.sum())
+    p_ab = new_ids[:n_two]
+    p_ca = new_ids[n_two:2 * n_two]
+    p_bc = new_ids[2 * n_two:]
+
+    # Two crossed edges: lone vertex a on one side, quad (b, c) on the other
+    a2, b2, c2 = a[two_cut], b[two_cut], c[two_cut]
+    lone_tris = np.stack([a2, p_ab, p_ca], axis=1)
+    quad_tris = np.concatenate([np.stack([p_ab, b2, c2], axis=1), np.stack([p_ab, c2, p_ca], axis=1)])
+    lone_below = signs[a2] < 0
+    quad_below = np.concatenate([~lone_below, ~lone_below])
+
+    # One crossed edge: a is on the plane, b and c on opposite sides
+    a1, b1, c1 = a[one_cut], b[one_cut], c[one_cut]
+    b_tris = np.stack([a1, b1, p_bc], axis=1)
+    c_tris = np.stack([a1, p_bc, c1], axis=1)
+    b_below = signs[b1] < 0
+
+    new_faces = np.concatenate([lone_tris, quad_tris, b_tris, c_tris])
+    new_below = np.concatenate([lone_below, quad_below, b_below, ~b_below])
+    faces_below = np.concatenate([faces[below], new_faces[new_below]])
+    faces_above = np.concatenate([faces[above], new_faces[~new_below]])
+    return vertices, faces_below, faces_above
+
+def split_by_box(vertices, faces, bounds):
+    """Splits a surface by an axis-aligned box. Returns (vertices, inner_faces, outer_faces)."""
+    # Every plane splits the whole surface, not just the part still inside the box, so the
+    # faces on both sides of an earlier seam get the same new vertices (no T-junctions).
+    faces = np.asarray(faces)
+    for axis in range(3):
+        for value in (bounds[0][axis], bounds[1][axis]):
+            vertices, below, above = split_by_plane(vertices, faces, axis, value)
+            faces = np.concatenate([below, above])
+    # No face crosses a box plane any more, so its centroid decides which side it is on.
+    centroids = vertices[faces].mean(axis=1)
+    inside = np.all((centroids >= bounds[0]) & (centroids <= bounds[1]), axis=1)
+    return vertices, faces[inside], faces[~inside]
+
+# --- Closed Region Extraction ---
+def clip_to_box(mesh, bounds, split=None):
+    """Clips a closed trimesh.Trimesh to a box and caps the cut, returning a closed trimesh.Trimesh.
+
+    split is the split_by_box() result for the mesh, if the caller already has it.
+    """
+    import trimesh
+    from vtkmodules.vtkCommonDataModel import vtkPlane, vtkPlaneCollection
+    from vtkmodules.vtkFiltersGeneral import vtkClipClosedSurface
+
+    vertices, inner_faces, outer_faces = split if split is not None else split_by_box(mesh.vertices, mesh.faces, bounds)
+    if len(inner_faces) == 0:
+        return trimesh.Trimesh()
+    faces = np.concatenate([inner_faces, outer_faces])
+
+    planes = vtkPlaneCollection()
+    for axis in range(3):
+        for sign, offset in ((1.0, bounds[0][axis]), (-1.0, bounds[1][axis])):
+            normal, origin = [0.0, 0.0, 0.0], [0.0, 0.0, 0.0]
+            normal[axis], origin[axis] = sign, offset
+            plane = vtkPlane()
+            plane.SetNormal(normal)
+            plane.SetOrigin(origin)
+            planes.AddItem(plane)
+    clipper = vtkClipClosedSurface()
+    clipper.SetInputData(polydata_from_arrays(vertices, faces))
+    clipper.SetClippingPlanes(planes)
+    clipper.Update()
+    region_vertices, region_faces = arrays_from_polydata(clipper.GetOutput())
+    if len(region_faces) == 0:
+        return trimesh.Trimesh()
+    return trimesh.Trimesh(vertices=region_vertices, faces=region_faces)
+
+def require_closed(mesh, description):
+    """Raises CropError unless mesh has neither boundary nor non-manifold edges."""
+    from mesh_diagnostics import diagnose_mesh
+    report = diagnose_mesh(mesh)
+    if report.boundary_edges or report.non_manifold_edges:
+        raise CropError(f"{description} is not closed ({report.boundary_edges} boundary, "
+                        f"{report.non_manifold_edges} non-manifold edges).")
+
+def _clip_region(model_mesh, bounds, split=None):
+    """clip_to_box() for a boolean: raises CropError when the region is empty or not closed."""
+    with stage("crop:clip", model_mesh) as record:
+        region = record.output(clip_to_box(model_mesh, bounds, split))
+    if region.is_empty:
+        raise CropError("Crop region is empty.")
+    require_closed(region, "Crop region")
+    print(f"[Crop] Boolean region: {len(region.faces)} of {len(model_mesh.faces)} model faces.")
+    return region
+
+def _check_result(result, tool_mesh, operation, tol):
+    """Raises CropError unless the boolean's result on the region is closed and, for an
+    intersection, lies within the tool's bounding box (up to tol)."""
+    require_closed(result, f"Cropped {operation}")
+    if operation != 'intersection':
+        return
+    tool_bounds = np.asarray(tool_mesh.bounds)
+    vertices = np.asarray(result.vertices)
+    outside = int(np.count_nonzero(np.any((vertices < tool_bounds[0] - tol) | (vertices > tool_bounds[1] + tol), axis=1)))
+    if outside:
+        raise CropError(f"Cropped intersection has {outside} vertices outside the tool.")
+
+# --- Stitching ---
+def _on_box_planes(points, bounds, tol):
+    """Returns an (n, 6) bool array: point lies on each of the six box planes."""
+    return np.concatenate([np.abs(points - bounds[0]) <= tol, np.abs(points - bounds[1]) <= tol], axis=1)
+
+def stitch_into_model(model_mesh, patch_mesh, bounds, split=None):
+    """Replaces the part of model_mesh inside the box with patch_mesh (a boolean result
+    computed on the clipped region) and returns the merged trimesh.Trimesh."""
+    import trimesh
+    from scipy.spatial import cKDTree
+
+    scale = float(np.linalg.norm(model_mesh.extents))
+    tol = max(scale * 1e-5, 1e-6)
+
+    vertices, inner_faces, outer_faces = split if split is not None else split_by_box(model_mesh.vertices, model_mesh.faces, bounds)
+    seam_ids = np.intersect1d(np.unique(inner_faces), np.unique(outer_faces))
+    if len(seam_ids) == 0:
+        raise CropError("Crop box does not cut the model surface.")
+
+    # Drop the caps added by clip_to_box: faces whose corners all lie on the same box plane.
+    patch_vertices = np.asarray(patch_mesh.vertices, dtype=np.float64)
+    patch_faces = np.asarray(patch_mesh.faces)
+    # Cap vertices sit on the planes up to float32 rounding (PyVista results are float32), so
+    # use a tight tolerance here; model faces that merely lie close to a plane are not caps.
+    plane_tol = 8 * np.finfo(np.float32).eps * max(float(np.abs(bounds).max()), 1.0)
+    on_planes = _on_box_planes(patch_vertices, bounds, plane_tol)
+    is_cap = np.any(np.all(on_planes[patch_faces], axis=1), axis=1)
+    patch_faces = patch_faces[~is_cap]
+
+    # Snap the open boundary left by the removed caps onto the matching seam vertices. Only
+    # boundary vertices on a box plane count: the engines may leave other open edges around
+    # the cut, which the final heal closes just as it does for an uncropped result.
+    edges = np.sort(patch_faces[:, [0, 1, 1, 2, 2, 0]].reshape(-1, 2), axis=1)
+    unique_edges, edge_counts = np.unique(edges, axis=0, return_counts=True)
+    boundary = np.unique(unique_edges[edge_counts == 1])
+    boundary = boundary[_on_box_planes(patch_vertices[boundary], bounds, tol).any(axis=1)]
+    if len(boundary) == 0:
+        raise CropError("Cropped result has no seam with the model.")
+    distances, nearest = cKDTree(vertices[seam_ids]).query(patch_vertices[boundary])
+    if np.any(distances > tol):
+        raise CropError(f"{int(np.sum(distances > tol))} seam vertices of the cropped result did not match the model.")
+    if len(np.unique(nearest)) != len(seam_ids):
+        raise CropError(f"{len(seam_ids) - len(np.unique(nearest))} model seam vertices have no match in the cropped result.")
+    index_map = np.arange(len(patch_vertices)) + len(vertices)
+    index_map[boundary] = seam_ids[nearest]
+
+    merged = trimesh.Trimesh(
+        vertices=np.vstack([vertices, patch_vertices]),
+        faces=np.concatenate([outer_faces, index_map[patch_faces]]),
+    )
+    return merged
+
+def _seam_loops(vertices, faces, bounds, tol):
+    """Boundary loops of faces that run along the box planes, as arrays of vertex ids in the
+    direction of the faces' edges. Raises CropError when they are not simple closed loops."""
+    edges = faces[:, [0, 1, 1, 2, 2, 0]].reshape(-1, 2)
+    _, inverse, counts = np.unique(np.sort(edges, axis=1), axis=0, return_inverse=True, return_counts=True)
+    boundary = edges[counts[inverse.reshape(-1)] == 1]
+    on_planes = _on_box_planes(vertices[boundary.reshape(-1)], bounds, tol).any(axis=1).reshape(-1, 2)
+    boundary = boundary[on_planes.all(axis=1)]
+    if len(boundary) == 0:
+        raise CropError("Crop box does not cut the surface.")
+    following = {}
+    for start, end in boundary.tolist():
+        if start in following:
+            raise CropError("Seam is not a set of simple loops.")
+        following[start] = end
+    loops = []
+    while following:
+        start, vertex = following.popitem()
+        loop = [start]
+        while vertex != start:
+            if vertex not in following:
+                raise CropError("Seam has an open end.")
+            loop.append(vertex)
+            vertex = following.pop(vertex)
+        loops.append(np.array(loop))
+    return loops
+
+def _loft(vertices, a, b):
+    """Triangulates the strip between loops a and b, which run side by side in the same
+    direction: starting at their closest pair of vertices, each step advances along the loop
+    whose next diagonal is shorter. The strip's edges along a run like a; along b, against b."""
+    from scipy.spatial import cKDTree
+
+    distance, nearest = cKDTree(vertices[b]).query(vertices[a])
+    start = int(np.argmin(distance))
+    a, b = np.roll(a, -start), np.roll(b, -int(nearest[start]))
+    n, m = len(a), len(b)
+    i = j = 0
+    faces = []
+    while i < n or j < m:
+        a_i, a_next, b_j, b_next = a[i % n], a[(i + 1) % n], b[j % m], b[(j + 1) % m]
+        if j == m or (i < n and np.linalg.norm(vertices[a_next] - vertices[b_j]) <= np.linalg.norm(vertices[a_i] - vertices[b_next])):
+            faces.append((a_i, a_next, b_j))
+            i += 1
+        else:
+            faces.append((a_i, b_next, b_j))
+            j += 1
+    return np.array(faces, dtype=np.int64)
+
+def bridge_into_model(model_mesh, patch_mesh, bounds):
+    """Replaces the part of model_mesh inside the box with the part of patch_mesh inside it and
+    returns the merged trimesh.Trimesh. The two seams on the box planes need not share vertices:
+    each model seam loop is paired with the nearest patch seam loop and joined to it by a strip
+    of triangles. Raises CropError when the loops do not pair up one to one."""
+    import trimesh
+    from scipy.spatial import cKDTree
+
+    tol = max(float(np.linalg.norm(model_mesh.extents)) * 1e-9, 1e-12)
+    model_vertices, _, outer_faces = split_by_box(model_mesh.vertices, model_mesh.faces, bounds)
+    patch_vertices, inner_faces, _ = split_by_box(patch_mesh.vertices, patch_mesh.faces, bounds)
+    if len(inner_faces) == 0:
+        raise CropError("Result has nothing inside the crop box.")
+    offset = len(model_vertices)
+    vertices = np.vstack([model_vertices, patch_vertices])
+    model_loops = _seam_loops(model_vertices, outer_faces, bounds, tol)
+    patch_loops = [loop + offset for loop in _seam_loops(patch_vertices, inner_faces, bounds, tol)]
+    # Where the result reproduces a flat model face exactly, seam vertices of both coincide; they
+    # become one vertex (as they would when the mesh is processed), and the strip triangles that
+    # collapse there are dropped below.
+    model_seam = np.concatenate(model_loops)
+    patch_seam = np.concatenate(patch_loops)
+    distance, nearest = cKDTree(vertices[model_seam]).query(vertices[patch_seam])
+    index_map = np.arange(len(vertices))
+    index_map[patch_seam[distance <= tol]] = model_seam[nearest[distance <= tol]]
+    inner_faces = index_map[inner_faces + offset]
+    patch_loops = [index_map[loop] for loop in patch_loops]
+    if len(model_loops) != len(patch_loops):
+        raise CropError(f"Model seam has {len(model_loops)} loop(s) but the result has {len(patch_loops)}.")
+    trees = [cKDTree(vertices[loop]) for loop in patch_loops]
+    pairs = [int(np.argmin([tree.query(vertices[loop])[0].mean() for tree in trees])) for loop in model_loops]
+    if len(set(pairs)) != len(pairs):
+        raise CropError("Model and result seam loops do not pair up.")
+    # The model's outer faces and the patch's inner faces bound the strip from opposite sides,
+    # so the model loop is reversed to run alongside the patch loop.
+    strips = [_loft(vertices, model_loop[::-1], patch_loops[pair]) for model_loop, pair in zip(model_loops, pairs)]
+    strips = np.concatenate(strips)
+    strips = strips[(strips[:, 0] != strips[:, 1]) & (strips[:, 1] != strips[:, 2]) & (strips[:, 2] != strips[:, 0])]
+    return trimesh.Trimesh(vertices=vertices, faces=np.concatenate([outer_faces, inner_faces, strips]))
+
+def _no_cap_faces(vertices, bounds):
+    """Returns a check for simplified faces: none may lie flat on a box plane, since
+    clip_to_box and stitch_into_model would take such a face for a cap."""
+    tol = max(float(np.linalg.norm(np.ptp(vertices, axis=0))) * 1e-9, 1e-12)
+    on_planes = _on_box_planes(vertices, bounds, tol)
+    return lambda faces: not np.any(np.all(on_planes[faces], axis=1))
+
+def cropped_boolean(model_mesh, tool_mesh, operation, bounds, run_boolean, region_tolerance=None):
+    """Runs run_boolean(region, tool, operation) on the cropped region and merges the result
+    back into the model. Returns (mesh, engine); raises CropError if the region or the boolean's
+    result on it is not closed, an intersection strays outside the tool, or stitching fails.
+
+    region_tolerance simplifies the model faces inside the box to that tolerance first.
+    """
+    with stage("crop:split", model_mesh):
+        split = split_by_box(model_mesh.vertices, model_mesh.faces, bounds)
+    if region_tolerance is not None:
+        from mesh_simplify import simplify_open_surface
+        vertices, inner_faces, outer_faces = split
+        with stage("crop:simplify_region"):
+            # Faces touching the seam are kept as they are; only the core inside them is simplified,
+            # and its boundary (the inner edge of that band) is locked by the decimation.
+            seam_ids = np.intersect1d(np.unique(inner_faces), np.unique(outer_faces))
+            at_seam = np.isin(inner_faces, seam_ids).any(axis=1)
+            core = simplify_open_surface(vertices, inner_faces[~at_seam], region_tolerance,
+                                         accept=_no_cap_faces(vertices, bounds))
+            simplified = np.concatenate([inner_faces[at_seam], core])
+        print(f"[Crop] Simplified region surface: {len(inner_faces)} -> {len(simplified)} faces.")
+        split = (vertices, simplified, outer_faces)
+    region = _clip_region(model_mesh, bounds, split)
+    result, engine = run_boolean(region, tool_mesh, operation)
+    if result is None:
+        return result, engine
+    _check_result(result, tool_mesh, operation, max(float(np.linalg.norm(tool_mesh.extents)) * 1e-6, 1e-9))
+    if operation == 'intersection':
+        return result, engine
+    with stage("crop:stitch", result) as record:
+        return record.output(stitch_into_model(model_mesh, result, bounds, split)), engine
+
+def bridged_boolean(model_mesh, tool_mesh, operation, bounds, margin, run_boolean):
+    """Runs run_boolean(region, tool, operation) on the model clipped to the box grown by margin,
+    and bridges the result's part inside the box into the model (see bridge_into_model), for
+    engines whose surface only approximates the model's near the box. Returns (mesh, engine);
+    raises CropError if the region or the result on it is not closed, an intersection strays
+    outside the tool, or the seams cannot be bridged."""
+    outer = np.array([bounds[0] - margin, bounds[1] + margin], dtype=np.float64)
+    region = _clip_region(model_mesh, outer)
+    result, engine = run_boolean(region, tool_mesh, operation)
+    if result is None:
+        return result, engine
+    _check_result(result, tool_mesh, operation, margin)  # The approximate surface may overshoot a little
+    if operation == 'intersection':
+        return result, engine
+    with stage("crop:bridge", result) as record:
+        return record.output(bridge_into_model(model_mesh, result, bounds)), engine
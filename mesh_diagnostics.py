@@ -0,0 +1,153 @@
+"""Vectorized mesh diagnostics used to decide whether (and where) a mesh needs healing.
+
+`diagnose(vertices, faces)` inspects the face array in one pass of NumPy sorts and
+counts instead of building topology objects:
+
+* degenerate faces (repeated corner or zero area) and duplicate faces,
+* boundary edges (used by one face), their loops, and non-manifold edges (used by 3+),
+* winding consistency (a directed edge used twice means two neighbours disagree),
+* inside-out closed components (negative signed volume) and non-finite coordinates.
+
+Faces are labelled by connected component (shared vertices), so the caller can heal
+only the components that have a defect and keep the clean ones untouched.
+"""
+import argparse
+import json
+import sys
+
+import numpy as np
+
+class MeshDiagnostics:
+    """Diagnostics for one mesh; `defective_faces` marks the faces of components with a defect."""
+
+    def __init__(self, n_vertices, n_faces):
+        self.vertices = n_vertices
+        self.faces = n_faces
+        self.non_finite_vertices = 0
+        self.degenerate_faces = 0
+        self.duplicate_faces = 0
+        self.boundary_edges = 0
+        self.boundary_loops = 0
+        self.non_manifold_edges = 0
+        self.inconsistent_winding_edges = 0
+        self.inverted_components = 0
+        self.components = 0
+        self.defective_components = 0
+        self.component_labels = np.zeros(n_faces, dtype=np.int64)
+        self.defective_faces = np.zeros(n_faces, dtype=bool)
+
+    @property
+    def is_clean(self):
+        """True when the mesh is a closed, consistently wound, outward-facing 2-manifold."""
+        return self.faces > 0 and not self.defective_faces.any() and self.non_finite_vertices == 0
+
+    def to_dict(self):
+        """The counts as plain JSON-serialisable data (no per-face arrays)."""
+        info = {key: value for key, value in vars(self).items() if not isinstance(value, np.ndarray)}
+        info['clean'] = self.is_clean
+        return info
+
+def _edge_keys(first, second, n_vertices):
+    """Packs vertex index pairs into one int64 key each."""
+    return first.astype(np.int64) * n_vertices + second.astype(np.int64)
+
+def _labels(n_nodes, rows, cols):
+    """Connected component labels of an undirected graph given as edge arrays."""
+    from scipy.sparse import coo_matrix
+    from scipy.sparse.csgraph import connected_components
+    graph = coo_matrix((np.ones(len(rows), dtype=np.int8), (rows, cols)), shape=(n_nodes, n_nodes))
+    return connected_components(graph, directed=False)
+
+def diagnose(vertices, faces):
+    """Returns MeshDiagnostics for a triangle mesh given as (n, 3) vertex and face arrays."""
+    vertices = np.asarray(vertices, dtype=np.float64)
+    faces = np.asarray(faces, dtype=np.int64).reshape(-1, 3)
+    n_vertices, n_faces = len(vertices), len(faces)
+    result = MeshDiagnostics(n_vertices, n_faces)
+    if n_faces == 0:
+        return result
+    result.non_finite_vertices = int(np.count_nonzero(~np.isfinite(vertices).all(axis=1)))
+    bad_face = np.zeros(n_faces, dtype=bool)
+
+    # --- Degenerate and duplicate faces ---
+    repeated_corner = (faces[:, 0] == faces[:, 1]) | (faces[:, 1] == faces[:, 2]) | (faces[:, 2] == faces[:, 0])
+    corners = vertices[faces]
+    doubled_area = np.linalg.norm(np.cross(corners[:, 1] - corners[:, 0], corners[:, 2] - corners[:, 0]), axis=1)
+    signed_volume = np.einsum('ij,ij->i', corners[:, 0], np.cross(corners[:, 1], corners[:, 2])) / 6.0
+    del corners  # 72 bytes per face; not needed by the edge passes below
+    scale = float(np.ptp(vertices, axis=0).max()) if np.isfinite(vertices).all() else 1.0
+    degenerate = repeated_corner | (doubled_area <= np.finfo(np.float64).eps * max(scale, 1.0) ** 2)
+    result.degenerate_faces = int(degenerate.sum())
+    bad_face |= degenerate
+
+    sorted_faces = np.sort(faces, axis=1)
+    if n_vertices < 2 ** 21:  # Three indices pack into one int64 key
+        face_keys = (sorted_faces[:, 0] * n_vertices + sorted_faces[:, 1]) * n_vertices + sorted_faces[:, 2]
+        _, first_index = np.unique(face_keys, return_index=True)
+    else:
+        _, first_index = np.unique(sorted_faces, axis=0, return_index=True)
+    duplicated = np.ones(n_faces, dtype=bool)
+    duplicated[first_index] = False  # Every copy after the first one
+    result.duplicate_faces = int(duplicated.sum())
+    bad_face |= duplicated
+
+    # --- Edges: boundary, non-manifold and winding ---
+    starts = faces.reshape(-1)
+    ends = faces[:, [1, 2, 0]].reshape(-1)
+    edge_face = np.repeat(np.arange(n_faces), 3)
+    undirected = _edge_keys(np.minimum(starts, ends), np.maximum(starts, ends), n_vertices)
+    unique_edges, edge_index, edge_counts = np.unique(undirected, return_inverse=True, return_counts=True)
+    edge_index = edge_index.reshape(-1)
+    boundary = edge_counts == 1
+    non_manifold = edge_counts > 2
+    result.boundary_edges = int(boundary.sum())
+    result.non_manifold_edges = int(non_manifold.sum())
+    bad_face[edge_face[boundary[edge_index] | non_manifold[edge_index]]] = True
+
+    # Two faces agreeing on orientation traverse their shared edge in opposite directions,
+    # so an edge walked the same way twice marks a winding flip (or a non-manifold edge).
+    forward_counts = np.bincount(edge_index, weights=starts < ends, minlength=len(unique_edges))
+    flipped = (forward_counts > 1) | (edge_counts - forward_counts > 1)
+    result.inconsistent_winding_edges = int(np.count_nonzero(flipped & ~non_manifold))
+    bad_face[edge_face[flipped[edge_index]]] = True
+
+    if result.boundary_edges:
+        boundary_keys = unique_edges[boundary]
+        loop_rows, loop_cols = boundary_keys // n_vertices, boundary_keys % n_vertices
+        loop_nodes, compact = np.unique(np.concatenate([loop_rows, loop_cols]), return_inverse=True)
+        compact = compact.reshape(-1)
+        result.boundary_loops = int(_labels(len(loop_nodes), compact[:len(loop_rows)], compact[len(loop_rows):])[0])
+
+    # --- Connected components and orientation ---
+    _, vertex_labels = _labels(n_vertices, starts, ends)
+    face_labels = vertex_labels[faces[:, 0]]
+    used_labels, face_labels = np.unique(face_labels, return_inverse=True)
+    face_labels = face_labels.reshape(-1)
+    result.components = len(used_labels)
+    result.component_labels = face_labels
+
+    component_bad = np.bincount(face_labels, weights=bad_face, minlength=result.components) > 0
+    # A closed component with consistent winding but negative volume is inside out.
+    component_volume = np.bincount(face_labels, weights=signed_volume, minlength=result.components)
+    inverted = ~component_bad & (component_volume < 0)
+    result.inverted_components = int(inverted.sum())
+    component_bad |= inverted
+
+    result.defective_components = int(component_bad.sum())
+    result.defective_faces = component_bad[face_labels]
+    return result
+
+def diagnose_mesh(mesh):
+    """diagnose() for a trimesh.Trimesh."""
+    return diagnose(mesh.vertices, mesh.faces)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Print a JSON diagnostics report for STL files.')
+    parser.add_argument('stl_files', nargs='+', help='STL files to check.')
+    args = parser.parse_args()
+
+    from stl_io import load_stl_mesh
+    reports = {path: diagnose_mesh(load_stl_mesh(path)).to_dict() for path in args.stl_files}
+    json.dump(reports, sys.stdout, indent=2)
+    print()
+    sys.exit(0 if all(report['clean'] for report in reports.values()) else 1)
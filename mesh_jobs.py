@@ -0,0 +1,239 @@
+"""Job runner for the mesh worker: admission control, a priority lane, progress and cancellation.
+
+Jobs run on a fixed set of long-lived worker processes, one job at a time each. Every
+worker has its own pipe to the runner, and a single scheduler thread owns the workers:
+
+* Admission: a job starts only when a worker is idle and its estimated peak memory
+  (`mesh_memory.estimate_job_mb`, from the input face counts) fits in what the running
+  jobs leave of the memory limit. A job larger than the whole limit runs on its own.
+* Priority: 'high' jobs (by default preview-quality booleans) are started before any
+  'normal' job; within a lane jobs run in arrival order, and a waiting job is never
+  overtaken by a smaller one behind it, so large final exports cannot starve.
+* Progress: each pipeline stage the job enters (see `mesh_profile.progress_listener`) is
+  passed to `emit` as a progress event, next to the queued/started events.
+* Cancellation: a queued job is dropped; a running job's worker is killed with its whole
+  process group (race engines and voxel workers included) and replaced by a fresh one.
+"""
+import collections
+import os
+import signal
+import sys
+import threading
+import time
+from multiprocessing.connection import wait
+
+PRIORITIES = ('high', 'normal')
+# Seconds to wait for a killed worker to exit before killing it again.
+WORKER_KILL_TIMEOUT = 5.0
+
+class _Job:
+    def __init__(self, job_id, op, args, profile, priority, estimate_mb):
+        self.id = job_id
+        self.op = op
+        self.args = args
+        self.profile = profile
+        self.priority = priority
+        self.estimate_mb = estimate_mb
+        self.queued_at = time.monotonic()
+
+class _Worker:
+    def __init__(self, process, conn):
+        self.process = process
+        self.conn = conn
+        self.ready = False
+        self.job = None
+
+def _worker_main(conn, execute, initializer, initargs):
+    """Worker process body: runs (job_id, op, args, profile) tasks from the pipe until it closes."""
+    import mesh_profile
+    if hasattr(os, 'setpgrp'):
+        # Its own process group, so cancelling a job also stops the processes the job started.
+        os.setpgrp()
+    if initializer is not None:
+        initializer(*initargs)
+    conn.send(('ready', None, None))
+    pid = os.getpid()
+    while True:
+        try:
+            task = conn.recv()
+        except EOFError:
+            return
+        if task is None:
+            return
+        job_id, op, args, profile = task
+        start = time.monotonic()
+
+        def progress(stage_name):
+            # Forked engine processes inherit the listener but must not write to this pipe.
+            if os.getpid() == pid:
+                conn.send(('progress', job_id, (stage_name, round(time.monotonic() - start, 3))))
+
+        with mesh_profile.progress_listener(progress):
+            result = execute(op, args, profile)
+        conn.send(('done', job_id, result))
+
+class JobRunner:
+    """Runs jobs on `workers` processes. execute(op, args, profile) runs a job inside a worker
+    and returns its (picklable) result; emit(message) receives every event and result and is
+    called from the scheduler thread."""
+
+    def __init__(self, workers, execute, emit, context, initializer=None, initargs=(), memory_limit_mb=None, estimate=None):
+        self.execute = execute
+        self.emit = emit
+        self.context = context
+        self.initializer = initializer
+        self.initargs = initargs
+        self.memory_limit_mb = memory_limit_mb
+        self.estimate = estimate or (lambda op, args: 0.0)
+        self._workers = [None] * workers
+        self._lanes = {priority: collections.deque() for priority in PRIORITIES}
+        self._cancels = []
+        self._lock = threading.Lock()
+        self._closing = False
+        self._wakeup_reader, self._wakeup_writer = context.Pipe(duplex=False)
+        self._thread = None
+
+    # --- Called from the serving thread ---
+    def start(self):
+        """Starts every worker, waits until all have warmed up, then starts scheduling."""
+        for index in range(len(self._workers)):
+            self._start_worker(index)
+        for worker in self._workers:
+            worker.conn.recv()
+            worker.ready = True
+        self._thread = threading.Thread(target=self._run, name='mesh-jobs', daemon=True)
+        self._thread.start()
+
+    def submit(self, job_id, op, args, profile=False, priority=None):
+        """Queues a job. priority is 'high' or 'normal'; by default preview-quality jobs are 'high'."""
+        if priority not in PRIORITIES:
+            priority = 'high' if args.get('quality') == 'preview' else 'normal'
+        job = _Job(job_id, op, args, profile, priority, self.estimate(op, args))
+        with self._lock:
+            lane = self._lanes[priority]
+            lane.append(job)
+            position = sum(len(self._lanes[p]) for p in PRIORITIES[:PRIORITIES.index(priority)]) + len(lane)
+        self.emit({'id': job_id, 'event': 'queued', 'priority': priority, 'position': position,
+                   'estimated_mb': round(job.estimate_mb, 1)})
+        self._wake()
+
+    def cancel(self, job_id):
+        """Cancels a queued or running job; it is answered with a 'cancelled' result. Unknown ids are ignored."""
+        with self._lock:
+            self._cancels.append(job_id)
+        self._wake()
+
+    def close(self):
+        """Finishes the queued and running jobs, then stops the workers."""
+        with self._lock:
+            self._closing = True
+        self._wake()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _wake(self):
+        self._wakeup_writer.send_bytes(b'.')
+
+    # --- Scheduler thread ---
+    def _start_worker(self, index):
+        parent_conn, child_conn = self.context.Pipe()
+        process = self.context.Process(target=_worker_main, args=(child_conn, self.execute, self.initializer, self.initargs),
+                                       name=f'mesh-worker-{index}')
+        process.start()
+        child_conn.close()
+        self._workers[index] = _Worker(process, parent_conn)
+
+    def _replace_worker(self, worker):
+        """Kills a worker with its process group and starts a fresh one in its place. The group
+        is killed even when the worker itself has died, since the engines it started may not have.
+        Returns the old worker's exit code."""
+        try:
+            os.killpg(worker.process.pid, signal.SIGKILL)
+        except (AttributeError, ProcessLookupError, PermissionError):
+            # No process groups (Windows), or the worker has not made its group yet (setpgrp in
+            # _worker_main), so there is no group to kill: kill the worker itself.
+            worker.process.kill()
+        worker.process.join(WORKER_KILL_TIMEOUT)
+        if worker.process.is_alive():
+            worker.process.kill()
+            worker.process.join(WORKER_KILL_TIMEOUT)
+        worker.conn.close()
+        self._start_worker(self._workers.index(worker))
+        return worker.process.exitcode
+
+    def _run(self):
+        while True:
+            conns = {worker.conn: worker for worker in self._workers}
+            for conn in wait([self._wakeup_reader, *conns], timeout=1.0):
+                if conn is self._wakeup_reader:
+                    conn.recv_bytes()
+                    continue
+                worker = conns[conn]
+                try:
+                    kind, job_id, payload = conn.recv()
+                except (EOFError, OSError):
+                    self._worker_died(worker)
+                    continue
+                if kind == 'ready':
+                    worker.ready = True
+                elif kind == 'progress' and worker.job is not None and worker.job.id == job_id:
+                    stage_name, elapsed = payload
+                    self.emit({'id': job_id, 'event': 'progress', 'stage': stage_name, 'elapsed_s': elapsed})
+                elif kind == 'done':
+                    worker.job = None
+                    self.emit(self._result(job_id, *payload))
+            with self._lock:
+                self._apply_cancels()
+                self._schedule()
+                if self._closing and not any(self._lanes.values()) and not any(w.job for w in self._workers):
+                    break
+        for worker in self._workers:
+            try:
+                worker.conn.send(None)
+            except OSError:
+                pass
+        for worker in self._workers:
+            worker.process.join()
+
+    def _worker_died(self, worker):
+        code = self._replace_worker(worker)
+        print(f"[Mesh Jobs] Worker process died (exit code {code}). Started a new one.", file=sys.stderr)
+        if worker.job is not None:
+            self.emit(self._result(worker.job.id, False, '', '', f"Worker process died (exit code {code}).", None))
+
+    def _apply_cancels(self):
+        for job_id in self._cancels:
+            queued = False
+            for lane in self._lanes.values():
+                for job in [job for job in lane if job.id == job_id]:
+                    lane.remove(job)
+                    queued = True
+            running = [worker for worker in self._workers if worker.job is not None and worker.job.id == job_id]
+            for worker in running:
+                print(f"[Mesh Jobs] Cancelling running job {job_id}. Restarting its worker...", file=sys.stderr)
+                self._replace_worker(worker)
+            if queued or running:
+                self.emit({**self._result(job_id, False, '', '', 'Job cancelled.', None), 'cancelled': True})
+        self._cancels.clear()
+
+    def _schedule(self):
+        """Starts queued jobs, highest lane first, while a worker is idle and memory allows."""
+        while True:
+            idle = [worker for worker in self._workers if worker.ready and worker.job is None]
+            lane = next((self._lanes[p] for p in PRIORITIES if self._lanes[p]), None)
+            if not idle or lane is None:
+                return
+            job = lane[0]
+            reserved = sum(worker.job.estimate_mb for worker in self._workers if worker.job is not None)
+            if self.memory_limit_mb and reserved and reserved + job.estimate_mb > self.memory_limit_mb:
+                return
+            lane.popleft()
+            worker = idle[0]
+            worker.job = job
+            worker.conn.send((job.id, job.op, job.args, job.profile))
+            self.emit({'id': job.id, 'event': 'started', 'queued_s': round(time.monotonic() - job.queued_at, 3),
+                       'reserved_mb': round(reserved + job.estimate_mb, 1)})
+
+    @staticmethod
+    def _result(job_id, ok, stdout, stderr, error, report):
+        return {'id': job_id, 'ok': ok, 'stdout': stdout, 'stderr': stderr, 'error': error, 'report': report}
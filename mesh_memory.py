@@ -0,0 +1,140 @@
+"""Compact mesh buffers and the peak-memory budget for boolean jobs.
+
+trimesh always holds float64 vertices and int64 faces, but most stored and transferred
+meshes do not need that: STL coordinates are float32 to begin with and face indices fit
+in int32. `compact_arrays` narrows both whenever that loses nothing, and is used for the
+mesh cache and for the arrays race-mode engines send back to the parent.
+
+A job can be given a peak-memory budget (`--memory-budget`, BOLLER_MEMORY_BUDGET_MB).
+`estimate_load_mb` and `estimate_boolean_mb` predict the job's peak from face counts
+(per-face costs measured on subdivided copies of the bundled models). Loading only runs
+on a mesh cache miss and cannot be made cheaper, so a load over budget fails right away.
+For the boolean, `plan_budget` picks the cheapest way to stay under the budget: crop to
+the logo region, then run the engines one after another instead of racing them, then the
+preview quality tier. A job that cannot fit even then fails with MemoryBudgetError
+instead of being OOM-killed.
+
+The mesh worker's job runner uses `estimate_job_mb` to decide how many jobs may run at
+once within its memory limit (see mesh_jobs).
+"""
+import os
+import sys
+
+import numpy as np
+
+DEFAULT_MEMORY_BUDGET_MB = float(os.environ['BOLLER_MEMORY_BUDGET_MB']) if os.environ.get('BOLLER_MEMORY_BUDGET_MB') else None
+# Peak bytes per face above the resident meshes: reading and merging a binary or ASCII STL
+# (stl_io's memory-mapped reader), one engine run
+# (conversion, boolean and conversion back), and the passes over the whole model or result
+# (diagnose, heal, crop split/stitch, export), which crop cannot avoid.
+LOAD_BYTES_PER_FACE = 230
+ASCII_LOAD_BYTES_PER_FACE = 360
+ENGINE_BYTES_PER_FACE = 520
+WHOLE_MESH_BYTES_PER_FACE = 560
+# One-off cost of importing PyVista/VTK in a process that has not loaded them yet.
+PYVISTA_IMPORT_MB = 70
+# An ASCII STL facet (normal, three vertices and keywords) takes roughly this many bytes.
+ASCII_BYTES_PER_FACE = 250
+MB = 1024 * 1024
+
+class MemoryBudgetError(Exception):
+    """The job would exceed its memory budget (loading a mesh, or the boolean even when degraded)."""
+
+def compact_arrays(vertices, faces):
+    """Returns (vertices, faces) narrowed to float32/int32 where that is lossless."""
+    vertices = np.asarray(vertices)
+    faces = np.asarray(faces)
+    if faces.dtype != np.int32 and (faces.size == 0 or faces.max() < np.iinfo(np.int32).max):
+        faces = faces.astype(np.int32)
+    if vertices.dtype != np.float32:
+        narrowed = vertices.astype(np.float32)
+        if np.array_equal(narrowed, vertices):
+            vertices = narrowed
+    return vertices, faces
+
+def current_rss_mb():
+    """Resident set size of this process in MB (the peak so far where the current value is unknown)."""
+    try:
+        with open('/proc/self/statm', 'r') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / MB
+    except (OSError, ValueError, IndexError):
+        from mesh_profile import peak_rss_mb
+        return peak_rss_mb() or 0.0
+
+def stl_face_count(file_path):
+    """Face count of a binary STL, or an estimate from the file size for ASCII."""
+    from stl_io import STL_COUNT_SIZE, STL_HEADER_SIZE, STL_RECORD_DTYPE, is_binary_stl
+    size = os.path.getsize(file_path)
+    if is_binary_stl(file_path):
+        return (size - STL_HEADER_SIZE - STL_COUNT_SIZE) // STL_RECORD_DTYPE.itemsize
+    return size // ASCII_BYTES_PER_FACE
+
+def estimate_load_mb(file_path):
+    """Additional peak MB for loading an STL file."""
+    from stl_io import is_binary_stl
+    per_face = LOAD_BYTES_PER_FACE if is_binary_stl(file_path) else ASCII_LOAD_BYTES_PER_FACE
+    return stl_face_count(file_path) * per_face / MB
+
+def estimate_boolean_mb(model_faces, tool_faces, engine_faces, engines=1, pyvista_loaded=None):
+    """Additional peak MB for a boolean whose engines see engine_faces model faces.
+    engines is how many run at once (race mode runs them side by side). The engine runs and
+    the whole-mesh passes happen one after another, so the larger of the two sets the peak.
+    pyvista_loaded defaults to whether this process has imported PyVista."""
+    engine_mb = engines * (engine_faces + tool_faces) * ENGINE_BYTES_PER_FACE / MB
+    whole_mb = (model_faces + tool_faces) * WHOLE_MESH_BYTES_PER_FACE / MB
+    if pyvista_loaded is None:
+        pyvista_loaded = 'pyvista' in sys.modules
+    return max(engine_mb, whole_mb) + (0.0 if pyvista_loaded else PYVISTA_IMPORT_MB)
+
+def estimate_job_mb(op, args):
+    """Additional peak MB of a mesh worker job ('boolean', 'repair' or 'subtract') from the face
+    counts of its input files, capped at the job's own memory budget. Worker processes keep
+    PyVista loaded, so its import is not counted. Returns 0.0 if the inputs cannot be read."""
+    try:
+        if op == 'boolean':
+            logos = args['logo_file_path']
+            logos = [logos] if isinstance(logos, str) else list(logos)
+            model_faces = stl_face_count(args['model_file_path'])
+            tool_faces = sum(stl_face_count(path) for path in logos)
+            engines = 2 if args.get('engine_mode') == 'race' else 1
+            estimate = (max(estimate_load_mb(path) for path in [args['model_file_path'], *logos])
+                        + estimate_boolean_mb(model_faces, tool_faces, model_faces, engines, pyvista_loaded=True))
+        elif op in ('repair', 'subtract'):
+            paths = [args['input_file']] if op == 'repair' else [args['model_file'], args['tool_file']]
+            faces = sum(stl_face_count(path) for path in paths)
+            estimate = sum(estimate_load_mb(path) for path in paths) + faces * WHOLE_MESH_BYTES_PER_FACE / MB
+        else:
+            return 0.0
+    except (OSError, KeyError, TypeError, ValueError):
+        return 0.0
+    budget = args.get('memory_budget')
+    return min(estimate, budget) if budget else estimate
+
+def available_memory_mb():
+    """Memory available to new work (MemAvailable) in MB, or None where it cannot be read."""
+    try:
+        with open('/proc/meminfo', 'r') as f:
+            for line in f:
+                if line.startswith('MemAvailable:'):
+                    return int(line.split()[1]) / 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return None
+
+def plan_budget(budget_mb, estimate, options, baseline_mb=0.0):
+    """Applies degradations until baseline_mb + estimate(**settings) fits in budget_mb.
+
+    options is a list of (name, settings) steps, each merged into the settings so far.
+    Returns (settings, steps taken, estimated peak MB); raises MemoryBudgetError if nothing fits.
+    """
+    settings, taken = {}, []
+    peak = baseline_mb + estimate(**settings)
+    for name, step in options:
+        if peak <= budget_mb:
+            break
+        settings.update(step)
+        taken.append(name)
+        peak = baseline_mb + estimate(**settings)
+    if peak > budget_mb:
+        raise MemoryBudgetError(f"needs about {peak:.0f} MB, over the {budget_mb:.0f} MB budget even after {', '.join(taken) or 'no degradation'}.")
+    return settings, taken, peak
@@ -0,0 +1,182 @@
+"""Preflight check: does the logo actually reach into the model?
+
+A logo placed beside the model or floating above it makes every boolean engine
+fail (or return the model unchanged), but only after the full heal/boolean/fallback
+chain. `preflight_overlap` answers the question in milliseconds from a spatial index
+over the model surface, so such jobs can be rejected up front.
+
+The index (`ModelIndex`) is VTK's cell locator behind vtkImplicitPolyDataDistance:
+exact signed distances from query points to the model surface. Indexes are kept per
+model digest, so the mesh worker and batch mode build one once per model and reuse
+it for every logo.
+
+The logo surface is sampled with area weights, so the report includes an estimate
+of the logo surface area that lies inside the model. Samples can all miss the model
+when only part of the model reaches into the logo (a rib poking through the side of a
+box logo), so before a logo is reported as not touching, `model_reaches_logo` also
+tests the model vertices near the logo for containment and looks for edges of either
+surface that cross the other.
+"""
+from collections import OrderedDict
+
+import numpy as np
+
+from mesh_vtk import polydata_from_arrays
+
+# Logo sample points per face (barycentric pattern) while the logo is small enough.
+LOGO_PATTERN_MAX_FACES = 20000
+# Model indexes kept in memory (per model digest).
+INDEX_CACHE_SIZE = 8
+
+_BARYCENTRIC_PATTERN = np.array([
+    [1 / 3, 1 / 3, 1 / 3],
+    [2 / 3, 1 / 6, 1 / 6], [1 / 6, 2 / 3, 1 / 6], [1 / 6, 1 / 6, 2 / 3],
+    [1 / 2, 1 / 2, 0.0], [0.0, 1 / 2, 1 / 2], [1 / 2, 0.0, 1 / 2],
+])
+
+class PreflightError(Exception):
+    """Raised when a logo cannot produce a boolean result with the model."""
+
+class ModelIndex:
+    """Spatial index over a closed model surface for signed distance queries.
+
+    Wraps VTK's vtkImplicitPolyDataDistance, which builds a static cell locator (a
+    bounding volume hierarchy over the triangles) once and answers exact closest-point
+    queries, signed by the pseudo-normal at the closest point (negative inside).
+    """
+
+    def __init__(self, vertices, faces):
+        from vtkmodules.vtkFiltersCore import vtkImplicitPolyDataDistance
+
+        self.vertices = np.asarray(vertices, dtype=np.float64)
+        self.faces = np.asarray(faces)
+        self.bounds = np.array([self.vertices.min(axis=0), self.vertices.max(axis=0)])
+        self.scale = float(np.linalg.norm(self.bounds[1] - self.bounds[0]))
+        self._polydata = polydata_from_arrays(self.vertices, self.faces)
+        self._distance = vtkImplicitPolyDataDistance()
+        self._distance.SetInput(self._polydata)
+        self._locator = None
+
+    def signed_distance(self, points):
+        """Signed distance from each (n, 3) point to the surface (negative inside)."""
+        from vtkmodules.util.numpy_support import numpy_to_vtk, vtk_to_numpy
+        from vtkmodules.vtkCommonCore import vtkDoubleArray
+
+        values = vtkDoubleArray()
+        self._distance.FunctionValue(numpy_to_vtk(np.ascontiguousarray(points, dtype=np.float64), deep=True), values)
+        return vtk_to_numpy(values).copy()
+
+    def query(self, points):
+        """Returns (distance to the surface, inside flag) for each (n, 3) point."""
+        signed = self.signed_distance(points)
+        return np.abs(signed), signed < 0
+
+    def crosses_any(self, starts, ends):
+        """True if any of the segments starts[i]-ends[i] crosses the surface (line queries on a
+        static cell locator, built on first use)."""
+        if self._locator is None:
+            from vtkmodules.vtkCommonDataModel import vtkStaticCellLocator
+
+            self._locator = vtkStaticCellLocator()
+            self._locator.SetDataSet(self._polydata)
+            self._locator.BuildLocator()
+        return any(self._locator.IntersectWithLine(tuple(a), tuple(b), 0.0, None, None) for a, b in zip(starts, ends))
+
+_index_cache = OrderedDict()
+
+def model_index(model_mesh, digest=None):
+    """Returns the ModelIndex for a model, reusing the one built for the same digest."""
+    if digest is not None and digest in _index_cache:
+        _index_cache.move_to_end(digest)
+        return _index_cache[digest]
+    index = ModelIndex(model_mesh.vertices, model_mesh.faces)
+    if digest is not None:
+        _index_cache[digest] = index
+        while len(_index_cache) > INDEX_CACHE_SIZE:
+            _index_cache.popitem(last=False)
+    return index
+
+def logo_samples(logo_mesh):
+    """Area-weighted sample points on the logo surface. Returns (points, area per point)."""
+    triangles = np.asarray(logo_mesh.triangles, dtype=np.float64)
+    area = np.asarray(logo_mesh.area_faces, dtype=np.float64)
+    if len(triangles) > LOGO_PATTERN_MAX_FACES:
+        return triangles.mean(axis=1), area
+    points = np.einsum('pc,fcj->fpj', _BARYCENTRIC_PATTERN, triangles).reshape(-1, 3)
+    return points, np.repeat(area / len(_BARYCENTRIC_PATTERN), len(_BARYCENTRIC_PATTERN))
+
+def _unique_edges(faces):
+    edges = np.sort(np.asarray(faces)[:, [[0, 1], [1, 2], [2, 0]]].reshape(-1, 2), axis=1)
+    return np.unique(edges, axis=0)
+
+def _edges_cross(index, vertices, distance, faces):
+    """True if an edge of faces crosses the surface of index. distance holds each vertex's
+    distance to that surface; distances change no faster than position, so an edge ab can
+    only cross when distance[a] + distance[b] <= |ab|, and only those edges are traced."""
+    edges = _unique_edges(faces)
+    starts, ends = vertices[edges[:, 0]], vertices[edges[:, 1]]
+    lengths = np.linalg.norm(ends - starts, axis=1)
+    candidates = distance[edges[:, 0]] + distance[edges[:, 1]] <= lengths * (1 + 1e-9)
+    return index.crosses_any(starts[candidates], ends[candidates])
+
+def model_reaches_logo(index, logo_mesh):
+    """True when part of the model lies inside the logo or the two surfaces cross.
+
+    Only model faces whose bounding boxes overlap the logo's are looked at: their vertices
+    are tested for containment in the logo, then their edges are traced against the logo
+    surface and the logo's edges against the model surface.
+    """
+    logo_bounds = np.asarray(logo_mesh.bounds)
+    triangles = index.vertices[index.faces]
+    near = np.all(triangles.min(axis=1) <= logo_bounds[1], axis=1) & np.all(triangles.max(axis=1) >= logo_bounds[0], axis=1)
+    del triangles
+    if not near.any():
+        return False
+    faces = index.faces[near]
+    used = np.unique(faces)
+    logo_index = ModelIndex(logo_mesh.vertices, logo_mesh.faces)
+    near_distance, near_inside = logo_index.query(index.vertices[used])
+    if near_inside.any():
+        return True
+    distance_to_logo = np.zeros(len(index.vertices))
+    distance_to_logo[used] = near_distance
+    if _edges_cross(logo_index, index.vertices, distance_to_logo, faces):
+        return True
+    distance_to_model, _ = index.query(logo_index.vertices)
+    return _edges_cross(index, logo_index.vertices, distance_to_model, logo_index.faces)
+
+def preflight_overlap(index, logo_mesh):
+    """Measures how much of the logo lies inside the model.
+
+    Returns a dict with the logo surface area inside the model, the inside fraction,
+    the gap between logo and model (0 when they touch or overlap) and whether the model
+    reaches into the logo where no logo sample is inside the model.
+    """
+    logo_bounds = np.asarray(logo_mesh.bounds)
+    report = {'logo_area': float(logo_mesh.area), 'overlap_area': 0.0, 'overlap_fraction': 0.0, 'gap': None, 'bbox_overlap': True,
+              'model_reaches_logo': False}
+    if np.any(logo_bounds[0] > index.bounds[1]) or np.any(logo_bounds[1] < index.bounds[0]):
+        report['bbox_overlap'] = False
+        return report
+    points, weights = logo_samples(logo_mesh)
+    distance, inside = index.query(points)
+    overlap_area = float(weights[inside].sum())
+    report['overlap_area'] = overlap_area
+    report['overlap_fraction'] = overlap_area / report['logo_area'] if report['logo_area'] > 0 else 0.0
+    report['gap'] = 0.0 if inside.any() else float(distance.min())
+    if report['gap'] > 0.0 and model_reaches_logo(index, logo_mesh):
+        report['model_reaches_logo'] = True
+        report['gap'] = 0.0
+    return report
+
+def check_overlap(index, logo_mesh, operation, name="logo"):
+    """Raises PreflightError when the logo cannot produce a result; returns the overlap report."""
+    report = preflight_overlap(index, logo_mesh)
+    tol = max(index.scale * 1e-6, 1e-9)
+    if not report['bbox_overlap']:
+        raise PreflightError(f"{name} lies completely outside the model's bounding box.")
+    if report['overlap_area'] <= 0.0 and report['gap'] > tol:
+        raise PreflightError(f"{name} does not touch the model (closest gap {report['gap']:.4g} model units).")
+    if operation == 'subtraction' and report['overlap_fraction'] >= 1.0:
+        print(f"[Preflight] Warning: {name} lies entirely inside the model; subtracting it leaves a closed internal void.")
+    return report
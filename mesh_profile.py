@@ -0,0 +1,196 @@
+"""Per-stage timing and memory reports for the mesh scripts.
+
+A run is wrapped in `profiling(...)`, which makes a `RunReport` the active report.
+Pipeline code marks its stages with `stage(...)` and adds run-level facts with
+`annotate(...)` / `note_fallback(...)`; all three are no-ops when no report is
+active, so the scripts pay nothing unless `--profile` / `--report-json` is used
+(or the server asks the mesh worker for a report).
+
+Each stage records wall and CPU time (including finished child processes, e.g. the
+race engines), peak RSS after the stage, and face/vertex counts of its input and
+output mesh. `note_diagnostics(...)` adds the mesh diagnostics taken before each
+heal. The report is plain JSON-serialisable data (`RunReport.to_dict`).
+Peak RSS is the process high-water mark, so in a long-lived mesh worker it covers
+earlier jobs too.
+
+Independently of reports, `progress_listener(callback)` has every stage call
+`callback(name)` as it starts; the mesh worker forwards these as progress events.
+"""
+import contextlib
+import json
+import os
+import sys
+import time
+
+try:
+    import resource
+except ImportError:  # Not available on Windows; peak RSS is then reported as null
+    resource = None
+
+REPORT_VERSION = 1
+
+_active_report = None
+_progress_callback = None
+
+def _cpu_seconds():
+    """CPU time of this process plus its waited-for children."""
+    t = os.times()
+    return t.user + t.system + t.children_user + t.children_system
+
+def peak_rss_mb(who=None):
+    """Peak resident set size in MB for this process (or its children), or None if unknown."""
+    if resource is None:
+        return None
+    usage = resource.getrusage(resource.RUSAGE_SELF if who is None else who)
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    divisor = 1024 * 1024 if sys.platform == 'darwin' else 1024
+    return round(usage.ru_maxrss / divisor, 1)
+
+def mesh_counts(mesh):
+    """Returns (faces, vertices) for a trimesh.Trimesh or pyvista.PolyData, or (None, None)."""
+    if mesh is None:
+        return None, None
+    if hasattr(mesh, 'n_cells'):
+        return int(mesh.n_cells), int(mesh.n_points)
+    if hasattr(mesh, 'faces') and hasattr(mesh, 'vertices'):
+        return len(mesh.faces), len(mesh.vertices)
+    return None, None
+
+class StageRecord:
+    """Timing and mesh size record for one pipeline stage."""
+
+    def __init__(self, name, mesh_in=None):
+        self.name = name
+        self.faces_in, self.vertices_in = mesh_counts(mesh_in)
+        self.faces_out = self.vertices_out = None
+        self.wall_s = self.cpu_s = self.peak_rss_mb = None
+        self.ok = True
+
+    def output(self, mesh):
+        """Records the stage's output mesh size. Returns the mesh for convenient chaining."""
+        self.faces_out, self.vertices_out = mesh_counts(mesh)
+        return mesh
+
+    def to_dict(self):
+        return dict(vars(self))
+
+class _NullStage:
+    """Stand-in used when no report is active."""
+    def output(self, mesh):
+        return mesh
+
+_NULL_STAGE = _NullStage()
+
+class RunReport:
+    """Collects stage records and run-level facts for one script run or worker job."""
+
+    def __init__(self, script):
+        self.script = script
+        self.info = {}
+        self.fallbacks = []
+        self.diagnostics = {}
+        self.stages = []
+        self._start_wall = time.perf_counter()
+        self._start_cpu = _cpu_seconds()
+        self.wall_s = self.cpu_s = None
+
+    def finish(self):
+        self.wall_s = round(time.perf_counter() - self._start_wall, 4)
+        self.cpu_s = round(_cpu_seconds() - self._start_cpu, 4)
+
+    def to_dict(self):
+        return {
+            'report_version': REPORT_VERSION,
+            'script': self.script,
+            **self.info,
+            'wall_s': self.wall_s,
+            'cpu_s': self.cpu_s,
+            'peak_rss_mb': peak_rss_mb(),
+            'peak_children_rss_mb': peak_rss_mb(resource.RUSAGE_CHILDREN) if resource is not None else None,
+            'fallbacks': list(self.fallbacks),
+            'diagnostics': dict(self.diagnostics),
+            'stages': [record.to_dict() for record in self.stages],
+        }
+
+    def format_table(self):
+        """Returns a human-readable per-stage summary."""
+        lines = [f"[Profile] {self.script}: wall {self.wall_s}s, cpu {self.cpu_s}s, peak RSS {peak_rss_mb()} MB"]
+        for record in self.stages:
+            sizes = f"faces {record.faces_in} -> {record.faces_out}" if record.faces_in is not None or record.faces_out is not None else ""
+            status = "" if record.ok else " FAILED"
+            lines.append(f"[Profile]   {record.name:<32} wall {record.wall_s:>8.4f}s  cpu {record.cpu_s:>8.4f}s  {sizes}{status}")
+        if self.fallbacks:
+            lines.append(f"[Profile]   fallbacks: {', '.join(self.fallbacks)}")
+        return "\n".join(lines)
+
+# --- Active Report API ---
+@contextlib.contextmanager
+def profiling(script):
+    """Makes a new RunReport the active report for the duration of the block."""
+    global _active_report
+    previous = _active_report
+    report = RunReport(script)
+    _active_report = report
+    try:
+        yield report
+    finally:
+        report.finish()
+        _active_report = previous
+
+@contextlib.contextmanager
+def progress_listener(callback):
+    """Calls callback(stage_name) as each stage starts, for the duration of the block."""
+    global _progress_callback
+    previous = _progress_callback
+    _progress_callback = callback
+    try:
+        yield
+    finally:
+        _progress_callback = previous
+
+@contextlib.contextmanager
+def stage(name, mesh_in=None):
+    """Times a pipeline stage in the active report. Yields a record whose output(mesh)
+    notes the result size; does nothing when no report is active."""
+    if _progress_callback is not None:
+        _progress_callback(name)
+    report = _active_report
+    if report is None:
+        yield _NULL_STAGE
+        return
+    record = StageRecord(name, mesh_in)
+    start_wall = time.perf_counter()
+    start_cpu = _cpu_seconds()
+    try:
+        yield record
+    except BaseException:
+        record.ok = False
+        raise
+    finally:
+        record.wall_s = round(time.perf_counter() - start_wall, 4)
+        record.cpu_s = round(_cpu_seconds() - start_cpu, 4)
+        record.peak_rss_mb = peak_rss_mb()
+        report.stages.append(record)
+
+def annotate(**info):
+    """Adds run-level facts (operation, engine, ...) to the active report."""
+    if _active_report is not None:
+        _active_report.info.update(info)
+
+def note_fallback(description):
+    """Records a fallback taken (e.g. 'trimesh->pyvista') in the active report."""
+    if _active_report is not None:
+        _active_report.fallbacks.append(description)
+
+def note_diagnostics(name, diagnostics):
+    """Records the diagnostics dict of a named mesh (e.g. before healing it) in the active report."""
+    if _active_report is not None:
+        _active_report.diagnostics[name] = diagnostics
+
+def emit_report(report, profile=False, report_json=None):
+    """CLI helper: prints the summary table to stderr and/or writes the JSON report."""
+    if profile:
+        print(report.format_table(), file=sys.stderr)
+    if report_json:
+        with open(report_json, 'w', encoding='utf-8') as f:
+            json.dump(report.to_dict(), f, indent=2)
@@ -0,0 +1,121 @@
+"""Quality tiers: simplify meshes to a geometric tolerance before the boolean.
+
+Logos extruded from SVG curves carry many more triangles than a preview needs, and
+every face goes through the boolean engines. A quality tier sets how far the logo
+(and, in preview, the cropped model region) may deviate from the input:
+
+* preview  -- coarse logo and model region, for interactive feedback while placing a logo,
+* standard -- lightly simplified logo,
+* final    -- full resolution (the default; used for exports that get printed).
+
+Tolerances are absolute, in model units (mm for the bundled models). A simplified
+mesh is only used if it is still clean (see mesh_diagnostics) and stays within the
+tolerance of the original in both directions; otherwise the original is kept.
+"""
+import numpy as np
+
+from mesh_diagnostics import diagnose
+from mesh_vtk import arrays_from_polydata, polydata_from_arrays
+
+QUALITY_TIERS = {
+    'preview': {'logo_tolerance': 0.1, 'region_tolerance': 0.05},
+    'standard': {'logo_tolerance': 0.02, 'region_tolerance': None},
+    'final': {'logo_tolerance': None, 'region_tolerance': None},
+}
+QUALITY_NAMES = tuple(QUALITY_TIERS)
+DEFAULT_QUALITY = 'final'
+# Reductions tried from the mildest up; the last one still within tolerance wins, so a mesh
+# that cannot be simplified costs a single attempt.
+REDUCTION_STEPS = (0.25, 0.5, 0.75, 0.9)
+
+def deviation(vertices_a, faces_a, vertices_b, faces_b):
+    """Two-sided deviation between two surfaces, measured at vertices and face centroids."""
+    from mesh_preflight import ModelIndex
+
+    def one_way(points_vertices, points_faces, index):
+        points = np.vstack([points_vertices, points_vertices[points_faces].mean(axis=1)])
+        return float(np.abs(index.signed_distance(points)).max())
+
+    return max(one_way(vertices_a, faces_a, ModelIndex(vertices_b, faces_b)),
+               one_way(vertices_b, faces_b, ModelIndex(vertices_a, faces_a)))
+
+def _quiet_vtk():
+    from vtkmodules.vtkCommonCore import vtkObject
+    vtkObject.GlobalWarningDisplayOff()  # Decimation warns about every skipped vertex
+
+def simplify_mesh(mesh, tolerance):
+    """Simplifies a closed trimesh.Trimesh with quadric decimation, as far as the tolerance allows.
+    Returns the original mesh if no reduction stays clean and within tolerance."""
+    import trimesh
+    from vtkmodules.vtkFiltersCore import vtkQuadricDecimation
+
+    if tolerance is None or mesh.is_empty:
+        return mesh
+    _quiet_vtk()
+    source = polydata_from_arrays(mesh.vertices, mesh.faces)
+    best = mesh
+    for reduction in REDUCTION_STEPS:
+        decimate = vtkQuadricDecimation()
+        decimate.SetInputData(source)
+        decimate.SetTargetReduction(reduction)
+        decimate.VolumePreservationOn()
+        decimate.Update()
+        vertices, faces = arrays_from_polydata(decimate.GetOutput())
+        if len(faces) == 0 or not diagnose(vertices, faces).is_clean:
+            break
+        if deviation(mesh.vertices, mesh.faces, vertices, faces) > tolerance:
+            break
+        best = trimesh.Trimesh(vertices=vertices, faces=faces, process=False)
+    return best
+
+def simplify_open_surface(vertices, faces, tolerance, accept=None):
+    """Simplifies an open surface without touching its boundary, e.g. the model faces inside a
+    crop box, whose boundary is the seam shared with the rest of the model.
+
+    vtkDecimatePro only deletes vertices (it never moves them), and boundary vertex deletion is
+    off, so the result maps back onto the input vertex array. accept(new_faces) is an optional
+    extra check on each candidate (e.g. that the crop seam survives). Returns new faces indexing
+    into `vertices` (the input faces if no reduction stays within tolerance).
+    """
+    from scipy.spatial import cKDTree
+    from vtkmodules.vtkFiltersCore import vtkDecimatePro
+
+    faces = np.asarray(faces)
+    if tolerance is None or len(faces) == 0:
+        return faces
+    _quiet_vtk()
+    used = np.unique(faces)
+    local = np.searchsorted(used, faces)
+    source = polydata_from_arrays(vertices[used], local)
+    boundary = _boundary_edges(faces)
+    vertex_tree = cKDTree(vertices[used])
+    best = faces
+    for reduction in REDUCTION_STEPS:
+        decimate = vtkDecimatePro()
+        decimate.SetInputData(source)
+        decimate.SetTargetReduction(reduction)
+        decimate.PreserveTopologyOn()
+        decimate.SplittingOff()
+        decimate.BoundaryVertexDeletionOff()
+        decimate.Update()
+        out_vertices, out_faces = arrays_from_polydata(decimate.GetOutput())
+        if len(out_faces) == 0:
+            break
+        distances, nearest = vertex_tree.query(out_vertices)
+        if np.any(distances > 0.0):
+            break  # A vertex moved; the result no longer maps onto the input
+        new_faces = used[nearest[out_faces]]
+        if not np.array_equal(_boundary_edges(new_faces), boundary):
+            break
+        if accept is not None and not accept(new_faces):
+            break
+        if deviation(vertices[used], local, out_vertices, out_faces) > tolerance:
+            break
+        best = new_faces
+    return best
+
+def _boundary_edges(faces):
+    """Sorted (n, 2) array of the edges used by exactly one face."""
+    edges = np.sort(np.asarray(faces)[:, [0, 1, 1, 2, 2, 0]].reshape(-1, 2), axis=1)
+    unique_edges, counts = np.unique(edges, axis=0, return_counts=True)
+    return unique_edges[counts == 1]
@@ -0,0 +1,42 @@
+"""Offset models and the thin band used by thin intersection.
+
+A thin intersection keeps the part of the logo that lies inside both the model and a copy
+of the model offset by thickness_delta, so the logo starts at the outer surface and stops
+thickness_delta short of the back (downward-facing) surface. That common part of model and
+offset copy -- the thin band -- depends only on the model, so it can be built once and every
+logo needs a single boolean against it instead of two against the full model.
+
+Offset modes:
+
+* z      -- the copy is shifted up by thickness_delta (the original behaviour). On a sloped
+            back surface the margin measured along the normal shrinks to thickness_delta * |n_z|.
+* normal -- each vertex moves thickness_delta along its normal: inward on downward-facing
+            surfaces, outward everywhere else, so the margin is thickness_delta on any slope.
+            Between n_z = 0 and n_z = -NORMAL_BLEND_NZ the move blends from outward to inward,
+            so the offset surface crosses the model transversally there instead of grazing
+            it (grazing contact makes the boolean engines fail).
+"""
+import numpy as np
+
+THIN_OFFSET_MODES = ('z', 'normal')
+DEFAULT_THIN_OFFSET = 'z'
+# Downward n_z beyond which a vertex moves the full thickness_delta inward in 'normal' mode.
+NORMAL_BLEND_NZ = 0.25
+
+def offset_vertices(vertices, vertex_normals, thickness_delta, mode=DEFAULT_THIN_OFFSET):
+    """Returns the offset copy's vertices for the given mode (see the module docstring)."""
+    vertices = np.asarray(vertices, dtype=np.float64)
+    if mode == 'z':
+        return vertices + np.array([0.0, 0.0, thickness_delta])
+    if mode != 'normal':
+        raise ValueError(f"Unknown thin offset mode '{mode}'.")
+    normals = np.asarray(vertex_normals, dtype=np.float64)
+    side = np.clip(2.0 * normals[:, 2] / NORMAL_BLEND_NZ + 1.0, -1.0, 1.0)
+    return vertices + normals * (thickness_delta * side)[:, None]
+
+def offset_model_mesh(model_mesh, thickness_delta, mode=DEFAULT_THIN_OFFSET):
+    """Returns the offset copy of a trimesh.Trimesh model (same faces, moved vertices)."""
+    import trimesh
+    normals = model_mesh.vertex_normals if mode == 'normal' else None
+    vertices = offset_vertices(model_mesh.vertices, normals, thickness_delta, mode)
+    return trimesh.Trimesh(vertices=vertices, faces=np.asarray(model_mesh.faces), process=False)
@@ -0,0 +1,257 @@
+"""Voxel/SDF boolean engine: the last resort when the exact engines fail.
+
+The exact engines need closed, clean meshes and still fail on some logo extrusions (open
+or self-intersecting SVG outlines, grazing contact). This engine samples both meshes on
+one regular grid instead, so its run time and memory depend on the grid size, not on how
+broken the input is:
+
+1. The grid covers the region the result can occupy: the model for a difference, the
+   overlap of both bounding boxes for an intersection, both boxes for a union. Its pitch
+   is the longest side of the overlap box divided by the resolution, coarsened when the
+   grid would exceed VOXEL_MAX_CELLS points.
+2. Each mesh is sampled along the grid lines of all three axes. A line's crossings with the
+   triangles give inside/outside by parity and the distance to the nearest crossing along
+   the line. A grid point is inside when at least two of the three axes say so, which
+   tolerates holes and stray faces, and its value is the smallest of the three distances
+   (in cells, clamped to one): an approximate signed distance, negative inside.
+3. The two fields are combined with max(a, -b) (difference), max(a, b) (intersection) or
+   min(a, b) (union), and VTK's flying edges (marching cubes) extracts the zero surface.
+
+The grid lines are sampled in blocks of about SAMPLE_BLOCK_CELLS points, spread over
+worker processes when the grid is large enough to pay for starting them.
+
+The voxel surface only approximates the model, so for a difference subtract_script does not
+voxelize the whole model: it passes the model clipped to the overlap box plus a few cells and
+bridges the result back into the exact model (mesh_crop.bridged_boolean).
+"""
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+DEFAULT_VOXEL_RESOLUTION = int(os.environ.get('BOLLER_VOXEL_RESOLUTION', '128'))
+VOXEL_OPERATIONS = ('difference', 'intersection', 'union')
+# Cap on grid points. Sampling holds about 9 bytes per point (one finished field, plus the
+# votes and distances of the mesh being sampled), so this bounds the engine at about 75 MB.
+VOXEL_MAX_CELLS = 8_000_000
+VOXEL_WORKERS = max(1, min(4, os.cpu_count() or 1))
+# Grid points per sampling task, and (triangle, grid line) pairs tested at once.
+SAMPLE_BLOCK_CELLS = 1 << 20
+CANDIDATE_CHUNK = 1 << 18
+# Empty cells around the region, so the surface closes inside the grid.
+GRID_PADDING = 2
+# Fraction of a cell the grid is shifted by, so grid lines miss the edges and vertices of
+# axis-aligned (CAD) meshes, where parity would count a crossing twice.
+GRID_OFFSET = np.array([0.5031415, 0.5027183, 0.5014142])
+# Smallest field value magnitude, in cells. Around a grid point on (or within float32 rounding
+# of) the zero level, every edge would put its own vertex at the same spot, and merging those
+# leaves non-manifold edges.
+SURFACE_CLEARANCE = 1e-3
+
+def overlap_bounds(bounds_a, bounds_b):
+    """Returns the (2, 3) overlap of two boxes, or None when they do not overlap."""
+    bounds_a, bounds_b = np.asarray(bounds_a, dtype=np.float64), np.asarray(bounds_b, dtype=np.float64)
+    overlap = np.array([np.maximum(bounds_a[0], bounds_b[0]), np.minimum(bounds_a[1], bounds_b[1])])
+    return None if np.any(overlap[1] <= overlap[0]) else overlap
+
+def voxel_grid(bounds_a, bounds_b, operation, resolution, max_cells=VOXEL_MAX_CELLS):
+    """Returns the sampling grid (origin, pitch, shape) for a boolean of two meshes with these
+    (2, 3) bounds, or None when the result is empty (an intersection of disjoint boxes).
+    Grid point (i, j, k) lies at origin + (i, j, k) * pitch."""
+    if operation not in VOXEL_OPERATIONS:
+        raise ValueError(f"Unknown voxel operation '{operation}'.")
+    bounds_a, bounds_b = np.asarray(bounds_a, dtype=np.float64), np.asarray(bounds_b, dtype=np.float64)
+    overlap = overlap_bounds(bounds_a, bounds_b)
+    disjoint = overlap is None
+    if operation == 'intersection':
+        if disjoint:
+            return None
+        region = overlap
+    elif operation == 'difference':
+        region = bounds_a
+    else:
+        region = np.array([np.minimum(bounds_a[0], bounds_b[0]), np.maximum(bounds_a[1], bounds_b[1])])
+    size = region[1] - region[0]
+    pitch = ((overlap[1] - overlap[0]).max() if not disjoint else size.max()) / resolution
+    while True:
+        shape = np.ceil(size / pitch).astype(np.int64) + 2 * GRID_PADDING + 1
+        cells = int(np.prod(shape))
+        if cells <= max_cells:
+            break
+        pitch *= max((cells / max_cells) ** (1 / 3), 1.01)
+    origin = region[0] - (GRID_PADDING - GRID_OFFSET) * pitch
+    return origin, pitch, tuple(int(n) for n in shape)
+
+def _line_axes(axis):
+    """The two axes that index the grid lines running along axis."""
+    return ((1, 2), (0, 2), (0, 1))[axis]
+
+def _sampling_tasks(shape):
+    """(axis, start, stop) blocks covering every grid line of every axis; a block holds the
+    lines whose index on the first other axis is in [start, stop)."""
+    tasks = []
+    for axis in range(3):
+        first, second = _line_axes(axis)
+        step = max(1, SAMPLE_BLOCK_CELLS // (shape[second] * shape[axis]))
+        tasks += [(axis, start, min(start + step, shape[first])) for start in range(0, shape[first], step)]
+    return tasks
+
+def _sample_lines(triangles, shape, axis, start, stop):
+    """Samples a block of grid lines along axis against (n, 3, 3) triangles in grid units.
+    Returns (inside by parity, distance to the nearest crossing in cells, clamped to 1), both
+    shaped (lines on the first other axis, lines on the second, points along axis)."""
+    first, second = _line_axes(axis)
+    n_second, n_along = shape[second], shape[axis]
+    # Each line owns a run of keys: crossings before the grid at 0, grid points at 1..n_along,
+    # crossings after it at n_along + 1.
+    span = n_along + 2
+    corners_f, corners_s, corners_a = triangles[:, :, first], triangles[:, :, second], triangles[:, :, axis]
+    low_f = np.maximum(np.ceil(corners_f.min(axis=1)), start)
+    high_f = np.minimum(np.floor(corners_f.max(axis=1)), stop - 1)
+    low_s = np.maximum(np.ceil(corners_s.min(axis=1)), 0)
+    high_s = np.minimum(np.floor(corners_s.max(axis=1)), n_second - 1)
+    ids = np.flatnonzero((high_f >= low_f) & (high_s >= low_s))
+    low_f, low_s = low_f[ids], low_s[ids]
+    count_s = (high_s[ids] - low_s + 1).astype(np.int64)
+    counts = (high_f[ids] - low_f + 1).astype(np.int64) * count_s
+    # The triangles projected onto the line plane: first corner, edge vectors and determinant.
+    f0, s0, a0 = corners_f[ids, 0], corners_s[ids, 0], corners_a[ids, 0]
+    f1, s1, a1 = corners_f[ids, 1] - f0, corners_s[ids, 1] - s0, corners_a[ids, 1] - a0
+    f2, s2, a2 = corners_f[ids, 2] - f0, corners_s[ids, 2] - s0, corners_a[ids, 2] - a0
+    determinant = f1 * s2 - s1 * f2
+
+    keys = []
+    ends = np.cumsum(counts)
+    splits = np.searchsorted(ends, np.arange(CANDIDATE_CHUNK, ends[-1], CANDIDATE_CHUNK)) if len(ends) else []
+    for chunk in np.split(np.arange(len(ids)), splits):
+        if len(chunk) == 0:
+            continue
+        # One candidate per (triangle, grid line inside its projected bounding box).
+        tri = np.repeat(chunk, counts[chunk])
+        local = np.arange(len(tri)) - np.repeat(ends[chunk] - counts[chunk], counts[chunk])
+        line_f = low_f[tri] + local // count_s[tri]
+        line_s = low_s[tri] + local % count_s[tri]
+        wf, ws = line_f - f0[tri], line_s - s0[tri]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            u = (wf * s2[tri] - ws * f2[tri]) / determinant[tri]
+            v = (f1[tri] * ws - s1[tri] * wf) / determinant[tri]
+            # Triangles seen edge-on (zero determinant) give NaN and never hit.
+            hit = (u >= 0) & (v >= 0) & (u + v <= 1)
+        position = a0[tri][hit] + u[hit] * a1[tri][hit] + v[hit] * a2[tri][hit]
+        line = (line_f[hit] - start) * n_second + line_s[hit]
+        keys.append(line * span + np.clip(position, -1, n_along) + 1)
+    keys = np.sort(np.concatenate(keys)) if keys else np.empty(0)
+    cells = keys.astype(np.int64)
+    fraction = keys - cells
+
+    n_lines = (stop - start) * n_second
+    # Grid point p sits at key p + 1, so a crossing in cell c lies before every point from c on.
+    crossings = np.bincount(cells, minlength=n_lines * span).reshape(n_lines, span)
+    inside = (np.cumsum(crossings, axis=1)[:, :n_along] & 1).astype(bool)
+    # Only crossings in the cells on either side of a point are within the clamped distance:
+    # the first one in the cell after it and the last one in the cell before it.
+    next_crossing = np.ones(n_lines * span, dtype=np.float32)
+    previous_crossing = np.ones(n_lines * span, dtype=np.float32)
+    if len(cells):
+        new_cell = np.flatnonzero(np.diff(cells)) + 1
+        first, last = np.concatenate(([0], new_cell)), np.concatenate((new_cell - 1, [len(cells) - 1]))
+        next_crossing[cells[first]] = fraction[first]
+        previous_crossing[cells[last]] = 1.0 - fraction[last]
+    distance = np.minimum(next_crossing.reshape(n_lines, span)[:, 1:n_along + 1],
+                          previous_crossing.reshape(n_lines, span)[:, :n_along])
+    block = (stop - start, n_second, n_along)
+    return inside.reshape(block), distance.reshape(block)
+
+def _accumulate_field(samples, shape):
+    """Combines one mesh's sampled lines into its field: float32 stored as (nz, ny, nx), the
+    x-fastest point order of VTK image data, negative inside."""
+    nx, ny, nz = shape
+    votes = np.zeros((nz, ny, nx), dtype=np.uint8)
+    field = np.ones((nz, ny, nx), dtype=np.float32)
+    for axis, start, stop, inside, distance in samples:
+        first, second = _line_axes(axis)
+        # [x, y, z] views (.T) rearranged to the block's [first, second, along] order.
+        np.moveaxis(votes.T, (first, second, axis), (0, 1, 2))[start:stop] += inside
+        target = np.moveaxis(field.T, (first, second, axis), (0, 1, 2))[start:stop]
+        np.minimum(target, distance, out=target)
+    np.negative(field, out=field, where=votes >= 2)
+    return field
+
+# Worker process state: the meshes' triangles in grid units and the grid shape.
+_voxel_job = None
+
+def _init_voxel_worker(meshes, shape):
+    global _voxel_job
+    _voxel_job = (meshes, shape)
+
+def _sample_task(mesh_index, axis, start, stop):
+    meshes, shape = _voxel_job
+    return (axis, start, stop, *_sample_lines(meshes[mesh_index], shape, axis, start, stop))
+
+def _contour(field, origin, pitch):
+    """Extracts the zero surface of a (nz, ny, nx) field. Returns (vertices, faces), outward-facing."""
+    from vtkmodules.util.numpy_support import numpy_to_vtk
+    from vtkmodules.vtkCommonDataModel import vtkImageData
+    from vtkmodules.vtkFiltersCore import vtkFlyingEdges3D
+    from mesh_vtk import arrays_from_polydata
+
+    nz, ny, nx = field.shape
+    image = vtkImageData()
+    image.SetDimensions(nx, ny, nz)
+    image.SetOrigin(*origin)
+    image.SetSpacing(pitch, pitch, pitch)
+    image.GetPointData().SetScalars(numpy_to_vtk(field.ravel(), deep=False))
+    surface = vtkFlyingEdges3D()
+    surface.SetInputData(image)
+    surface.SetValue(0, 0.0)
+    surface.ComputeNormalsOff()
+    surface.ComputeGradientsOff()
+    surface.ComputeScalarsOff()
+    surface.Update()
+    vertices, faces = arrays_from_polydata(surface.GetOutput())
+    if len(faces):
+        corners = vertices[faces]
+        if np.einsum('ij,ij->', corners[:, 0], np.cross(corners[:, 1], corners[:, 2])) < 0:
+            faces = faces[:, ::-1].copy()
+    return vertices, faces
+
+def voxel_boolean(vertices_a, faces_a, vertices_b, faces_b, operation, resolution=DEFAULT_VOXEL_RESOLUTION, workers=VOXEL_WORKERS, max_cells=VOXEL_MAX_CELLS):
+    """Runs operation ('difference', 'intersection' or 'union') on two triangle meshes through
+    sampled fields. Returns (vertices, faces, pitch); the arrays are empty for an empty result."""
+    triangles = [np.asarray(vertices, dtype=np.float64)[np.asarray(faces).reshape(-1, 3)]
+                 for vertices, faces in ((vertices_a, faces_a), (vertices_b, faces_b))]
+    bounds = [(t.reshape(-1, 3).min(axis=0), t.reshape(-1, 3).max(axis=0)) if len(t) else (np.zeros(3), np.zeros(3))
+              for t in triangles]
+    grid = voxel_grid(bounds[0], bounds[1], operation, resolution, max_cells)
+    if grid is None:
+        return np.empty((0, 3)), np.empty((0, 3), dtype=np.int64), 0.0
+    origin, pitch, shape = grid
+    # In grid units, grid point (i, j, k) sits at integer coordinates.
+    meshes = [(t - origin) / pitch for t in triangles]
+    del triangles
+    tasks = _sampling_tasks(shape)
+
+    if workers > 1 and len(tasks) > 3:
+        # fork hands the triangles to the workers without pickling them.
+        start_methods = multiprocessing.get_all_start_methods()
+        context = multiprocessing.get_context('fork' if 'fork' in start_methods else 'spawn')
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                                 initializer=_init_voxel_worker, initargs=(meshes, shape)) as pool:
+            fields = [_accumulate_field(pool.map(_sample_task, *zip(*[(index, *task) for task in tasks])), shape)
+                      for index in range(2)]
+    else:
+        fields = [_accumulate_field((task + _sample_lines(meshes[index], shape, *task) for task in tasks), shape)
+                  for index in range(2)]
+    field, other = fields
+    del fields
+    if operation == 'difference':
+        np.maximum(field, np.negative(other, out=other), out=field)
+    elif operation == 'intersection':
+        np.maximum(field, other, out=field)
+    else:
+        np.minimum(field, other, out=field)
+    del other
+    np.copysign(np.maximum(np.abs(field), SURFACE_CLEARANCE), field, out=field)
+    vertices, faces = _contour(field, origin, pitch)
+    return vertices, faces, pitch
@@ -0,0 +1,52 @@
+"""NumPy <-> VTK triangle mesh conversion without importing pyvista or the full vtk package.
+
+`import vtk` loads every VTK module and pyvista adds its own layer on top; together
+they cost about a second on a cold start. The crop, preflight and simplify stages only
+need a handful of filters, so they build vtkPolyData here and import just the VTK
+modules they use (vtkmodules.*).
+"""
+import numpy as np
+
+def polydata_from_arrays(vertices, faces, deep=True):
+    """Builds a vtkPolyData from (n, 3) vertex and (m, 3) triangle arrays.
+
+    With deep=False, float64 vertices and int64 faces (trimesh's own dtypes) are shared with
+    VTK instead of copied; the arrays must then not change while the polydata is in use.
+    """
+    from vtkmodules.util.numpy_support import numpy_to_vtk, numpy_to_vtkIdTypeArray
+    from vtkmodules.vtkCommonCore import vtkPoints
+    from vtkmodules.vtkCommonDataModel import vtkCellArray, vtkPolyData
+
+    faces = np.asarray(faces).reshape(-1, 3)
+    points = vtkPoints()
+    points.SetData(numpy_to_vtk(np.ascontiguousarray(vertices, dtype=np.float64), deep=deep))
+    cells = vtkCellArray()
+    # Offsets plus flat connectivity: no padded (m, 4) legacy cell array is built.
+    offsets = np.arange(0, 3 * len(faces) + 1, 3, dtype=np.int64)
+    cells.SetData(numpy_to_vtkIdTypeArray(offsets, deep=deep),
+                  numpy_to_vtkIdTypeArray(np.ascontiguousarray(faces, dtype=np.int64).reshape(-1), deep=deep))
+    polydata = vtkPolyData()
+    polydata.SetPoints(points)
+    polydata.SetPolys(cells)
+    return polydata
+
+def arrays_from_polydata(polydata):
+    """Returns (vertices, faces) of a vtkPolyData's polygons, triangulating them first if needed."""
+    from vtkmodules.util.numpy_support import vtk_to_numpy
+    from vtkmodules.vtkFiltersCore import vtkTriangleFilter
+
+    polys = polydata.GetPolys()
+    if polydata.GetNumberOfPoints() == 0 or polys is None or polys.GetNumberOfCells() == 0:
+        return np.empty((0, 3)), np.empty((0, 3), dtype=np.int64)
+    offsets = vtk_to_numpy(polys.GetOffsetsArray())
+    if np.any(np.diff(offsets) != 3):
+        triangles = vtkTriangleFilter()
+        triangles.SetInputData(polydata)
+        triangles.PassLinesOff()
+        triangles.PassVertsOff()
+        triangles.Update()
+        polydata = triangles.GetOutput()
+        polys = polydata.GetPolys()
+    vertices = vtk_to_numpy(polydata.GetPoints().GetData()).astype(np.float64)
+    faces = vtk_to_numpy(polys.GetConnectivityArray()).astype(np.int64).reshape(-1, 3)
+    return vertices, faces
@@ -0,0 +1,202 @@
+# SCRIPT_VERSION: 1.0.125
+"""Persistent mesh worker for the Boller3D server.
+
+Imports the mesh stack (trimesh, PyVista, PyMeshFix, NumPy) once per process and then serves
+boolean, repair and subtract jobs over stdin/stdout with length-prefixed JSON frames:
+
+    <4-byte big-endian payload length><UTF-8 JSON payload>
+
+Request:  {"id": <any>, "op": "boolean" | "repair" | "subtract" | "ping", "args": {...},
+           "profile": bool, "priority": "high" | "normal" (optional)}
+Cancel:   {"id": <job id>, "op": "cancel"}
+Events:   {"id": <job id>, "event": "queued" | "started" | "progress", ...}
+Response: {"id": <same>, "ok": bool, "stdout": str, "stderr": str, "error": str | null,
+           "report": {...} | null, "cancelled": true (only for cancelled jobs)}
+
+With "profile": true the response carries the job's per-stage timing and memory
+report (see mesh_profile.py). Progress events name each stage as the job enters it.
+
+Jobs run on a small set of pre-warmed processes so several requests can be processed
+in parallel across cores. mesh_jobs.JobRunner admits a job only when a process is idle
+and its estimated memory (from the input face counts) fits under `--memory-limit`
+(BOLLER_MESH_MEMORY_LIMIT_MB, default 80% of the memory available at start), runs
+preview-quality jobs ahead of the rest, and cancels queued or running jobs on request.
+The scripts import their backends lazily, so
+`--warm` (BOLLER_MESH_WARM) picks what each process loads before it reports ready:
+'all' (default), 'boolean', 'repair' (PyVista only) or 'none' (everything is loaded
+by the first job that needs it, for the fastest cold start).
+"""
+import argparse
+import contextlib
+import io
+import json
+import logging
+import multiprocessing
+import os
+import struct
+import sys
+import threading
+import traceback
+
+from mesh_jobs import JobRunner
+
+FRAME_HEADER = struct.Struct('>I')
+DEFAULT_WORKERS = max(1, min(2, os.cpu_count() or 1))
+# Share of the memory available at start that running jobs may reserve, unless --memory-limit is given.
+DEFAULT_MEMORY_FRACTION = 0.8
+# Modules each job type needs, imported up front by the pool initializer.
+WARM_IMPORTS = {
+    'boolean': ('subtract_script', 'trimesh', 'pyvista', 'pymeshfix', 'vtkmodules.vtkFiltersCore', 'vtkmodules.vtkFiltersGeneral'),
+    'repair': ('repair_script',),  # Also runs 'subtract' jobs
+}
+WARM_CHOICES = ('all', *WARM_IMPORTS, 'none')
+
+# --- Framing ---
+def read_frame(stream):
+    """Reads one framed JSON message. Returns None on a clean EOF."""
+    header = stream.read(FRAME_HEADER.size)
+    if not header:
+        return None
+    if len(header) < FRAME_HEADER.size:
+        raise EOFError("Truncated frame header.")
+    (length,) = FRAME_HEADER.unpack(header)
+    payload = stream.read(length)
+    if len(payload) < length:
+        raise EOFError("Truncated frame payload.")
+    return json.loads(payload.decode('utf-8'))
+
+def write_frame(stream, message, lock):
+    """Writes one framed JSON message. Safe to call from several threads."""
+    payload = json.dumps(message).encode('utf-8')
+    with lock:
+        stream.write(FRAME_HEADER.pack(len(payload)) + payload)
+        stream.flush()
+
+# --- Job Execution (runs inside pool processes) ---
+class _Tee(io.TextIOBase):
+    """Captures text for the job response while still echoing it to the worker's stderr."""
+    def __init__(self, echo):
+        self._captured = io.StringIO()
+        self.echo = echo
+
+    def write(self, text):
+        self._captured.write(text)
+        self.echo.write(text)
+        return len(text)
+
+    def flush(self):
+        self.echo.flush()
+
+    def getvalue(self):
+        return self._captured.getvalue()
+
+def warm_imports(warm):
+    """The modules to import up front for a --warm choice."""
+    if warm == 'all':
+        return tuple(module for modules in WARM_IMPORTS.values() for module in modules)
+    return WARM_IMPORTS.get(warm, ())
+
+def _warm_up(modules):
+    """Pool initializer: pays the heavy import cost once per worker process."""
+    import importlib
+    for module in modules:
+        importlib.import_module(module)
+
+def _execute(op, args):
+    if op == 'boolean':
+        import subtract_script
+        return bool(subtract_script.boolean_operation(**args))
+    if op == 'repair':
+        import repair_script
+        repair_script.repair_mesh_pyvista(**args)
+        return os.path.exists(args['output_file'])
+    if op == 'subtract':
+        import repair_script
+        repair_script.subtract_mesh_pyvista(**args)
+        return os.path.exists(args['output_file'])
+    raise ValueError(f"Unknown op: {op}")
+
+def run_job(op, args, profile=False):
+    """Runs a single job and returns (ok, stdout, stderr, error, report)."""
+    import mesh_profile
+    out = _Tee(sys.__stderr__)
+    err = _Tee(sys.__stderr__)
+    # repair_script logs through the root logger, whose handler holds the original stderr.
+    log_handler = logging.StreamHandler(err._captured)
+    log_handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
+    logging.getLogger().addHandler(log_handler)
+    ok, error, report = False, None, None
+    try:
+        with contextlib.redirect_stdout(out), contextlib.redirect_stderr(err), \
+                (mesh_profile.profiling(op) if profile else contextlib.nullcontext()) as report:
+            try:
+                ok = _execute(op, args)
+                if not ok:
+                    error = f"Job '{op}' reported failure."
+            except SystemExit as e:
+                # The scripts call sys.exit(1) on failure; that must not end the worker.
+                ok = e.code in (0, None)
+                if not ok:
+                    error = f"Job '{op}' exited with code {e.code}."
+            except Exception as e:
+                traceback.print_exc()
+                error = f"Job '{op}' raised: {e}"
+            mesh_profile.annotate(ok=bool(ok))
+    finally:
+        logging.getLogger().removeHandler(log_handler)
+    return ok, out.getvalue(), err.getvalue(), error, (report.to_dict() if report is not None else None)
+
+# --- Server Loop ---
+def serve(workers=DEFAULT_WORKERS, warm='all', memory_limit_mb=None):
+    """Serves framed jobs from stdin until EOF."""
+    import mesh_memory
+    stdin = sys.stdin.buffer
+    # Keep a private handle on the real stdout for protocol frames and route fd 1 to
+    # stderr, so stray prints from the mesh libraries cannot corrupt the stream.
+    frames_out = os.fdopen(os.dup(sys.stdout.fileno()), 'wb')
+    sys.stdout.flush()
+    os.dup2(sys.stderr.fileno(), sys.stdout.fileno())
+    write_lock = threading.Lock()
+
+    print(f"[Mesh Worker] Starting {workers} worker(s), warming '{warm}'...", file=sys.stderr)
+    runner = JobRunner(workers, run_job, lambda message: write_frame(frames_out, message, write_lock),
+                       multiprocessing.get_context('spawn'), initializer=_warm_up, initargs=(warm_imports(warm),),
+                       estimate=mesh_memory.estimate_job_mb)
+    # Start and warm every worker up front so the first request does not pay the import cost.
+    runner.start()
+    if memory_limit_mb is None:
+        available = mesh_memory.available_memory_mb()
+        memory_limit_mb = available * DEFAULT_MEMORY_FRACTION if available else None
+    runner.memory_limit_mb = memory_limit_mb
+    write_frame(frames_out, {'id': None, 'event': 'ready', 'workers': workers,
+                             'memory_limit_mb': round(memory_limit_mb) if memory_limit_mb else None}, write_lock)
+    print(f"[Mesh Worker] Ready. Memory limit for running jobs: {f'{memory_limit_mb:.0f} MB' if memory_limit_mb else 'none'}.", file=sys.stderr)
+
+    try:
+        while True:
+            message = read_frame(stdin)
+            if message is None:
+                break
+            job_id = message.get('id')
+            op = message.get('op')
+            if op == 'ping':
+                write_frame(frames_out, {'id': job_id, 'ok': True, 'stdout': '', 'stderr': '', 'error': None}, write_lock)
+            elif op == 'cancel':
+                runner.cancel(job_id)
+            else:
+                runner.submit(job_id, op, message.get('args') or {}, bool(message.get('profile')), message.get('priority'))
+    finally:
+        print("[Mesh Worker] Input closed. Shutting down...", file=sys.stderr)
+        runner.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Persistent worker pool for Boller3D mesh jobs.')
+    parser.add_argument('--workers', type=int, default=int(os.environ.get('BOLLER_MESH_WORKERS', DEFAULT_WORKERS)),
+                        help='Number of pre-warmed worker processes.')
+    parser.add_argument('--warm', choices=WARM_CHOICES, default=os.environ.get('BOLLER_MESH_WARM', 'all'),
+                        help='Modules each worker process imports before the pool reports ready.')
+    parser.add_argument('--memory-limit', type=float, metavar='MB',
+                        default=float(os.environ['BOLLER_MESH_MEMORY_LIMIT_MB']) if os.environ.get('BOLLER_MESH_MEMORY_LIMIT_MB') else None,
+                        help='Estimated peak memory the running jobs may reserve together (default: 80%% of the memory available at start).')
+    args = parser.parse_args()
+    serve(max(1, args.workers), args.warm, args.memory_limit)
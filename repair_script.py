@@ -3,42 +3,56 @@ import sys
 import argparse
 import os
 import logging
+from stl_io import OUTPUT_FORMATS, input_file_error, is_binary_stl, read_stl_arrays
+from mesh_vtk import polydata_from_arrays
+from mesh_profile import annotate, emit_report, profiling, stage
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
 # --- Helper function to check file existence and readability ---
 def check_file(file_path, file_desc):
-    if not os.path.exists(file_path):
-        logging.error(f"{file_desc} file not found: {file_path}")
+    error = input_file_error(file_path, file_desc)
+    if error:
+        logging.error(error)
         return False
-    if not os.access(file_path, os.R_OK):
-         logging.error(f"{file_desc} file not readable: {file_path}")
-         return False
     logging.info(f"{file_desc} file found and readable: {file_path}")
     return True
 
+# --- Helper function to load an STL as PyVista PolyData ---
+def read_mesh(file_path):
+    """Reads a binary STL through stl_io's memory-mapped reader; VTK's own reader already streams ASCII."""
+    if not is_binary_stl(file_path):
+        return pv.read(file_path)
+    vertices, faces = read_stl_arrays(file_path)
+    return pv.wrap(polydata_from_arrays(vertices, faces, deep=False))
+
 # --- Mesh Repair Function ---
-def repair_mesh_pyvista(input_file, output_file):
+def repair_mesh_pyvista(input_file, output_file, output_format='binary'):
     logging.info(f"Attempting to REPAIR mesh using PyVista: {input_file}")
     if not check_file(input_file, "Input"): sys.exit(1)
 
     try:
-        mesh = pv.read(input_file)
+        annotate(operation='repair', output_format=output_format)
+        with stage("load") as record:
+            mesh = record.output(read_mesh(input_file))
         logging.info(f"Mesh loaded. N Points: {mesh.n_points}, N Cells: {mesh.n_cells}")
 
         # Clean the mesh
         logging.info("Cleaning mesh...")
-        cleaned_mesh = mesh.clean()
+        with stage("clean", mesh) as record:
+            cleaned_mesh = record.output(mesh.clean())
         logging.info(f"Mesh cleaned. N Points: {cleaned_mesh.n_points}, N Cells: {cleaned_mesh.n_cells}")
         
         # Fill holes
         logging.info("Filling holes (hole_size=100.0)...") 
-        repaired_mesh = cleaned_mesh.fill_holes(hole_size=100.0)
+        with stage("fill_holes", cleaned_mesh) as record:
+            repaired_mesh = record.output(cleaned_mesh.fill_holes(hole_size=100.0))
         logging.info(f"Hole filling complete. N Points: {repaired_mesh.n_points}, N Cells: {repaired_mesh.n_cells}")
 
         logging.info(f"Saving repaired mesh to: {output_file}")
-        repaired_mesh.save(output_file, binary=False) # Save as ASCII STL
+        with stage(f"export:{output_format}", repaired_mesh):
+            repaired_mesh.save(output_file, binary=(output_format == 'binary')) # Binary STL unless ASCII requested
         logging.info(f"Repaired mesh saved.")
 
     except Exception as e:
@@ -46,34 +60,40 @@ def repair_mesh_pyvista(input_file, output_file):
         sys.exit(1)
 
 # --- Mesh Subtraction Function ---
-def subtract_mesh_pyvista(model_file, tool_file, output_file):
+def subtract_mesh_pyvista(model_file, tool_file, output_file, output_format='binary'):
     logging.info(f"Attempting to SUBTRACT tool mesh ({tool_file}) from model mesh ({model_file})")
     if not check_file(model_file, "Model"): sys.exit(1)
     if not check_file(tool_file, "Tool"): sys.exit(1)
 
     try:
-        model_mesh = pv.read(model_file)
+        annotate(operation='subtract', output_format=output_format, engine='pyvista')
+        with stage("load:model") as record:
+            model_mesh = record.output(read_mesh(model_file))
         logging.info(f"Model mesh loaded. N Points: {model_mesh.n_points}, N Cells: {model_mesh.n_cells}")
-        tool_mesh = pv.read(tool_file)
+        with stage("load:tool") as record:
+            tool_mesh = record.output(read_mesh(tool_file))
         logging.info(f"Tool mesh loaded. N Points: {tool_mesh.n_points}, N Cells: {tool_mesh.n_cells}")
 
         # Perform boolean difference (Model - Tool)
         logging.info("Performing boolean difference...")
         # Ensure meshes are manifold (basic checks - might need more robust pre-processing)
-        if not model_mesh.is_manifold:
-            logging.warning("Model mesh may not be manifold, attempting repair...")
-            model_mesh.fill_holes(hole_size=100.0, inplace=True)
-            model_mesh.clean(inplace=True)
-        if not tool_mesh.is_manifold:
-            logging.warning("Tool mesh may not be manifold, attempting repair...")
-            tool_mesh.fill_holes(hole_size=100.0, inplace=True)
-            tool_mesh.clean(inplace=True)
+        with stage("manifold_check", model_mesh):
+            if not model_mesh.is_manifold:
+                logging.warning("Model mesh may not be manifold, attempting repair...")
+                model_mesh.fill_holes(hole_size=100.0, inplace=True)
+                model_mesh.clean(inplace=True)
+            if not tool_mesh.is_manifold:
+                logging.warning("Tool mesh may not be manifold, attempting repair...")
+                tool_mesh.fill_holes(hole_size=100.0, inplace=True)
+                tool_mesh.clean(inplace=True)
             
-        result_mesh = model_mesh.boolean_difference(tool_mesh)
+        with stage("boolean:pyvista:difference", model_mesh) as record:
+            result_mesh = record.output(model_mesh.boolean_difference(tool_mesh))
         logging.info(f"Subtraction complete. Result N Points: {result_mesh.n_points}, N Cells: {result_mesh.n_cells}")
 
         logging.info(f"Saving subtracted mesh to: {output_file}")
-        result_mesh.save(output_file, binary=False) # Save as ASCII STL
+        with stage(f"export:{output_format}", result_mesh):
+            result_mesh.save(output_file, binary=(output_format == 'binary')) # Binary STL unless ASCII requested
         logging.info(f"Subtracted mesh saved.")
 
     except Exception as e:
@@ -88,26 +108,39 @@ if __name__ == "__main__":
     parser.add_argument('--input_file', type=str, help='Path to the input STL file (for repair operation).')
     parser.add_argument('--model_file', type=str, help='Path to the main model STL file (for subtract operation).')
     parser.add_argument('--tool_file', type=str, help='Path to the tool/logo STL file (for subtract operation).')
+    parser.add_argument('--output_format', type=str, choices=OUTPUT_FORMATS, default='binary', help='STL encoding of the output file.')
+    parser.add_argument('--profile', action='store_true', help='Print per-stage wall/CPU time, peak RSS and mesh sizes to stderr.')
+    parser.add_argument('--report_json', type=str, default=None, help='Write the per-stage profile report as JSON to this path.')
     
     args = parser.parse_args()
     
     logging.info(f"Starting PyVista script. Operation: {args.operation}")
 
-    if args.operation == 'repair':
-        if not args.input_file:
-            logging.error("Missing --input_file argument for 'repair' operation.")
-            sys.exit(1)
-        repair_mesh_pyvista(args.input_file, args.output_file)
-        
-    elif args.operation == 'subtract':
-        if not args.model_file or not args.tool_file:
-            logging.error("Missing --model_file or --tool_file argument for 'subtract' operation.")
-            sys.exit(1)
-        subtract_mesh_pyvista(args.model_file, args.tool_file, args.output_file)
-        
-    else:
-        logging.error(f"Unknown operation: {args.operation}")
-        sys.exit(1)
+    with profiling('repair_script') as report:
+        try:
+            if args.operation == 'repair':
+                if not args.input_file:
+                    logging.error("Missing --input_file argument for 'repair' operation.")
+                    sys.exit(1)
+                repair_mesh_pyvista(args.input_file, args.output_file, args.output_format)
+
+            elif args.operation == 'subtract':
+                if not args.model_file or not args.tool_file:
+                    logging.error("Missing --model_file or --tool_file argument for 'subtract' operation.")
+                    sys.exit(1)
+                subtract_mesh_pyvista(args.model_file, args.tool_file, args.output_file, args.output_format)
+
+            else:
+                logging.error(f"Unknown operation: {args.operation}")
+                sys.exit(1)
+            annotate(ok=True)
+        except SystemExit:
+            annotate(ok=False)
+            raise
+        finally:
+            if args.profile or args.report_json:
+                report.finish()
+                emit_report(report, args.profile, args.report_json)
 
     # Final check if output file was created successfully
     if not os.path.exists(args.output_file):
@@ -0,0 +1,197 @@
+"""STL file helpers shared by the mesh scripts: binary/ASCII detection, loading and export.
+
+Loading never reads a whole file into Python objects. A binary STL is memory-mapped and
+its triangle corners are used as a zero-copy view of the records. An ASCII STL is
+memory-mapped and parsed in chunks: a regex picks out the `vertex` lines and NumPy's C
+parser converts their numbers. Duplicate corners are then merged by hashing their exact
+coordinates to 64-bit keys (`merge_triangle_vertices`), so loading costs little more
+than the vertex and face arrays themselves.
+"""
+import mmap
+import os
+import re
+
+import numpy as np
+
+STL_HEADER_SIZE = 80
+STL_COUNT_SIZE = 4
+# One binary STL triangle record: normal, three corners, attribute byte count (little-endian).
+STL_RECORD_DTYPE = np.dtype([('normal', '<f4', (3,)), ('vertices', '<f4', (3, 3)), ('attributes', '<u2')])
+OUTPUT_FORMATS = ('binary', 'ascii')
+# Faces per chunk when writing binary STL (about 3 MB of records) and when hashing corners.
+STL_WRITE_CHUNK_FACES = 1 << 16
+# Bytes of ASCII STL parsed at a time (about 64k facets).
+ASCII_CHUNK_BYTES = 16 * 1024 * 1024
+_ASCII_VERTEX = re.compile(rb'^[ \t]*vertex[ \t]+([^\r\n]*)', re.IGNORECASE | re.MULTILINE)
+
+def input_file_error(file_path, description="Input"):
+    """Returns why file_path cannot be used as an input mesh, or None if it can be read."""
+    if not os.path.exists(file_path):
+        return f"{description} file not found: {file_path}"
+    if not os.access(file_path, os.R_OK):
+        return f"{description} file not readable: {file_path}"
+    return None
+
+def is_binary_stl(file_path):
+    """Detects a binary STL from its triangle count rather than the 'solid' keyword,
+    since many binary exporters also start their header with 'solid'."""
+    size = os.path.getsize(file_path)
+    if size < STL_HEADER_SIZE + STL_COUNT_SIZE:
+        return False
+    with open(file_path, 'rb') as f:
+        f.seek(STL_HEADER_SIZE)
+        triangle_count = int(np.frombuffer(f.read(STL_COUNT_SIZE), dtype='<u4')[0])
+    return size == STL_HEADER_SIZE + STL_COUNT_SIZE + triangle_count * STL_RECORD_DTYPE.itemsize
+
+def read_binary_stl_triangles(file_path):
+    """Returns a binary STL's triangle corners as an (n, 3, 3) float32 view of the memory-mapped file."""
+    count = (os.path.getsize(file_path) - STL_HEADER_SIZE - STL_COUNT_SIZE) // STL_RECORD_DTYPE.itemsize
+    if count <= 0:
+        return np.empty((0, 3, 3), dtype=np.float32)
+    records = np.memmap(file_path, dtype=STL_RECORD_DTYPE, mode='r', offset=STL_HEADER_SIZE + STL_COUNT_SIZE, shape=(count,))
+    return records['vertices']
+
+def read_ascii_stl_triangles(file_path, chunk_bytes=ASCII_CHUNK_BYTES):
+    """Parses an ASCII STL (one or more solids) into an (n, 3, 3) float64 array of triangle corners.
+    Raises ValueError if the vertex lines do not hold three numbers each or do not form triangles."""
+    parts = []
+    with open(file_path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return np.empty((0, 3, 3))
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            start = released = 0
+            while start < len(data):
+                end = len(data)
+                if start + chunk_bytes < end:
+                    # Cut after the last full line so no vertex line straddles two chunks.
+                    end = data.rfind(b'\n', start, start + chunk_bytes) + 1 or start + chunk_bytes
+                lines = _ASCII_VERTEX.findall(data, start, end)
+                if lines:
+                    values = np.fromstring(b' '.join(lines), sep=' ')
+                    if len(values) != 3 * len(lines):
+                        raise ValueError(f"Malformed vertex line in ASCII STL {os.path.basename(file_path)}.")
+                    parts.append(values)
+                start = end
+                if hasattr(data, 'madvise') and hasattr(mmap, 'MADV_DONTNEED'):
+                    # Parsed pages are not needed again; let them leave the resident set.
+                    done = start - start % mmap.PAGESIZE
+                    if done > released:
+                        data.madvise(mmap.MADV_DONTNEED, released, done - released)
+                        released = done
+    coordinates = np.concatenate(parts) if parts else np.empty(0)
+    if len(coordinates) % 9:
+        raise ValueError(f"ASCII STL {os.path.basename(file_path)} has a vertex count that is not a multiple of three.")
+    return coordinates.reshape(-1, 3, 3)
+
+def merge_triangle_vertices(triangles, chunk_faces=STL_WRITE_CHUNK_FACES):
+    """Turns (n, 3, 3) triangle corners into float64 (vertices, int64 faces) with exact duplicates merged.
+
+    Each corner's coordinate bits are hashed to a 64-bit key and equal keys are merged; the
+    merged vertices are then compared with every corner, and a hash collision (never seen in
+    practice) falls back to an exact row-wise merge. Vertices keep the order of their first
+    use, and triangles with non-finite coordinates are dropped, as trimesh's processing does.
+    """
+    if len(triangles) and not np.isfinite(triangles).all():
+        triangles = triangles[np.isfinite(triangles).all(axis=(1, 2))]
+    n_faces = len(triangles)
+    if n_faces == 0:
+        return np.empty((0, 3)), np.empty((0, 3), dtype=np.int64)
+    bits = np.uint32 if triangles.dtype == np.float32 else np.uint64
+    keys = np.empty(3 * n_faces, dtype=np.uint64)
+    for start in range(0, n_faces, chunk_faces):
+        # + 0.0 turns -0.0 into 0.0, so both signs of zero share one key.
+        corners = np.ascontiguousarray(triangles[start:start + chunk_faces]).reshape(-1, 3) + triangles.dtype.type(0.0)
+        coordinate_bits = corners.view(bits).astype(np.uint64)
+        key = _mix64(coordinate_bits[:, 0])
+        key = _mix64(key ^ coordinate_bits[:, 1])
+        keys[3 * start:3 * start + len(corners)] = _mix64(key ^ coordinate_bits[:, 2])
+    first_corner, inverse = _group_keys(keys)
+    del keys
+    first_corner, faces = _number_by_first_use(first_corner, inverse)
+    vertices = triangles[first_corner // 3, first_corner % 3].astype(np.float64) + 0.0
+
+    for start in range(0, n_faces, chunk_faces):
+        chunk = triangles[start:start + chunk_faces]
+        if not np.array_equal(vertices[faces[start:start + len(chunk)]], chunk):
+            # Two different corners hashed to the same key.
+            corners = np.ascontiguousarray(triangles).reshape(-1, 3).astype(np.float64) + 0.0
+            _, first_corner, inverse = np.unique(corners, axis=0, return_index=True, return_inverse=True)
+            first_corner, faces = _number_by_first_use(first_corner, inverse)
+            return corners[first_corner], faces
+    return vertices, faces
+
+def _mix64(values):
+    """splitmix64 finalizer: spreads every input bit over the whole 64-bit key (in place)."""
+    values ^= values >> np.uint64(30)
+    values *= np.uint64(0xBF58476D1CE4E5B9)
+    values ^= values >> np.uint64(27)
+    values *= np.uint64(0x94D049BB133111EB)
+    values ^= values >> np.uint64(31)
+    return values
+
+def _group_keys(keys):
+    """np.unique(keys, return_index=True, return_inverse=True) without its extra copies of the
+    keys: returns (lowest index per distinct key, group of every key)."""
+    order = np.argsort(keys)
+    sorted_keys = keys[order]
+    starts = np.empty(len(keys), dtype=bool)
+    starts[0] = True
+    np.not_equal(sorted_keys[1:], sorted_keys[:-1], out=starts[1:])
+    del sorted_keys
+    first = np.minimum.reduceat(order, np.flatnonzero(starts))
+    inverse = np.empty(len(keys), dtype=np.int64)
+    inverse[order] = np.cumsum(starts) - 1
+    return first, inverse
+
+def _number_by_first_use(first_corner, inverse):
+    """Renumbers np.unique's groups in order of first use. Returns (first corner per vertex, (n, 3) faces)."""
+    order = np.argsort(first_corner, kind='stable')
+    rank = np.empty(len(order), dtype=np.int64)
+    rank[order] = np.arange(len(order))
+    return first_corner[order], rank[inverse.reshape(-1)].reshape(-1, 3)
+
+def read_stl_arrays(file_path):
+    """Reads a binary or ASCII STL into merged float64 vertices and int64 faces."""
+    if is_binary_stl(file_path):
+        return merge_triangle_vertices(read_binary_stl_triangles(file_path))
+    return merge_triangle_vertices(read_ascii_stl_triangles(file_path))
+
+def load_stl_mesh(file_path):
+    """Loads a binary or ASCII STL into a trimesh.Trimesh with merged vertices. Files the reader
+    does not recognise (e.g. a binary STL with a wrong triangle count) go through trimesh's loader."""
+    import trimesh
+    try:
+        vertices, faces = read_stl_arrays(file_path)
+    except ValueError:
+        return trimesh.load_mesh(file_path, file_type='stl', force='mesh')
+    if len(faces) == 0 and not is_binary_stl(file_path):
+        return trimesh.load_mesh(file_path, file_type='stl', force='mesh')
+    return trimesh.Trimesh(vertices=vertices, faces=faces, process=False)
+
+def write_binary_stl(vertices, faces, file_path, chunk_faces=STL_WRITE_CHUNK_FACES):
+    """Writes a triangle mesh as binary STL, building the float32 records one chunk of faces
+    at a time instead of whole-mesh float64 triangle and normal arrays."""
+    vertices = np.asarray(vertices)
+    faces = np.asarray(faces).reshape(-1, 3)
+    records = np.zeros(min(len(faces), chunk_faces), dtype=STL_RECORD_DTYPE)
+    with open(file_path, 'wb') as f:
+        f.write(bytes(STL_HEADER_SIZE))
+        f.write(np.array([len(faces)], dtype='<u4').tobytes())
+        for start in range(0, len(faces), chunk_faces):
+            triangles = vertices[faces[start:start + chunk_faces]]
+            normals = np.cross(triangles[:, 1] - triangles[:, 0], triangles[:, 2] - triangles[:, 0])
+            lengths = np.linalg.norm(normals, axis=1)
+            normals[lengths > 0] /= lengths[lengths > 0, None]  # Degenerate faces keep a zero normal
+            chunk = records[:len(triangles)]
+            chunk['normal'] = normals
+            chunk['vertices'] = triangles
+            chunk.tofile(f)
+
+def export_stl_mesh(mesh, file_path, output_format='binary'):
+    """Writes a trimesh.Trimesh as binary (default) or ASCII STL."""
+    if output_format not in OUTPUT_FORMATS:
+        raise ValueError(f"Unknown STL output format: {output_format}")
+    if output_format == 'binary':
+        write_binary_stl(mesh.vertices, mesh.faces, file_path)
+    else:
+        mesh.export(file_path, file_type='stl_ascii')
@@ -1,38 +1,144 @@
-# SCRIPT_VERSION: 1.0.105
+# SCRIPT_VERSION: 1.0.125
 import argparse
+import hashlib
+import json
+import os
+import multiprocessing
+import queue
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
 import sys
-import trimesh
-import pyvista as pv
+import time
 import numpy as np
-from pymeshfix import MeshFix
+from stl_io import OUTPUT_FORMATS, export_stl_mesh, input_file_error, load_stl_mesh
+from mesh_cache import file_digest, get_default_cache
+import mesh_crop
+import mesh_memory
+import mesh_preflight
+import mesh_voxel
+from mesh_simplify import DEFAULT_QUALITY, QUALITY_NAMES, QUALITY_TIERS, simplify_mesh
+from mesh_thin import DEFAULT_THIN_OFFSET, THIN_OFFSET_MODES, offset_model_mesh
+from mesh_vtk import arrays_from_polydata, polydata_from_arrays
+from mesh_diagnostics import diagnose_mesh
+from mesh_profile import annotate, emit_report, note_diagnostics, note_fallback, profiling, stage
+
+SCRIPT_VERSION = '1.0.125'  # Part of the result cache key; keep in sync with the header comment
+# trimesh (and the SciPy it pulls in) is imported inside the functions that use it, so importing this
+# module, e.g. when a mesh worker starts with --warm none, does not pay for it.
+ENGINE_MODES = ('sequential', 'race')
+RACE_ENGINES = ('trimesh', 'pyvista')
+OPERATIONS = ('subtraction', 'intersection', 'thin_intersection')
+# 'band' intersects the logo once with the cached thin band; 'stages' runs the original three steps.
+THIN_ENGINES = ('band', 'stages')
+DEFAULT_BATCH_WORKERS = max(1, min(4, os.cpu_count() or 1))
+
+def repair_with_meshfix(mesh_trimesh):
+    """Runs a full PyMeshFix repair and returns the repaired Trimesh."""
+    import trimesh
+    from pymeshfix import MeshFix  # Only loaded once a mesh actually needs repair
+    meshfix = MeshFix(mesh_trimesh.vertices, mesh_trimesh.faces)
+    meshfix.repair(verbose=False)
+    return trimesh.Trimesh(vertices=meshfix.v, faces=meshfix.f)
+
+def repair_defective_components(mesh_trimesh, diagnostics):
+    """Repairs only the connected components that have a defect and keeps the clean ones as they are.
+    PyMeshFix keeps only the largest component of its input, so each defective component is
+    repaired on its own; one that repairs to nothing (e.g. a stray sliver) is dropped."""
+    import trimesh
+    labels = diagnostics.component_labels
+    defective_labels = np.unique(labels[diagnostics.defective_faces])
+    parts = [mesh_trimesh.submesh([np.flatnonzero(~diagnostics.defective_faces)], append=True)]
+    for label in defective_labels:
+        component = mesh_trimesh.submesh([np.flatnonzero(labels == label)], append=True)
+        repaired = repair_with_meshfix(component)
+        if repaired.is_empty:
+            print(f"[Heal Mesh] Dropped component {label} ({len(component.faces)} faces): nothing left after repair.")
+            continue
+        parts.append(repaired)
+    return trimesh.util.concatenate(parts)
 
 def heal_mesh(mesh_trimesh, operation_name=""):
-    """Heals a Trimesh object using PyMeshFix."""
+    """Heals a Trimesh object using PyMeshFix. Clean meshes are returned unchanged, and when only
+    some connected components are defective only those are repaired."""
+    import trimesh
     if not isinstance(mesh_trimesh, trimesh.Trimesh) or mesh_trimesh.is_empty:
         print(f"[Heal Mesh] Invalid or empty mesh for '{operation_name}'. Skipping.", file=sys.stderr)
         return mesh_trimesh
-    print(f"[Heal Mesh] Healing '{operation_name}'. Faces: {len(mesh_trimesh.faces)}")
-    try:
-        meshfix = MeshFix(mesh_trimesh.vertices, mesh_trimesh.faces)
-        meshfix.repair(verbose=False)
-        healed_mesh = trimesh.Trimesh(vertices=meshfix.v, faces=meshfix.f)
-        print(f"[Heal Mesh] Healing for '{operation_name}' complete. Faces: {len(healed_mesh.faces)}")
-        return healed_mesh
-    except Exception as e:
-        print(f"[Heal Mesh] CRITICAL: PyMeshFix failed for '{operation_name}': {e}", file=sys.stderr)
+    with stage(f"diagnose:{operation_name}", mesh_trimesh):
+        diagnostics = diagnose_mesh(mesh_trimesh)
+    note_diagnostics(operation_name, diagnostics.to_dict())
+    if diagnostics.is_clean:
+        print(f"[Heal Mesh] '{operation_name}' is already clean ({len(mesh_trimesh.faces)} faces). Skipping repair.")
         return mesh_trimesh
+    print(f"[Heal Mesh] Healing '{operation_name}'. Faces: {len(mesh_trimesh.faces)}, defects in {diagnostics.defective_components} "
+          f"of {diagnostics.components} component(s): {diagnostics.boundary_edges} boundary / {diagnostics.non_manifold_edges} non-manifold / "
+          f"{diagnostics.inconsistent_winding_edges} flipped edges, {diagnostics.degenerate_faces} degenerate / {diagnostics.duplicate_faces} duplicate faces")
+    with stage(f"heal:{operation_name}", mesh_trimesh) as record:
+        try:
+            if diagnostics.defective_components < diagnostics.components and diagnostics.non_finite_vertices == 0:
+                healed_mesh = repair_defective_components(mesh_trimesh, diagnostics)
+            else:
+                healed_mesh = repair_with_meshfix(mesh_trimesh)
+            print(f"[Heal Mesh] Healing for '{operation_name}' complete. Faces: {len(healed_mesh.faces)}")
+            return record.output(healed_mesh)
+        except Exception as e:
+            print(f"[Heal Mesh] CRITICAL: PyMeshFix failed for '{operation_name}': {e}", file=sys.stderr)
+            note_fallback(f"heal:{operation_name}:unhealed")
+            return record.output(mesh_trimesh)
+
+def cached_mesh(cache, digest, variant, build, operation_name=""):
+    """Returns a mesh artifact from the cache, building and storing it on a miss."""
+    import trimesh
+    if cache is None:
+        return build()
+    key = cache.make_key(digest, variant)
+    with stage(f"cache_lookup:{operation_name}") as record:
+        mesh = record.output(cache.get_mesh(key))
+    if mesh is not None:
+        print(f"[Mesh Cache] Hit for '{operation_name}' ({variant}). Faces: {len(mesh.faces)}")
+        return mesh
+    mesh = build()
+    if isinstance(mesh, trimesh.Trimesh) and not mesh.is_empty:
+        cache.put_mesh(key, mesh)
+    return mesh
+
+def load_mesh(file_path, operation_name, memory_budget=None):
+    """Loads an STL file as a trimesh.Trimesh. With a memory_budget (MB), a file too large to
+    load within it raises mesh_memory.MemoryBudgetError before anything is read."""
+    if memory_budget:
+        needed = mesh_memory.current_rss_mb() + mesh_memory.estimate_load_mb(file_path)
+        if needed > memory_budget:
+            raise mesh_memory.MemoryBudgetError(
+                f"loading {os.path.basename(file_path)} needs about {needed:.0f} MB, over the {memory_budget:.0f} MB budget.")
+    with stage(f"load:{operation_name}") as record:
+        return record.output(load_stl_mesh(file_path))
+
+def load_healed_mesh(file_path, operation_name, cache=None, digest=None, memory_budget=None):
+    """Loads and heals a mesh, reusing the cached healed arrays for identical file bytes."""
+    if cache is None:
+        return heal_mesh(load_mesh(file_path, operation_name, memory_budget), operation_name)
+    digest = digest or file_digest(file_path)
+    return cached_mesh(cache, digest, 'healed', lambda: heal_mesh(load_mesh(file_path, operation_name, memory_budget), operation_name), operation_name)
+
+def perturbation_rng(model_digest, logo_digest):
+    """Returns a random generator seeded from the input content, so identical inputs perturb identically."""
+    seed = hashlib.sha256(f"{model_digest}:{logo_digest}".encode('utf-8')).digest()
+    return np.random.default_rng(int.from_bytes(seed[:8], 'little'))
 
 def convert_to_pyvista(mesh_trimesh):
-    """Converts a Trimesh object to a PyVista PolyData object."""
+    """Converts a Trimesh object to a PyVista PolyData object that shares its vertex and face buffers."""
+    import pyvista as pv  # Only loaded when the PyVista engine runs
     if mesh_trimesh is None or not hasattr(mesh_trimesh, 'vertices') or not hasattr(mesh_trimesh, 'faces') or len(mesh_trimesh.faces) == 0:
         return None
-    return pv.PolyData(mesh_trimesh.vertices, np.hstack((np.full((len(mesh_trimesh.faces), 1), 3), mesh_trimesh.faces)))
+    return pv.wrap(polydata_from_arrays(mesh_trimesh.vertices, mesh_trimesh.faces, deep=False))
 
 def convert_to_trimesh(mesh_pyvista):
     """Converts a PyVista PolyData object back to a Trimesh object."""
+    import trimesh
     if mesh_pyvista is None or mesh_pyvista.n_points == 0 or mesh_pyvista.n_cells == 0:
         return trimesh.Trimesh()
-    return trimesh.Trimesh(vertices=mesh_pyvista.points, faces=mesh_pyvista.faces.reshape(-1, 4)[:, 1:])
+    vertices, faces = arrays_from_polydata(mesh_pyvista)
+    return trimesh.Trimesh(vertices=vertices, faces=faces)
 
 def boolean_operation_trimesh(model_mesh, logo_mesh, operation):
     """Attempts a boolean operation using Trimesh, returns None on failure."""
@@ -42,6 +148,8 @@ def boolean_operation_trimesh(model_mesh, logo_mesh, operation):
             result = model_mesh.intersection(logo_mesh, engine='blender')
         elif operation == 'difference':
             result = model_mesh.difference(logo_mesh, engine='blender')
+        elif operation == 'union':
+            result = model_mesh.union(logo_mesh, engine='blender')
         else:
             return None
         if result is None or result.is_empty:
@@ -60,58 +168,553 @@ def boolean_operation_pyvista(model_mesh_pv, logo_mesh_pv, operation):
             return model_mesh_pv.boolean_intersection(logo_mesh_pv)
         elif operation == 'difference':
             return model_mesh_pv.boolean_difference(logo_mesh_pv)
+        elif operation == 'union':
+            return model_mesh_pv.boolean_union(logo_mesh_pv)
     except Exception as e:
         print(f"[PyVista Engine] Failed with error: {e}", file=sys.stderr)
     return None
 
-def boolean_operation(model_file_path, logo_file_path, output_file_path, operation='subtraction', thickness_delta=1.0):
+# --- Engine Selection ---
+def run_engine(engine, mesh_a, mesh_b, operation):
+    """Runs one named boolean engine and returns a Trimesh, or None on failure or empty output."""
+    if engine == 'trimesh':
+        with stage(f"boolean:trimesh:{operation}", mesh_a) as record:
+            return record.output(boolean_operation_trimesh(mesh_a, mesh_b, operation))
+    with stage("convert:to_pyvista", mesh_a):
+        mesh_a_pv = convert_to_pyvista(mesh_a)
+        mesh_b_pv = convert_to_pyvista(mesh_b)
+    if not mesh_a_pv or not mesh_b_pv:
+        print(f"[{engine} Engine] Could not convert meshes to PyVista format.", file=sys.stderr)
+        return None
+    with stage(f"boolean:pyvista:{operation}", mesh_a_pv) as record:
+        result_pv = record.output(boolean_operation_pyvista(mesh_a_pv, mesh_b_pv, operation))
+    with stage("convert:from_pyvista", result_pv) as record:
+        result = record.output(convert_to_trimesh(result_pv))
+    return None if result.is_empty else result
+
+def is_valid_result(mesh):
+    """A usable engine result is a non-empty mesh with finite coordinates."""
+    return mesh is not None and not mesh.is_empty and bool(np.isfinite(mesh.vertices).all())
+
+def _race_engine_process(engine, vertices_a, faces_a, vertices_b, faces_b, operation, results):
+    """Child process body for race mode: runs one engine and posts (engine, vertices, faces)."""
+    import trimesh
+    try:
+        mesh_a = trimesh.Trimesh(vertices=vertices_a, faces=faces_a, process=False)
+        mesh_b = trimesh.Trimesh(vertices=vertices_b, faces=faces_b, process=False)
+        result = run_engine(engine, mesh_a, mesh_b, operation)
+        if is_valid_result(result):
+            # Pickled back to the parent, so send the narrowest lossless arrays.
+            results.put((engine, *mesh_memory.compact_arrays(result.vertices, result.faces)))
+            return
+    except Exception as e:
+        print(f"[Engine Race] '{engine}' raised: {e}", file=sys.stderr)
+    results.put((engine, None, None))
+
+def race_boolean_engines(mesh_a, mesh_b, operation, deadline=None):
+    """Starts every engine in its own process and returns (mesh, engine) for the first valid
+    result, terminating the others. Returns (None, None) if all fail or the deadline passes."""
+    import trimesh
+    start_methods = multiprocessing.get_all_start_methods()
+    context = multiprocessing.get_context('fork' if 'fork' in start_methods else 'spawn')
+    results = context.Queue()
+    processes = {
+        engine: context.Process(
+            target=_race_engine_process,
+            args=(engine, np.asarray(mesh_a.vertices), np.asarray(mesh_a.faces),
+                  np.asarray(mesh_b.vertices), np.asarray(mesh_b.faces), operation, results),
+            daemon=True,
+        )
+        for engine in RACE_ENGINES
+    }
+    start_time = time.monotonic()
+    print(f"[Engine Race] Starting {', '.join(RACE_ENGINES)} for {operation}...")
+    for process in processes.values():
+        process.start()
+
+    pending = set(processes)
     try:
-        model_mesh = heal_mesh(trimesh.load_mesh(model_file_path, force='mesh'), "initial_model")
-        logo_mesh = heal_mesh(trimesh.load_mesh(logo_file_path, force='mesh'), "initial_logo")
+        while pending:
+            if deadline is not None and time.monotonic() >= deadline:
+                print(f"[Engine Race] Time budget exhausted with {sorted(pending)} still running.", file=sys.stderr)
+                return None, None
+            try:
+                engine, vertices, faces = results.get(timeout=0.1)
+            except queue.Empty:
+                # An engine that crashed (e.g. a native segfault) never reports back.
+                for engine in [e for e in pending if not processes[e].is_alive() and processes[e].exitcode != 0]:
+                    print(f"[Engine Race] '{engine}' exited with code {processes[engine].exitcode}.", file=sys.stderr)
+                    pending.discard(engine)
+                continue
+            pending.discard(engine)
+            if vertices is None:
+                print(f"[Engine Race] '{engine}' failed after {time.monotonic() - start_time:.2f}s.")
+                continue
+            print(f"[Engine Race] '{engine}' won after {time.monotonic() - start_time:.2f}s.")
+            return trimesh.Trimesh(vertices=vertices, faces=faces, process=False), engine
+        return None, None
+    finally:
+        for process in processes.values():
+            if process.is_alive():
+                process.terminate()
+            process.join()
+        results.close()
+
+# Cells between the overlap box and the seam where a local voxel difference is bridged into
+# the model, and again between the seam and the edge of the voxelized region.
+VOXEL_SEAM_CELLS = 3
+
+def run_voxel_engine(mesh_a, mesh_b, operation, resolution, deadline=None, log_prefix="[Fallback]", failed='pyvista', region=None):
+    """Last resort once the exact engines (the last of which is named by failed) gave up: the
+    voxel/SDF engine (see mesh_voxel), unless the time budget is spent. Returns (mesh, engine).
+
+    A difference only re-meshes mesh_a near the overlap with mesh_b (or near region, a (2, 3)
+    box such as the crop box) and bridges that patch into the rest of mesh_a, which stays exact.
+    """
+    import trimesh
+    if deadline is not None and time.monotonic() >= deadline:
+        print(f"{log_prefix} Time budget exhausted. Skipping the voxel engine.", file=sys.stderr)
+        return None, None
+    print(f"{log_prefix} Exact engines failed. Retrying with the voxel engine (resolution {resolution})...")
+    note_fallback(f"{operation}:{failed}->voxel")
+
+    def run_voxel(region_a, tool, op):
+        with stage(f"boolean:voxel:{op}", region_a) as record:
+            vertices, faces, pitch = mesh_voxel.voxel_boolean(region_a.vertices, region_a.faces, tool.vertices, tool.faces, op, resolution)
+            result = record.output(trimesh.Trimesh(vertices=vertices, faces=faces, process=False) if len(faces) else None)
+        print(f"[Voxel Engine] {op} at pitch {pitch:.4g}: {len(faces)} faces.")
+        return result, ('voxel' if result is not None else None)
+
+    overlap = mesh_voxel.overlap_bounds(mesh_a.bounds, mesh_b.bounds)
+    if operation != 'difference' or overlap is None:
+        return run_voxel(mesh_a, mesh_b, operation)
+    # The pitch voxel_grid picks for this overlap (unless it has to coarsen the grid).
+    margin = VOXEL_SEAM_CELLS * (overlap[1] - overlap[0]).max() / resolution
+    bounds = np.array(region if region is not None else overlap, dtype=np.float64)
+    bounds[0] -= margin
+    bounds[1] += margin
+    model_bounds = np.asarray(mesh_a.bounds)
+    if np.all(bounds[0] <= model_bounds[0]) and np.all(bounds[1] >= model_bounds[1]):
+        return run_voxel(mesh_a, mesh_b, operation)
+    try:
+        return mesh_crop.bridged_boolean(mesh_a, mesh_b, operation, bounds, margin, run_voxel)
+    except mesh_crop.CropError as e:
+        print(f"[Voxel Engine] {e} Retrying on the full model...", file=sys.stderr)
+        note_fallback(f"{operation}:voxel-bridge->full")
+        return run_voxel(mesh_a, mesh_b, operation)
+
+def run_boolean_engines(mesh_a, mesh_b, operation, engine_mode='sequential', deadline=None, log_prefix="[Fallback]", voxel_resolution=None):
+    """Runs a boolean with the selected engine mode and returns (mesh, engine). With a
+    voxel_resolution, the voxel engine runs when the exact engines all fail."""
+    if engine_mode == 'race':
+        with stage(f"boolean:race:{operation}", mesh_a) as record:
+            result, engine = race_boolean_engines(mesh_a, mesh_b, operation, deadline)
+            record.output(result)
+    else:
+        # --- Primary Engine: Trimesh ---
+        result, engine = run_engine('trimesh', mesh_a, mesh_b, operation), 'trimesh'
+        if result is None:
+            # --- Fallback Engine: PyVista ---
+            print(f"{log_prefix} Trimesh failed. Retrying with PyVista...")
+            note_fallback(f"{operation}:trimesh->pyvista")
+            result, engine = run_engine('pyvista', mesh_a, mesh_b, operation), 'pyvista'
+    if result is not None:
+        return result, engine
+
+    # --- Last Resort: Voxel/SDF Engine ---
+    if voxel_resolution:
+        return run_voxel_engine(mesh_a, mesh_b, operation, voxel_resolution, deadline, log_prefix, 'race' if engine_mode == 'race' else 'pyvista')
+    return None, None
+
+def run_cropped_boolean(model_mesh, tool_mesh, operation, crop_margin, engine_mode='sequential', deadline=None, log_prefix="[Fallback]", region_tolerance=None, voxel_resolution=None):
+    """Runs the boolean only on the part of the model around the tool and merges it back.
+    Falls back to the full model when cropping does not apply. Returns (mesh, engine).
+    region_tolerance simplifies the cropped model surface first (preview quality).
+    A voxel surface cannot be stitched into the model's seam, so with a voxel_resolution the
+    voxel engine runs when the exact engines fail on the region and is bridged into the model
+    around the crop box instead (see run_voxel_engine)."""
+    def run_boolean(mesh_a, mesh_b, op):
+        return run_boolean_engines(mesh_a, mesh_b, op, engine_mode, deadline, log_prefix, voxel_resolution)
+
+    crop_box = mesh_crop.crop_bounds(model_mesh, tool_mesh, crop_margin)
+    if crop_box is None:
+        print("[Crop] Tool region covers most of the model. Using the full model.")
+        note_fallback(f"{operation}:crop->full")
+        return run_boolean(model_mesh, tool_mesh, operation)
+    try:
+        result, engine = mesh_crop.cropped_boolean(
+            model_mesh, tool_mesh, operation, crop_box,
+            lambda mesh_a, mesh_b, op: run_boolean_engines(mesh_a, mesh_b, op, engine_mode, deadline, log_prefix), region_tolerance)
+    except mesh_crop.CropError as e:
+        print(f"[Crop] {e} Retrying on the full model...", file=sys.stderr)
+        note_fallback(f"{operation}:crop->full")
+        return run_boolean(model_mesh, tool_mesh, operation)
+    if result is None and voxel_resolution:
+        return run_voxel_engine(model_mesh, tool_mesh, operation, voxel_resolution, deadline, log_prefix, 'crop', crop_box)
+    return result, engine
+
+def simplify_logo(logo_mesh, tolerance):
+    """Simplifies a healed logo to a geometric tolerance (see mesh_simplify)."""
+    with stage("simplify_logo", logo_mesh) as record:
+        simplified = record.output(simplify_mesh(logo_mesh, tolerance))
+    print(f"[Quality] Logo simplified to tolerance {tolerance}: {len(logo_mesh.faces)} -> {len(simplified.faces)} faces.")
+    return simplified
+
+# --- Memory Budget ---
+# Share of its faces a logo (or the cropped model region) keeps in the preview tier, for estimates.
+PREVIEW_FACE_FRACTION = 0.5
+
+def plan_memory_budget(model_mesh, logo_meshes, operation, memory_budget, crop, crop_margin, engine_mode, quality):
+    """Picks the settings that keep the job's estimated peak within memory_budget MB, degrading to
+    crop, then sequential engines, then preview quality as needed (see mesh_memory).
+    Returns (settings dict, degradations taken, estimated peak MB)."""
+    import trimesh
+    model_faces = len(model_mesh.faces)
+    tool_faces = sum(len(logo.faces) for logo in logo_meshes)
+    crop_box = mesh_crop.crop_bounds(model_mesh, trimesh.util.concatenate(logo_meshes), crop_margin)
+    region_faces = mesh_crop.region_face_count(model_mesh, crop_box) if crop_box is not None else model_faces
+    # Thin intersection runs its engines against two model-sized meshes (the model and its offset).
+    model_inputs = 2 if operation == 'thin_intersection' else 1
+
+    def estimate(crop=crop, engine_mode=engine_mode, quality=quality):
+        fraction = PREVIEW_FACE_FRACTION if quality == 'preview' else 1.0
+        engine_faces = region_faces * fraction if crop else model_faces
+        engines = len(RACE_ENGINES) if engine_mode == 'race' else 1
+        return mesh_memory.estimate_boolean_mb(model_faces * model_inputs, tool_faces * fraction, engine_faces * model_inputs, engines)
+
+    steps = []
+    if not crop and crop_box is not None:
+        steps.append(('crop', {'crop': True}))
+    if engine_mode == 'race':
+        steps.append(('sequential', {'engine_mode': 'sequential'}))
+    if quality != 'preview':
+        steps.append(('preview', {'quality': 'preview'}))
+    settings, degraded, peak = mesh_memory.plan_budget(memory_budget, estimate, steps, mesh_memory.current_rss_mb())
+    return {'crop': crop, 'engine_mode': engine_mode, 'quality': quality, **settings}, degraded, peak
+
+# --- Thin Intersection ---
+THIN_BAND_ATTEMPTS = 3
+# Thin bands that failed to build in this process, so later requests go straight to the stages.
+_failed_thin_bands = set()
+
+def offset_model(model_mesh, model_digest, thickness_delta, thin_offset=DEFAULT_THIN_OFFSET, cache=None):
+    """Returns the healed offset copy of the model used by thin intersection (see mesh_thin)."""
+    def build():
+        with stage("offset_model", model_mesh) as record:
+            model_offset = record.output(offset_model_mesh(model_mesh, thickness_delta, thin_offset))
+        return heal_mesh(model_offset, "stage2_offset_model")
+    return cached_mesh(cache, model_digest, f"healed_offset_{thin_offset}_{thickness_delta!r}", build, "stage2_offset_model")
+
+def thin_band(model_mesh, model_digest, thickness_delta, thin_offset=DEFAULT_THIN_OFFSET, cache=None, deadline=None):
+    """Returns the thin band (model intersected with its offset copy), or None if it cannot be built.
+
+    The band only depends on the model, thickness_delta and the offset mode, so it is cached and
+    each thin intersection needs one boolean of the logo against it.
+    """
+    import trimesh
+    variant = f"thin_band_{thin_offset}_{thickness_delta!r}"
+    if (model_digest, variant) in _failed_thin_bands:
+        return None
+
+    def build():
+        model_offset = offset_model(model_mesh, model_digest, thickness_delta, thin_offset, cache)
+        band = None
+        for attempt in range(THIN_BAND_ATTEMPTS):
+            # Vertical walls stay coplanar under a Z shift, which the engines cannot classify; a tiny
+            # seeded sideways shift (as for the logo perturbation) avoids that, and a new seed per
+            # attempt gives the engines a differently perturbed pair to try.
+            rng = perturbation_rng(model_digest, f"{variant}:{attempt}")
+            # Only the vertices move, so the shifted copy shares the offset model's faces.
+            shift = np.append((rng.random(2) - 0.5) * 0.01, 0.0)
+            shifted = trimesh.Trimesh(vertices=model_offset.vertices + shift, faces=model_offset.faces, process=False)
+            # Always raced: the engines run in child processes, so a native crash on this large pair
+            # costs one attempt instead of the whole worker.
+            with stage("thin_band", model_mesh) as record:
+                band, engine = run_boolean_engines(model_mesh, shifted, 'intersection', 'race', deadline, "[Thin Band]")
+                record.output(band)
+            if band is not None and not band.is_empty:
+                break
+            print(f"[Thin Band] Attempt {attempt + 1} of {THIN_BAND_ATTEMPTS} failed.", file=sys.stderr)
+        if band is None or band.is_empty:
+            return trimesh.Trimesh()
+        print(f"[Thin Band] Built {thin_offset} band for delta {thickness_delta} with {engine}: {len(band.faces)} faces.")
+        band = heal_mesh(band, "thin_band")
+        if not band.is_watertight:
+            # Every logo is intersected with the band; an open band makes those booleans fail or crash.
+            print("[Thin Band] Band is not watertight after healing.", file=sys.stderr)
+            return trimesh.Trimesh()
+        return band
+
+    band = cached_mesh(cache, model_digest, variant, build, "thin_band")
+    if band is None or band.is_empty:
+        if deadline is None or time.monotonic() < deadline:  # Out of time is not a property of the model
+            _failed_thin_bands.add((model_digest, variant))
+        return None
+    return band
+
+# --- Multiple Logos ---
+def group_overlapping_tools(tool_meshes):
+    """Groups tool indices whose bounding boxes overlap (directly or through a chain of tools)."""
+    parent = list(range(len(tool_meshes)))
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+    bounds = [np.asarray(mesh.bounds) for mesh in tool_meshes]
+    for i in range(len(bounds)):
+        for j in range(i + 1, len(bounds)):
+            if np.all(bounds[i][0] <= bounds[j][1]) and np.all(bounds[j][0] <= bounds[i][1]):
+                parent[find(j)] = find(i)
+    groups = {}
+    for i in range(len(tool_meshes)):
+        groups.setdefault(find(i), []).append(i)
+    return list(groups.values())
+
+def union_tool_group(meshes, engine_mode='sequential', deadline=None):
+    """Unions overlapping tools pairwise, level by level (a balanced tree keeps the operands
+    small). Returns the union, or None if any union fails or is not a closed solid."""
+    level = list(meshes)
+    while len(level) > 1:
+        next_level = []
+        for i in range(0, len(level) - 1, 2):
+            merged, engine = run_boolean_engines(level[i], level[i + 1], 'union', engine_mode, deadline, "[Tool Union]")
+            if merged is None or merged.is_empty:
+                return None
+            merged = heal_mesh(merged, "tool_union")
+            if not merged.is_watertight:
+                # An open tool makes the model boolean fail; applying the tools one by one is safer.
+                print(f"[Tool Union] Union from {engine} is not watertight.", file=sys.stderr)
+                return None
+            next_level.append(merged)
+        if len(level) % 2:
+            next_level.append(level[-1])
+        level = next_level
+    return level[0]
+
+def combine_tool_meshes(tool_meshes, engine_mode='sequential', deadline=None):
+    """Combines several tools so one boolean can apply them all.
+
+    Tools with overlapping bounding boxes are unioned; groups that do not overlap are simply
+    concatenated, which is already a valid closed tool. Returns a list of tools: one mesh
+    normally, or one per tool in a group whose union failed.
+    """
+    import trimesh
+    if len(tool_meshes) == 1:
+        return list(tool_meshes)
+    groups = group_overlapping_tools(tool_meshes)
+    print(f"[Tool Union] {len(tool_meshes)} tools in {len(groups)} overlap group(s).")
+    combined, separate = [], []
+    with stage("tool_union") as record:
+        for group in groups:
+            members = [tool_meshes[i] for i in group]
+            merged = union_tool_group(members, engine_mode, deadline) if len(members) > 1 else members[0]
+            if merged is None:
+                print(f"[Tool Union] Union of tools {group} failed. Applying them one at a time.", file=sys.stderr)
+                note_fallback("tool_union->separate")
+                separate.extend(members)
+            else:
+                combined.append(merged)
+        tools = ([trimesh.util.concatenate(combined)] if combined else []) + separate
+        record.output(tools[0])
+    return tools
+
+def apply_tools(model_mesh, tools, operation, engine_mode='sequential', deadline=None, crop=False, crop_margin=2.0, region_tolerance=None, voxel_resolution=None):
+    """Applies each tool to the model in turn with one boolean each. Returns (mesh, engine)."""
+    import trimesh
+    if operation == 'intersection' and len(tools) > 1:
+        # Intersecting one tool after another would keep only their common part; the union failed,
+        # so hand the engines the overlapping tools as one mesh instead.
+        print("[Tool Union] Intersecting with the un-unioned tools as a single mesh.", file=sys.stderr)
+        tools = [trimesh.util.concatenate(tools)]
+    result, engine = model_mesh, None
+    for tool in tools:
+        if crop:
+            result, engine = run_cropped_boolean(result, tool, operation, crop_margin, engine_mode, deadline, region_tolerance=region_tolerance, voxel_resolution=voxel_resolution)
+        else:
+            result, engine = run_boolean_engines(result, tool, operation, engine_mode, deadline, voxel_resolution=voxel_resolution)
+        if result is None or result.is_empty:
+            return None, engine
+    return result, engine
+
+def boolean_operation(model_file_path, logo_file_path, output_file_path, operation='subtraction', thickness_delta=1.0, output_format='binary', use_cache=True, engine_mode='sequential', time_budget=None, crop=False, crop_margin=2.0, model_mesh=None, model_digest=None, preflight=True, quality=DEFAULT_QUALITY, thin_offset=DEFAULT_THIN_OFFSET, thin_engine='band', memory_budget=None, voxel_resolution=mesh_voxel.DEFAULT_VOXEL_RESOLUTION):
+    """Runs one boolean job. logo_file_path may be a list of logo files, which are combined into
+    one tool (see combine_tool_meshes) so the model goes through a single boolean.
+    model_mesh/model_digest let a caller that already loaded and healed the model (e.g. batch
+    mode) skip doing it again; the mesh is not modified. With preflight, a logo that does not
+    reach into the model fails the job before any boolean runs. quality ('preview', 'standard'
+    or 'final') sets how far the logo (and in preview the cropped model region) is simplified.
+    thin_offset ('z' or 'normal') and thin_engine ('band' or 'stages') control thin_intersection.
+    memory_budget (MB) caps the estimated peak memory: the job degrades its settings to fit, or
+    fails without running if it cannot (see plan_memory_budget). When the exact engines fail,
+    the voxel engine retries at voxel_resolution (0 or None turns it off)."""
+    try:
+        # The time budget covers the whole request; race mode stops engines that run past it.
+        deadline = time.monotonic() + time_budget if time_budget else None
+        cache = get_default_cache() if use_cache else None
+        annotate(operation=operation, thickness_delta=thickness_delta, output_format=output_format,
+                 engine_mode=engine_mode, crop=crop, quality=quality, version=SCRIPT_VERSION)
+        if operation == 'thin_intersection':
+            annotate(thin_offset=thin_offset)
+        tier = QUALITY_TIERS[quality]
+        logo_file_paths = [logo_file_path] if isinstance(logo_file_path, (str, os.PathLike)) else list(logo_file_path)
+        annotate(logo_count=len(logo_file_paths))
+        inputs = [(path, "Logo") for path in logo_file_paths]
+        if model_mesh is None:
+            inputs.insert(0, (model_file_path, "Model"))
+        for path, description in inputs:
+            error = input_file_error(path, description)
+            if error:
+                print(f"Error: {error}", file=sys.stderr)
+                return False
+        with stage("digest"):
+            model_digest = model_digest or file_digest(model_file_path)
+            logo_digests = [file_digest(path) for path in logo_file_paths]
+            # A single logo keeps its own digest, so existing cache entries stay valid.
+            logo_digest = logo_digests[0] if len(logo_digests) == 1 else hashlib.sha256(":".join(logo_digests).encode('utf-8')).hexdigest()
+
+        # --- Result Cache ---
+        # Identical requests (same inputs, operation, delta, thin offset/engine and script version) reuse the stored STL.
+        result_key = None
+        if cache is not None:
+            crop_tag = f"_crop_{crop_margin!r}" if crop else ""
+            quality_tag = f"_{quality}" if quality != 'final' else ""
+            thin_tag = ""
+            if operation == 'thin_intersection':
+                thin_tag = (f"_{thin_offset}" if thin_offset != 'z' else "") + (f"_{thin_engine}" if thin_engine != 'band' else "")
+            result_key = cache.make_key(f"{model_digest}:{logo_digest}", f"result_{operation}_{thickness_delta!r}{thin_tag}_{output_format}{crop_tag}{quality_tag}_{SCRIPT_VERSION}")
+            with stage("result_cache_lookup"):
+                cached_result = cache.get_bytes(result_key)
+            annotate(result_cache='hit' if cached_result is not None else 'miss')
+            if cached_result is not None:
+                print(f"[Result Cache] Hit for '{operation}'. Writing stored result to {output_file_path}")
+                with open(output_file_path, 'wb') as f:
+                    f.write(cached_result)
+                return True
+
+        if model_mesh is None:
+            model_mesh = load_healed_mesh(model_file_path, "initial_model", cache, model_digest, memory_budget)
+        if len(logo_file_paths) == 1:
+            logo_meshes = [load_healed_mesh(logo_file_paths[0], "initial_logo", cache, logo_digest, memory_budget)]
+        else:
+            logo_meshes = [load_healed_mesh(path, f"initial_logo_{i}", cache, digest, memory_budget)
+                           for i, (path, digest) in enumerate(zip(logo_file_paths, logo_digests))]
+
+        # --- Memory Budget ---
+        if memory_budget:
+            with stage("memory_plan", model_mesh):
+                settings, degraded, peak = plan_memory_budget(model_mesh, logo_meshes, operation, memory_budget, crop, crop_margin, engine_mode, quality)
+            annotate(memory={'budget_mb': memory_budget, 'estimated_peak_mb': round(peak, 1), 'degraded': degraded})
+            if degraded:
+                print(f"[Memory] Estimated peak is over the {memory_budget:.0f} MB budget. Degrading to: {', '.join(degraded)} (about {peak:.0f} MB).")
+                for step in degraded:
+                    note_fallback(f"memory->{step}")
+                crop, engine_mode, quality = settings['crop'], settings['engine_mode'], settings['quality']
+                tier = QUALITY_TIERS[quality]
+                annotate(crop=crop, engine_mode=engine_mode, quality=quality)
+                if operation == 'thin_intersection' and thin_engine == 'band':
+                    # Building the band races both engines on two model-sized meshes; the stages follow
+                    # the degraded settings.
+                    thin_engine = 'stages'
+                result_key = None  # The result no longer matches the requested settings, so it is not stored
+
+        # --- Quality Tier ---
+        # Coarser tiers simplify each logo to the tier's tolerance before anything else touches it.
+        if tier['logo_tolerance'] is not None:
+            tolerance = tier['logo_tolerance']
+            logo_meshes = [
+                cached_mesh(cache, digest, f"healed_simplified_{tolerance!r}", lambda mesh=mesh: simplify_logo(mesh, tolerance), "simplify_logo")
+                for digest, mesh in zip(logo_digests, logo_meshes)]
+
+        # --- Preflight ---
+        if preflight:
+            try:
+                with stage("preflight", model_mesh):
+                    index = mesh_preflight.model_index(model_mesh, model_digest)
+                    overlaps = [mesh_preflight.check_overlap(index, logo, operation, f"Logo {os.path.basename(path)}")
+                                for path, logo in zip(logo_file_paths, logo_meshes)]
+            except mesh_preflight.PreflightError as e:
+                annotate(preflight={'ok': False, 'error': str(e)})
+                print(f"Error: Preflight rejected '{operation}': {e}", file=sys.stderr)
+                return False
+            annotate(preflight={'ok': True, 'logos': overlaps})
+            for path, overlap in zip(logo_file_paths, overlaps):
+                reaches = " The model reaches into the logo." if overlap['model_reaches_logo'] else ""
+                print(f"[Preflight] {os.path.basename(path)}: {overlap['overlap_area']:.2f} of {overlap['logo_area']:.2f} logo surface area inside the model.{reaches}")
+
+        tools = combine_tool_meshes(logo_meshes, engine_mode, deadline)
 
         # --- Geometric Perturbation ---
-        # Apply a tiny random translation and scale to the logo to avoid coplanar issues.
-        perturb_translation = (np.random.rand(3) - 0.5) * 0.01  # Max 0.005mm translation
-        perturb_scale = 1.0 + (np.random.rand() - 0.5) * 0.001 # Max 0.05% scale change
-        logo_mesh.apply_translation(perturb_translation)
-        logo_mesh.apply_scale(perturb_scale)
+        # Apply a tiny translation and scale to the logo to avoid coplanar issues. The offsets are
+        # seeded from the input content so identical requests produce identical output.
+        with stage("perturbation", tools[0]) as record:
+            rng = perturbation_rng(model_digest, logo_digest)
+            perturb_translation = (rng.random(3) - 0.5) * 0.01  # Max 0.005mm translation
+            perturb_scale = 1.0 + (rng.random() - 0.5) * 0.001 # Max 0.05% scale change
+            for tool in tools:
+                tool.apply_translation(perturb_translation)
+                tool.apply_scale(perturb_scale)
+            record.output(tools[0])
         print(f"[Perturbation] Applied to logo: Translation={perturb_translation}, Scale={perturb_scale}")
 
-        final_mesh = None
         op_type = 'intersection' if operation in ['intersection', 'thin_intersection'] else 'difference'
-        
-        # --- Primary Engine: Trimesh ---
-        final_mesh = boolean_operation_trimesh(model_mesh, logo_mesh, op_type)
-
-        # --- Fallback Engine: PyVista ---
-        if final_mesh is None:
-            print(f"[Fallback] Trimesh failed. Retrying with PyVista...")
-            model_pv = convert_to_pyvista(model_mesh)
-            logo_pv = convert_to_pyvista(logo_mesh)
-            if model_pv and logo_pv:
-                final_mesh_pv = boolean_operation_pyvista(model_pv, logo_pv, op_type)
-                final_mesh = convert_to_trimesh(final_mesh_pv)
+        band = None
+        if operation == 'thin_intersection':
+            if thin_engine == 'band' and cache is None:
+                # Building the band costs about as much as the stages; it only pays off when cached.
+                print("[Thin Band] Mesh cache disabled. Using the staged thin intersection.")
+            elif thin_engine == 'band':
+                band = thin_band(model_mesh, model_digest, thickness_delta, thin_offset, cache, deadline)
+                if band is None:
+                    print("[Thin Band] Band could not be built. Using the staged thin intersection.", file=sys.stderr)
+                    note_fallback("thin_band->stages")
+
+        if band is not None:
+            # Logo AND band is the same solid as (logo AND model) AND offset model, in one boolean.
+            # No voxel fallback here: if the exact engines fail, the stages below get the next try.
+            final_mesh, engine = apply_tools(band, tools, 'intersection', engine_mode, deadline, crop, crop_margin, tier['region_tolerance'])
+            if final_mesh is None or final_mesh.is_empty:
+                print("[Thin Band] Intersection with the band failed. Using the staged thin intersection.", file=sys.stderr)
+                note_fallback("thin_band->stages")
+                band = None
             else:
-                print("[Fallback] Could not convert meshes to PyVista format.", file=sys.stderr)
-        
-        if operation == 'thin_intersection' and (final_mesh is not None and not final_mesh.is_empty):
+                print(f"[Engine] Thin intersection (band) result from: {engine or 'none'}")
+                annotate(engine=engine)
+        if band is None:
+            final_mesh, engine = apply_tools(model_mesh, tools, op_type, engine_mode, deadline, crop, crop_margin, tier['region_tolerance'], voxel_resolution)
+            print(f"[Engine] {op_type} result from: {engine or 'none'}")
+            annotate(engine=engine)
+            if engine == 'voxel':
+                result_key = None  # An approximation; a later script version may get the exact result
+        if operation == 'thin_intersection':
+            annotate(thin_engine='band' if band is not None else 'stages')
+
+        if operation == 'thin_intersection' and band is None and (final_mesh is not None and not final_mesh.is_empty):
              print("\n--- Continuing Thin Intersection (Post-Intersection) ---")
              stage1_healed = heal_mesh(final_mesh, "stage1_result")
-             
-             model_offset = model_mesh.copy()
-             model_offset.apply_transform(trimesh.transformations.translation_matrix([0, 0, thickness_delta]))
-             model_offset_healed = heal_mesh(model_offset, "stage2_offset_model")
-
-             final_mesh = boolean_operation_trimesh(stage1_healed, model_offset_healed, 'intersection')
-             if final_mesh is None:
-                 print("[Thin Int Stage 3] Trimesh failed. Retrying with PyVista...")
-                 stage1_healed_pv = convert_to_pyvista(stage1_healed)
-                 model_offset_healed_pv = convert_to_pyvista(model_offset_healed)
-                 if stage1_healed_pv and model_offset_healed_pv:
-                    final_mesh_pv = boolean_operation_pyvista(stage1_healed_pv, model_offset_healed_pv, 'intersection')
-                    final_mesh = convert_to_trimesh(final_mesh_pv)
-                 else:
-                    print("[Thin Int Stage 3] Could not convert meshes for PyVista.", file=sys.stderr)
+             model_offset_healed = offset_model(model_mesh, model_digest, thickness_delta, thin_offset, cache)
+
+             if crop:
+                 # Stage 1 lies inside the logo, so only the offset model's faces around it matter.
+                 crop_box = mesh_crop.crop_bounds(model_offset_healed, stage1_healed, crop_margin)
+                 if crop_box is not None:
+                     with stage("crop:clip_offset", model_offset_healed) as record:
+                         offset_region = record.output(mesh_crop.clip_to_box(model_offset_healed, crop_box))
+                     try:
+                         if offset_region.is_empty:
+                             raise mesh_crop.CropError("Offset model region is empty.")
+                         mesh_crop.require_closed(offset_region, "Offset model region")
+                     except mesh_crop.CropError as e:
+                         print(f"[Crop] {e} Using the whole offset model...", file=sys.stderr)
+                         note_fallback("thin_stage3:crop->full")
+                     else:
+                         print(f"[Crop] Offset model region: {len(offset_region.faces)} of {len(model_offset_healed.faces)} faces.")
+                         model_offset_healed = offset_region
+             final_mesh, engine = run_boolean_engines(stage1_healed, model_offset_healed, 'intersection', engine_mode, deadline, "[Thin Int Stage 3]", voxel_resolution)
+             print(f"[Engine] Thin intersection stage 3 result from: {engine or 'none'}")
+             annotate(thin_stage3_engine=engine)
+             if engine == 'voxel':
+                 result_key = None
 
 
         if final_mesh is None or final_mesh.is_empty:
@@ -123,33 +726,233 @@ def boolean_operation(model_file_path, logo_file_path, output_file_path, operati
             print("Error: Mesh is empty after final healing.", file=sys.stderr)
             return False
 
-        print(f"Saving final mesh to {output_file_path}")
-        final_healed_mesh.export(output_file_path, file_type='stl_ascii')
+        print(f"Saving final mesh to {output_file_path} ({output_format} STL)")
+        with stage(f"export:{output_format}", final_healed_mesh):
+            export_stl_mesh(final_healed_mesh, output_file_path, output_format)
+        if result_key is not None:
+            with open(output_file_path, 'rb') as f:
+                cache.put_bytes(result_key, f.read())
         return True
 
+    except mesh_memory.MemoryBudgetError as e:
+        annotate(memory={'budget_mb': memory_budget, 'error': str(e)})
+        print(f"Error: Memory budget exceeded for '{operation}': {e}", file=sys.stderr)
+        return False
     except Exception as e:
         print(f"A critical unexpected error occurred in boolean_operation: {e}", file=sys.stderr)
         import traceback
         traceback.print_exc(file=sys.stderr)
         return False
 
+# --- Batch Mode ---
+# Batch worker state: the healed model shared by every job in a worker process.
+_batch_model = None
+
+def load_batch_manifest(manifest_path, model_file_path=None):
+    """Reads a batch manifest and returns (model_path, jobs) with paths resolved relative to it.
+
+    Manifest: {"model": "...", "defaults": {...}, "jobs": [{"logo": "...", "output": "...",
+    "operation": "...", "thickness_delta": 1.0, "output_format": "binary"}, ...]}
+    "logo" may also be a list of logo files that are applied together in one pass.
+    """
+    with open(manifest_path, 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+    base_dir = os.path.dirname(os.path.abspath(manifest_path))
+    resolve = lambda path: path if os.path.isabs(path) else os.path.join(base_dir, path)
+
+    model_path = model_file_path or manifest.get('model')
+    if not model_path:
+        raise ValueError("Batch manifest has no 'model' and none was given on the command line.")
+    if not model_file_path:
+        model_path = resolve(model_path)
+    defaults = {'operation': 'subtraction', 'thickness_delta': 1.0, 'output_format': 'binary', **manifest.get('defaults', {})}
+    jobs = []
+    for index, entry in enumerate(manifest.get('jobs', [])):
+        job = {**defaults, **entry, 'index': index}
+        if not job.get('logo') or 'output' not in job:
+            raise ValueError(f"Batch job {index} needs 'logo' and 'output'.")
+        if job['operation'] not in OPERATIONS:
+            raise ValueError(f"Batch job {index} has unknown operation '{job['operation']}'.")
+        if job['output_format'] not in OUTPUT_FORMATS:
+            raise ValueError(f"Batch job {index} has unknown output format '{job['output_format']}'.")
+        job['logo'] = [resolve(path) for path in job['logo']] if isinstance(job['logo'], list) else resolve(job['logo'])
+        job['output'] = resolve(job['output'])
+        job['thickness_delta'] = float(job['thickness_delta'])
+        jobs.append(job)
+    return model_path, jobs
+
+def _init_batch_worker(model_vertices, model_faces, model_digest):
+    import trimesh
+    global _batch_model
+    _batch_model = (trimesh.Trimesh(vertices=model_vertices, faces=model_faces, process=False), model_digest)
+
+def _run_batch_job(model_file_path, job, settings):
+    """Batch worker body: runs one manifest job against the shared healed model."""
+    model_mesh, model_digest = _batch_model
+    start = time.perf_counter()
+    logos = job['logo'] if isinstance(job['logo'], list) else [job['logo']]
+    print(f"\n--- Batch job {job['index']}: {job['operation']} with {', '.join(os.path.basename(path) for path in logos)} ---")
+    output_dir = os.path.dirname(job['output'])
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+    ok = boolean_operation(
+        model_file_path, job['logo'], job['output'],
+        operation=job['operation'], thickness_delta=job['thickness_delta'], output_format=job['output_format'],
+        model_mesh=model_mesh, model_digest=model_digest, **settings)
+    return {'ok': bool(ok), 'seconds': round(time.perf_counter() - start, 3),
+            'error': None if ok else "boolean_operation reported failure (see log)."}
+
+def _run_batch_pool(model_file_path, jobs, workers, settings, model_arrays):
+    """Runs jobs on a fresh worker pool. Returns (results by job index, jobs lost to a broken pool)."""
+    # fork shares the healed model with the workers without re-sending it; spawn pickles it once per worker.
+    start_methods = multiprocessing.get_all_start_methods()
+    context = multiprocessing.get_context('fork' if 'fork' in start_methods else 'spawn')
+    results, broken = {}, []
+    with ProcessPoolExecutor(max_workers=min(workers, len(jobs)), mp_context=context,
+                             initializer=_init_batch_worker, initargs=model_arrays) as pool:
+        futures = {pool.submit(_run_batch_job, model_file_path, job, settings): job for job in jobs}
+        for future in as_completed(futures):
+            job = futures[future]
+            try:
+                results[job['index']] = future.result()
+            except BrokenProcessPool:
+                broken.append(job)
+            except Exception as e:
+                results[job['index']] = {'ok': False, 'seconds': None, 'error': f"Job raised: {e}"}
+    return results, broken
+
+def batch_boolean_operations(model_file_path, jobs, workers=DEFAULT_BATCH_WORKERS, use_cache=True, engine_mode='sequential', time_budget=None, crop=False, crop_margin=2.0, preflight=True, quality=DEFAULT_QUALITY, thin_offset=DEFAULT_THIN_OFFSET, thin_engine='band', memory_budget=None, voxel_resolution=mesh_voxel.DEFAULT_VOXEL_RESOLUTION):
+    """Runs many boolean jobs against one model: the model is loaded and healed once, jobs are
+    spread across worker processes, and a failing job does not stop the others.
+
+    Returns a summary dict with one result entry per job (in manifest order).
+    """
+    start = time.perf_counter()
+    cache = get_default_cache() if use_cache else None
+    model_digest = file_digest(model_file_path)
+    model_mesh = load_healed_mesh(model_file_path, "initial_model", cache, model_digest, memory_budget)
+    if preflight:
+        # Built before the pool forks, so every worker shares the model's preflight index.
+        mesh_preflight.model_index(model_mesh, model_digest)
+    if thin_engine == 'band' and cache is not None:
+        # Likewise the thin bands: built once per thickness here instead of once per worker.
+        for thickness_delta in sorted({job['thickness_delta'] for job in jobs if job['operation'] == 'thin_intersection'}):
+            thin_band(model_mesh, model_digest, thickness_delta, thin_offset, cache)
+    model_seconds = round(time.perf_counter() - start, 3)
+    print(f"[Batch] Model ready in {model_seconds}s. Running {len(jobs)} job(s) on {workers} worker(s)...")
+
+    settings = {'use_cache': use_cache, 'engine_mode': engine_mode, 'time_budget': time_budget, 'crop': crop, 'crop_margin': crop_margin, 'preflight': preflight, 'quality': quality,
+                'thin_offset': thin_offset, 'thin_engine': thin_engine, 'memory_budget': memory_budget, 'voxel_resolution': voxel_resolution}
+    model_arrays = (np.asarray(model_mesh.vertices), np.asarray(model_mesh.faces), model_digest)
+    results, broken = _run_batch_pool(model_file_path, jobs, workers, settings, model_arrays)
+    if broken:
+        # A native crash in one job breaks the whole pool and fails every job in flight. Retry those
+        # one at a time in their own pool, so only the job that really crashes is reported as failed.
+        print(f"[Batch] Worker pool broke. Retrying {len(broken)} unfinished job(s) one at a time...", file=sys.stderr)
+        for job in broken:
+            retry_results, retry_broken = _run_batch_pool(model_file_path, [job], 1, settings, model_arrays)
+            results.update(retry_results)
+            if retry_broken:
+                results[job['index']] = {'ok': False, 'seconds': None, 'error': "Worker process died while running this job."}
+
+    job_results = []
+    for job in jobs:
+        entry = {key: job[key] for key in ('index', 'logo', 'operation', 'thickness_delta', 'output_format', 'output')}
+        job_results.append({**entry, **results[job['index']]})
+    succeeded = sum(1 for result in job_results if result['ok'])
+    summary = {
+        'model': model_file_path,
+        'script_version': SCRIPT_VERSION,
+        'model_load_seconds': model_seconds,
+        'total_seconds': round(time.perf_counter() - start, 3),
+        'succeeded': succeeded,
+        'failed': len(job_results) - succeeded,
+        'jobs': job_results,
+    }
+    print(f"[Batch] {succeeded}/{len(job_results)} job(s) succeeded in {summary['total_seconds']}s.")
+    for result in job_results:
+        if not result['ok']:
+            print(f"[Batch] Job {result['index']} ({result['operation']}, {result['logo']}) failed: {result['error']}", file=sys.stderr)
+    return summary
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description='Perform STL boolean operations using Trimesh and PyVista.')
-    parser.add_argument('model_stl', help='Path to the input model STL file.')
-    parser.add_argument('logo_stl', help='Path to the input logo STL file.')
-    parser.add_argument('output_stl', help='Path to save the output STL file.')
-    parser.add_argument('--operation', choices=['subtraction', 'intersection', 'thin_intersection'], default='subtraction')
+    parser.add_argument('model_stl', nargs='?', help="Path to the input model STL file (optional with --batch if the manifest names the model).")
+    parser.add_argument('logo_stl', nargs='?', help='Path to the input logo STL file.')
+    parser.add_argument('output_stl', nargs='?', help='Path to save the output STL file.')
+    parser.add_argument('--operation', choices=OPERATIONS, default='subtraction')
     parser.add_argument('--thickness-delta', type=float, default=1.0)
+    parser.add_argument('--thin-offset', choices=THIN_OFFSET_MODES, default=DEFAULT_THIN_OFFSET,
+                        help="How thin_intersection offsets the model: 'z' shifts it up, 'normal' moves the surface along its normals.")
+    parser.add_argument('--thin-engine', choices=THIN_ENGINES, default='band',
+                        help="'band' intersects the logo once with the cached thin band; 'stages' runs intersection, offset and a second intersection.")
+    parser.add_argument('--output-format', choices=OUTPUT_FORMATS, default='binary', help='STL encoding of the output file.')
+    parser.add_argument('--no-cache', action='store_true', help='Do not read or write the healed mesh cache.')
+    parser.add_argument('--engine-mode', choices=ENGINE_MODES, default='sequential',
+                        help="'sequential' tries Trimesh then PyVista; 'race' runs both in parallel and keeps the first valid result.")
+    parser.add_argument('--time-budget', type=float, default=None, help='Wall-clock budget in seconds for race mode.')
+    parser.add_argument('--add-logo', action='append', default=[], metavar='LOGO_STL',
+                        help='Another logo STL to apply in the same pass (repeatable). All logos are combined into one tool.')
+    parser.add_argument('--crop', action='store_true', help="Run the boolean only on the model region around the logo's bounding box.")
+    parser.add_argument('--crop-margin', type=float, default=2.0, help='Margin in model units added around the logo bounding box when cropping.')
+    parser.add_argument('--quality', choices=QUALITY_NAMES, default=DEFAULT_QUALITY,
+                        help="'preview' simplifies the logo and cropped model region for fast feedback, 'standard' lightly simplifies the logo, 'final' keeps full resolution.")
+    parser.add_argument('--memory-budget', type=float, default=mesh_memory.DEFAULT_MEMORY_BUDGET_MB, metavar='MB',
+                        help='Peak memory budget in MB: degrade to crop, sequential engines or preview quality to stay within it, or fail early.')
+    parser.add_argument('--voxel-resolution', type=int, default=mesh_voxel.DEFAULT_VOXEL_RESOLUTION, metavar='CELLS',
+                        help='Grid cells across the model/logo overlap for the voxel engine, the last resort when the exact engines fail (0 turns it off).')
+    parser.add_argument('--no-preflight', action='store_true', help='Run the boolean even if the logo does not appear to reach into the model.')
+    parser.add_argument('--profile', action='store_true', help='Print per-stage wall/CPU time, peak RSS and mesh sizes to stderr.')
+    parser.add_argument('--report-json', default=None, help='Write the per-stage profile report as JSON to this path.')
+    parser.add_argument('--batch', default=None, metavar='MANIFEST',
+                        help='Run every job in a JSON manifest of (logo, operation, thickness_delta, output) against one model.')
+    parser.add_argument('--workers', type=int, default=DEFAULT_BATCH_WORKERS, help='Worker processes for --batch.')
+    parser.add_argument('--summary', default=None, help='Where --batch writes its JSON summary (default: <manifest>.summary.json).')
     
     args = parser.parse_args()
+
+    if args.batch:
+        try:
+            model_path, jobs = load_batch_manifest(args.batch, args.model_stl)
+        except (OSError, ValueError) as e:
+            print(f"Error: Could not read batch manifest {args.batch}: {e}", file=sys.stderr)
+            sys.exit(1)
+        summary = batch_boolean_operations(
+            model_path, jobs, workers=max(1, args.workers), use_cache=not args.no_cache, engine_mode=args.engine_mode,
+            time_budget=args.time_budget, crop=args.crop, crop_margin=args.crop_margin, preflight=not args.no_preflight,
+            quality=args.quality, thin_offset=args.thin_offset, thin_engine=args.thin_engine, memory_budget=args.memory_budget,
+            voxel_resolution=args.voxel_resolution)
+        summary_path = args.summary or f"{os.path.splitext(args.batch)[0]}.summary.json"
+        with open(summary_path, 'w', encoding='utf-8') as f:
+            json.dump(summary, f, indent=2)
+        print(f"[Batch] Summary written to {summary_path}")
+        sys.exit(0 if summary['failed'] == 0 else 1)
+    if not (args.model_stl and args.logo_stl and args.output_stl):
+        parser.error('model_stl, logo_stl and output_stl are required unless --batch is used.')
     
-    success = boolean_operation(
-        model_file_path=args.model_stl,
-        logo_file_path=args.logo_stl,
-        output_file_path=args.output_stl,
-        operation=args.operation,
-        thickness_delta=args.thickness_delta
-    )
+    with profiling('subtract_script') as report:
+        success = boolean_operation(
+            model_file_path=args.model_stl,
+            logo_file_path=[args.logo_stl, *args.add_logo] if args.add_logo else args.logo_stl,
+            output_file_path=args.output_stl,
+            operation=args.operation,
+            thickness_delta=args.thickness_delta,
+            output_format=args.output_format,
+            use_cache=not args.no_cache,
+            engine_mode=args.engine_mode,
+            time_budget=args.time_budget,
+            crop=args.crop,
+            crop_margin=args.crop_margin,
+            preflight=not args.no_preflight,
+            quality=args.quality,
+            thin_offset=args.thin_offset,
+            thin_engine=args.thin_engine,
+            memory_budget=args.memory_budget,
+            voxel_resolution=args.voxel_resolution
+        )
+        annotate(ok=bool(success))
+    if args.profile or args.report_json:
+        emit_report(report, args.profile, args.report_json)
 
     if success:
         print(f"Script finished successfully.")
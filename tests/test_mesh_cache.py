@@ -0,0 +1,53 @@
+import os
+
+import numpy as np
+import trimesh
+
+from mesh_cache import MeshCache
+
+def staging_dirs(cache_dir):
+    return [name for shard in os.scandir(cache_dir) if shard.is_dir()
+            for name in os.listdir(shard.path) if name.startswith('.staging_')]
+
+def test_stored_entry_is_published_and_read_back_from_disk(tmp_path):
+    key = MeshCache.make_key('digest', 'result')
+    MeshCache(str(tmp_path)).put_bytes(key, b'solid')
+    assert os.path.isfile(os.path.join(tmp_path, key[:2], key, 'data.bin'))
+    assert staging_dirs(tmp_path) == []
+    assert MeshCache(str(tmp_path)).get_bytes(key) == b'solid'  # A fresh instance has nothing in memory
+
+def test_entry_stored_first_by_another_worker_is_kept(tmp_path):
+    key = MeshCache.make_key('digest', 'result')
+    MeshCache(str(tmp_path)).put_bytes(key, b'first')
+    MeshCache(str(tmp_path)).put_bytes(key, b'second')
+    assert staging_dirs(tmp_path) == []
+    assert MeshCache(str(tmp_path)).get_bytes(key) == b'first'
+
+def test_disk_eviction_removes_least_recently_used_entries(tmp_path):
+    cache = MeshCache(str(tmp_path), max_bytes=250)
+    keys = [MeshCache.make_key('digest', f'variant{i}') for i in range(3)]
+    for mtime, key in zip((100, 200), keys[:2]):
+        cache.put_bytes(key, bytes(100))
+        os.utime(cache._entry_dir(key), (mtime, mtime))
+    # Reading the older entry marks it as recently used, so the other one goes first.
+    assert MeshCache(str(tmp_path)).get_bytes(keys[0]) is not None
+    cache.put_bytes(keys[2], bytes(100))
+    assert [os.path.isdir(cache._entry_dir(key)) for key in keys] == [True, False, True]
+
+def test_memory_tier_evicts_least_recently_used_entries(tmp_path):
+    cache = MeshCache(str(tmp_path), memory_max_bytes=10)
+    keys = [MeshCache.make_key('digest', f'variant{i}') for i in range(3)]
+    cache.put_bytes(keys[0], b'aaaa')
+    cache.put_bytes(keys[1], b'bbbb')
+    cache.get_bytes(keys[0])
+    cache.put_bytes(keys[2], b'cccc')
+    assert list(cache._memory) == [keys[0], keys[2]]
+
+def test_mesh_round_trip_is_stored_compact(tmp_path):
+    mesh = trimesh.creation.box(extents=[1, 2, 3])
+    key = MeshCache.make_key('digest', 'healed')
+    MeshCache(str(tmp_path)).put_mesh(key, mesh)
+    vertices, faces = MeshCache(str(tmp_path)).get_arrays(key)
+    assert vertices.dtype == np.float32 and faces.dtype == np.int32
+    loaded = MeshCache(str(tmp_path)).get_mesh(key)
+    assert np.array_equal(loaded.vertices, mesh.vertices) and np.array_equal(loaded.faces, mesh.faces)
@@ -0,0 +1,107 @@
+import os
+
+import numpy as np
+import pytest
+import trimesh
+
+import mesh_crop
+from conftest import REPO_DIR
+
+def sphere():
+    return trimesh.creation.icosphere(subdivisions=4, radius=10)
+
+def box(extents, center):
+    mesh = trimesh.creation.box(extents=extents)
+    mesh.apply_translation(center)
+    return mesh
+
+BOUNDS = np.array([[-3.0, -2.5, 6.0], [2.5, 3.0, 12.0]])
+
+def area(vertices, faces):
+    corners = vertices[faces]
+    return 0.5 * np.linalg.norm(np.cross(corners[:, 1] - corners[:, 0], corners[:, 2] - corners[:, 0]), axis=1).sum()
+
+def test_plane_split_shares_seam_vertices_and_keeps_the_surface():
+    model = sphere()
+    vertices, below, above = mesh_crop.split_by_plane(model.vertices, model.faces, 2, 1.3)
+    assert np.all(vertices[below][:, :, 2] <= 1.3) and np.all(vertices[above][:, :, 2] >= 1.3)
+    assert area(vertices, np.concatenate([below, above])) == pytest.approx(model.area)
+    assert len(np.intersect1d(np.unique(below), np.unique(above))) > 0
+
+def test_box_split_leaves_no_face_across_the_box_and_no_t_junctions():
+    model = sphere()
+    vertices, inner, outer = mesh_crop.split_by_box(model.vertices, model.faces, BOUNDS)
+    corners = vertices[inner]
+    assert np.all(corners >= BOUNDS[0] - 1e-9) and np.all(corners <= BOUNDS[1] + 1e-9)
+    assert np.all(np.any((vertices[outer].min(axis=1) >= BOUNDS[1] - 1e-9) | (vertices[outer].max(axis=1) <= BOUNDS[0] + 1e-9), axis=1))
+    merged = trimesh.Trimesh(vertices, np.concatenate([inner, outer]), process=False)
+    assert merged.is_watertight and merged.area == pytest.approx(model.area)
+
+def test_clipped_region_is_a_closed_solid():
+    model = box([4, 4, 4], [0, 0, 0])
+    region = mesh_crop.clip_to_box(model, np.array([[-1.0, -1.0, -1.0], [3.0, 3.0, 3.0]]))
+    assert region.is_watertight and region.volume == pytest.approx(27.0)
+
+def test_region_result_is_stitched_back_watertight():
+    model = sphere()
+    # An identity "boolean" puts the clipped region back: the stitched model must be the original solid.
+    result, engine = mesh_crop.cropped_boolean(model, box([1, 1, 1], [0, 0, 10]), 'difference', BOUNDS,
+                                               lambda region, tool, operation: (region, 'identity'))
+    assert engine == 'identity' and result.is_watertight and result.is_winding_consistent
+    assert result.volume == pytest.approx(model.volume)
+
+def test_unmatched_seam_is_reported():
+    model = sphere()
+    shifted = mesh_crop.clip_to_box(model, BOUNDS)
+    shifted.apply_translation([0.5, 0, 0])
+    with pytest.raises(mesh_crop.CropError):
+        mesh_crop.stitch_into_model(model, shifted, BOUNDS)
+
+def test_crop_is_skipped_when_the_region_holds_most_of_the_model():
+    model = sphere()
+    assert mesh_crop.crop_bounds(model, box([1, 1, 1], [0, 0, 10]), 1.0) is not None
+    assert mesh_crop.crop_bounds(model, box([18, 18, 18], [0, 0, 0]), 1.0) is None
+    assert mesh_crop.crop_bounds(model, box([1, 1, 1], [0, 0, 30]), 1.0) is None
+
+@pytest.fixture(scope='module')
+def squash_with_star(tmp_path_factory):
+    """squash.STL with a 64-point star logo on its top. At the default margin the clip leaves the
+    region open (slivers along a box edge), so the crop must fall back to the full model."""
+    pytest.importorskip('pyvista')
+    import mesh_benchmark
+    from stl_io import export_stl_mesh, load_stl_mesh
+    model_path = os.path.join(REPO_DIR, 'models', 'squash.STL')
+    model = load_stl_mesh(model_path)
+    logo = mesh_benchmark.extrude_loops(mesh_benchmark.star_loops(64), 1.0)
+    logo.apply_scale([1, -1, 1])
+    logo = mesh_benchmark.place_logo(logo, model)
+    logo_path = str(tmp_path_factory.mktemp('logo') / 'star.stl')
+    export_stl_mesh(logo, logo_path, 'binary')
+    return model, logo, model_path, logo_path
+
+def test_open_crop_region_is_rejected(squash_with_star):
+    model, logo, _, _ = squash_with_star
+    bounds = mesh_crop.crop_bounds(model, logo, 2.0)
+    with pytest.raises(mesh_crop.CropError, match="not closed"):
+        mesh_crop.cropped_boolean(model, logo, 'difference', bounds, lambda region, tool, operation: (region, 'identity'))
+
+@pytest.mark.parametrize('margin', [1.0, 2.0])  # At 1.0 the region is closed but the boolean on it is not
+@pytest.mark.parametrize('operation', ['intersection', 'difference'])
+def test_cropped_boolean_matches_the_full_model(squash_with_star, operation, margin):
+    import subtract_script
+    model, logo, _, _ = squash_with_star
+    cropped, _ = subtract_script.run_cropped_boolean(model, logo, operation, margin)
+    full, _ = subtract_script.run_boolean_engines(model, logo, operation)
+    assert cropped.is_watertight and full.is_watertight
+    assert cropped.volume == pytest.approx(full.volume, rel=0.005)
+
+def test_cropped_thin_intersection_matches_the_full_model(squash_with_star, tmp_path):
+    import subtract_script
+    from stl_io import load_stl_mesh
+    _, _, model_path, logo_path = squash_with_star
+    volumes = []
+    for crop in (True, False):
+        output = str(tmp_path / f'thin_{crop}.stl')
+        assert subtract_script.boolean_operation(model_path, logo_path, output, 'thin_intersection', use_cache=False, crop=crop)
+        volumes.append(load_stl_mesh(output).volume)
+    assert volumes[0] == pytest.approx(volumes[1], rel=0.005)
@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+import trimesh
+
+import subtract_script
+from mesh_diagnostics import diagnose, diagnose_mesh
+
+def box(extents, center):
+    mesh = trimesh.creation.box(extents=extents)
+    mesh.apply_translation(center)
+    return mesh
+
+def test_closed_box_is_clean():
+    report = diagnose_mesh(box([2, 2, 2], [0, 0, 0]))
+    assert report.is_clean and report.components == 1 and report.to_dict()['clean']
+    assert report.boundary_edges == report.non_manifold_edges == report.inconsistent_winding_edges == 0
+
+def test_flipped_face_is_an_inconsistent_winding():
+    mesh = box([2, 2, 2], [0, 0, 0])
+    faces = mesh.faces.copy()
+    faces[0] = faces[0][::-1]
+    report = diagnose(mesh.vertices, faces)
+    assert not report.is_clean and report.boundary_edges == 0
+    assert report.inconsistent_winding_edges == 3 and report.inverted_components == 0
+
+def test_inside_out_shell_is_inverted():
+    mesh = box([2, 2, 2], [0, 0, 0])
+    report = diagnose(mesh.vertices, mesh.faces[:, ::-1])
+    assert not report.is_clean and report.inconsistent_winding_edges == 0
+    assert report.inverted_components == 1 and report.defective_components == 1
+
+def test_open_box_has_one_boundary_loop():
+    mesh = box([2, 2, 2], [0, 0, 0])
+    report = diagnose(mesh.vertices, mesh.faces[1:])
+    assert not report.is_clean and report.boundary_edges == 3 and report.boundary_loops == 1
+    assert report.inverted_components == 0
+
+def two_boxes_one_open():
+    """A closed box and, apart from it, a box with one face missing (faces 12 onwards)."""
+    clean, open_box = box([2, 2, 2], [0, 0, 0]), box([2, 2, 2], [5, 0, 0])
+    return trimesh.Trimesh(np.vstack([clean.vertices, open_box.vertices]),
+                           np.vstack([clean.faces, open_box.faces[1:] + len(clean.vertices)]), process=False)
+
+def test_only_the_open_component_is_marked_defective():
+    report = diagnose_mesh(two_boxes_one_open())
+    assert report.components == 2 and report.defective_components == 1
+    assert not report.defective_faces[:12].any() and report.defective_faces[12:].all()
+
+def test_heal_repairs_only_the_defective_components(monkeypatch):
+    repaired = []
+
+    def repair(component):
+        repaired.append(component)
+        return box([2, 2, 2], component.bounds.mean(axis=0))
+    monkeypatch.setattr(subtract_script, 'repair_with_meshfix', repair)
+
+    mesh = two_boxes_one_open()
+    healed = subtract_script.heal_mesh(mesh, "two_boxes")
+    assert len(repaired) == 1 and len(repaired[0].faces) == 11
+    assert healed.is_watertight and healed.volume == pytest.approx(16.0)
+    # The clean box is carried over as it was.
+    assert np.array_equal(healed.vertices[healed.faces[:12]], mesh.vertices[mesh.faces[:12]])
+    assert subtract_script.heal_mesh(healed, "healed") is healed and len(repaired) == 1
@@ -0,0 +1,86 @@
+import multiprocessing
+import queue
+import time
+
+import pytest
+
+import mesh_jobs
+
+pytestmark = pytest.mark.skipif('fork' not in multiprocessing.get_all_start_methods(),
+                                reason="the test jobs are plain functions of this module")
+
+def execute(op, args, profile):
+    time.sleep(args.get('sleep', 0.0))
+    return True, op, '', None, None
+
+class Runner:
+    """A JobRunner on forked workers whose events are collected in a queue."""
+
+    def __init__(self, workers=1, **options):
+        self.events = queue.Queue()
+        self.runner = mesh_jobs.JobRunner(workers, execute, self.events.put, multiprocessing.get_context('fork'), **options)
+        self.runner.start()
+
+    def run(self, jobs, cancel=(), timeout=10.0):
+        """Submits the first of the (job_id, args) pairs and, once it has started, the others;
+        then cancels the given ids. Returns every event until all jobs are answered."""
+        self.runner.submit(jobs[0][0], 'test', jobs[0][1])
+        events, pending = [], {job_id for job_id, _ in jobs}
+        deadline = time.monotonic() + timeout
+        while pending:
+            event = self.events.get(timeout=max(deadline - time.monotonic(), 0.01))
+            events.append(event)
+            if event.get('event') == 'started' and event['id'] == jobs[0][0]:
+                for job_id, args in jobs[1:]:
+                    self.runner.submit(job_id, 'test', args)
+                for job_id in cancel:
+                    self.runner.cancel(job_id)
+            if 'ok' in event:
+                pending.discard(event['id'])
+        return events
+
+    def close(self):
+        self.runner.close()
+
+@pytest.fixture
+def runner():
+    runners = []
+
+    def make(**options):
+        runners.append(Runner(**options))
+        return runners[-1]
+    yield make
+    for r in runners:
+        r.close()
+
+def started(events):
+    return [event['id'] for event in events if event.get('event') == 'started']
+
+def test_preview_jobs_start_before_queued_final_jobs(runner):
+    events = runner().run([('busy', {'sleep': 0.3}), ('final1', {}), ('final2', {}), ('preview', {'quality': 'preview'})])
+    assert started(events) == ['busy', 'preview', 'final1', 'final2']
+    queued = {event['id']: event for event in events if event.get('event') == 'queued'}
+    assert queued['preview']['priority'] == 'high' and queued['final2']['priority'] == 'normal'
+
+def test_cancelled_queued_job_never_starts(runner):
+    events = runner().run([('busy', {'sleep': 0.3}), ('queued', {})], cancel=['queued'])
+    results = {event['id']: event for event in events if 'ok' in event}
+    assert results['queued']['cancelled'] and results['busy']['ok']
+    assert started(events) == ['busy']
+
+def test_cancelled_running_job_is_stopped_and_its_worker_replaced(runner):
+    r = runner()
+    first_worker = r.runner._workers[0].process
+    start = time.monotonic()
+    events = r.run([('long', {'sleep': 30}), ('next', {})], cancel=['long'])
+    results = {event['id']: event for event in events if 'ok' in event}
+    assert results['long']['cancelled'] and results['next']['ok']
+    assert time.monotonic() - start < 10 and not first_worker.is_alive()
+    assert r.runner._workers[0].process is not first_worker
+
+def test_job_waits_until_running_jobs_leave_it_enough_memory(runner):
+    r = runner(workers=2, memory_limit_mb=100, estimate=lambda op, args: args['mb'])
+    events = r.run([('first', {'mb': 90, 'sleep': 0.2}), ('second', {'mb': 90})])
+    order = [(event['id'], 'started' if event.get('event') == 'started' else 'done')
+             for event in events if event.get('event') == 'started' or 'ok' in event]
+    assert order == [('first', 'started'), ('first', 'done'), ('second', 'started'), ('second', 'done')]
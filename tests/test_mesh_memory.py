@@ -0,0 +1,54 @@
+import pytest
+import trimesh
+
+import mesh_memory
+from stl_io import export_stl_mesh
+
+@pytest.fixture
+def stl_files(tmp_path):
+    paths = {}
+    for name, subdivisions, output_format in (('model', 4, 'binary'), ('logo', 2, 'binary'), ('ascii', 2, 'ascii')):
+        paths[name] = str(tmp_path / f'{name}.stl')
+        export_stl_mesh(trimesh.creation.icosphere(subdivisions=subdivisions), paths[name], output_format)
+    return paths
+
+def test_face_counts_are_read_from_binary_and_estimated_for_ascii(stl_files):
+    assert mesh_memory.stl_face_count(stl_files['model']) == 5120
+    assert mesh_memory.stl_face_count(stl_files['ascii']) == pytest.approx(320, rel=0.2)
+
+def test_job_estimate_grows_with_the_engines_and_is_capped_by_the_budget(stl_files):
+    args = {'model_file_path': stl_files['model'], 'logo_file_path': [stl_files['logo'], stl_files['logo']]}
+    sequential = mesh_memory.estimate_job_mb('boolean', args)
+    single_logo = mesh_memory.estimate_job_mb('boolean', {**args, 'logo_file_path': stl_files['logo']})
+    race = mesh_memory.estimate_job_mb('boolean', {**args, 'engine_mode': 'race'})
+    assert 0 < single_logo < sequential < race
+    assert mesh_memory.estimate_job_mb('boolean', {**args, 'memory_budget': sequential / 2}) == sequential / 2
+    repair = mesh_memory.estimate_job_mb('repair', {'input_file': stl_files['model']})
+    subtract = mesh_memory.estimate_job_mb('subtract', {'model_file': stl_files['model'], 'tool_file': stl_files['logo']})
+    assert 0 < repair < subtract
+
+def test_job_estimate_is_zero_for_unreadable_inputs_and_unknown_jobs(tmp_path, stl_files):
+    missing = {'model_file_path': str(tmp_path / 'missing.stl'), 'logo_file_path': stl_files['logo']}
+    assert mesh_memory.estimate_job_mb('boolean', missing) == 0.0
+    assert mesh_memory.estimate_job_mb('boolean', {}) == 0.0
+    assert mesh_memory.estimate_job_mb('other', {'input_file': stl_files['model']}) == 0.0
+
+def peak_of(crop=False, engine_mode='race', quality='final'):
+    return (300 if crop else 500) * (2 if engine_mode == 'race' else 1) * (0.5 if quality == 'preview' else 1)
+
+STEPS = [('crop', {'crop': True}), ('sequential', {'engine_mode': 'sequential'}), ('preview', {'quality': 'preview'})]
+
+@pytest.mark.parametrize('budget, taken, peak', [
+    (1100, [], 1100),
+    (700, ['crop'], 700),
+    (500, ['crop', 'sequential'], 400),
+    (250, ['crop', 'sequential', 'preview'], 250),
+])
+def test_budget_plan_degrades_in_order_only_as_far_as_needed(budget, taken, peak):
+    settings, steps, estimated = mesh_memory.plan_budget(budget, peak_of, STEPS, baseline_mb=100)
+    assert steps == taken and estimated == peak
+    assert settings == {key: value for name, step in STEPS if name in taken for key, value in step.items()}
+
+def test_budget_plan_fails_when_nothing_fits():
+    with pytest.raises(mesh_memory.MemoryBudgetError, match="crop, sequential, preview"):
+        mesh_memory.plan_budget(200, peak_of, STEPS, baseline_mb=100)
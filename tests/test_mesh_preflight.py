@@ -0,0 +1,44 @@
+import os
+
+import pytest
+import trimesh
+
+import mesh_preflight
+from conftest import REPO_DIR
+from stl_io import load_stl_mesh
+
+def box(extents, center):
+    mesh = trimesh.creation.box(extents=extents)
+    mesh.apply_translation(center)
+    return mesh
+
+def index_of(mesh):
+    return mesh_preflight.ModelIndex(mesh.vertices, mesh.faces)
+
+def test_box_reaching_into_squash_model_is_accepted():
+    # Every logo sample misses the model (closest gap 0.154), but part of the model lies inside the box.
+    model = load_stl_mesh(os.path.join(REPO_DIR, 'models', 'squash.STL'))
+    report = mesh_preflight.check_overlap(index_of(model), box([15.8, 15.1, 35], [90.8, 29.3, 5.4]), 'intersection')
+    assert report['model_reaches_logo']
+    assert report['gap'] == 0.0
+
+def test_surfaces_crossing_without_contained_vertices_are_accepted():
+    plate = box([100, 100, 0.01], [0, 0, 0])
+    logo = box([4, 4, 2], [0, 0, 0.37])
+    distance, inside = index_of(plate).query(mesh_preflight.logo_samples(logo)[0])
+    assert not inside.any()
+    assert mesh_preflight.check_overlap(index_of(plate), logo, 'subtraction')['model_reaches_logo']
+
+def test_logo_in_a_gap_of_the_model_is_rejected():
+    model = trimesh.util.concatenate([box([10, 10, 10], [0, 0, 0]), box([10, 10, 10], [30, 0, 0])])
+    with pytest.raises(mesh_preflight.PreflightError, match="does not touch"):
+        mesh_preflight.check_overlap(index_of(model), box([4, 4, 4], [15, 0, 0]), 'subtraction')
+
+def test_logo_outside_the_bounding_box_is_rejected():
+    with pytest.raises(mesh_preflight.PreflightError, match="bounding box"):
+        mesh_preflight.check_overlap(index_of(box([10, 10, 10], [0, 0, 0])), box([2, 2, 2], [20, 0, 0]), 'subtraction')
+
+def test_logo_inside_the_model_overlaps_completely():
+    report = mesh_preflight.check_overlap(index_of(box([10, 10, 10], [0, 0, 0])), box([2, 2, 2], [0, 0, 0]), 'intersection')
+    assert report['overlap_fraction'] == pytest.approx(1.0)
+    assert not report['model_reaches_logo']
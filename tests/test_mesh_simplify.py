@@ -0,0 +1,65 @@
+import numpy as np
+import pytest
+import trimesh
+
+import mesh_crop
+from mesh_diagnostics import diagnose_mesh
+from mesh_simplify import QUALITY_TIERS, deviation, simplify_mesh, simplify_open_surface
+
+pytest.importorskip('vtkmodules')
+
+def round_logo():
+    """A flat round logo: a 400-point circle of radius 10 extruded to a height of 1."""
+    pytest.importorskip('pyvista')
+    from mesh_benchmark import extrude_loops
+    angles = np.linspace(0.0, 2 * np.pi, 400, endpoint=False)
+    return extrude_loops([10 * np.column_stack([np.cos(angles), np.sin(angles)])], 1.0)
+
+@pytest.mark.parametrize('quality', [name for name, tier in QUALITY_TIERS.items() if tier['logo_tolerance'] is not None])
+def test_simplified_logo_stays_within_the_tier_tolerance_and_clean(quality):
+    logo = round_logo()
+    tolerance = QUALITY_TIERS[quality]['logo_tolerance']
+    simplified = simplify_mesh(logo, tolerance)
+    assert len(simplified.faces) < len(logo.faces)
+    assert diagnose_mesh(simplified).is_clean
+    assert deviation(logo.vertices, logo.faces, simplified.vertices, simplified.faces) <= tolerance
+
+def test_final_tier_leaves_the_logo_alone():
+    logo = round_logo()
+    assert simplify_mesh(logo, QUALITY_TIERS['final']['logo_tolerance']) is logo
+
+def triangles(vertices, faces):
+    """The faces as a set of corner-coordinate tuples (independent of vertex numbering and of
+    which corner comes first)."""
+    return {tuple(sorted(map(tuple, corners))) for corners in np.round(np.asarray(vertices)[faces], 9)}
+
+def test_preview_region_keeps_the_seam_band_and_stitches_back():
+    model = trimesh.creation.icosphere(subdivisions=5, radius=10)
+    bounds = np.array([[-4.0, -4.0, 5.0], [4.0, 4.0, 12.0]])
+    regions = []
+
+    def identity(region, tool, operation):
+        regions.append(region)
+        return region, 'identity'
+    tool = trimesh.creation.box([1, 1, 1])
+    mesh_crop.cropped_boolean(model, tool, 'difference', bounds, identity)
+    result, _ = mesh_crop.cropped_boolean(model, tool, 'difference', bounds, identity,
+                                          region_tolerance=QUALITY_TIERS['preview']['region_tolerance'])
+
+    full_region, region = regions
+    assert len(region.faces) < len(full_region.faces)
+    vertices, inner, outer = mesh_crop.split_by_box(model.vertices, model.faces, bounds)
+    seam_band = inner[np.isin(inner, np.intersect1d(inner, outer)).any(axis=1)]
+    assert triangles(vertices, seam_band) <= triangles(region.vertices, region.faces)
+    assert result.is_watertight and result.volume == pytest.approx(model.volume, rel=1e-3)
+
+def test_open_surface_simplification_keeps_the_boundary_and_honours_accept():
+    model = trimesh.creation.icosphere(subdivisions=4, radius=10)
+    cap = model.faces[model.triangles_center[:, 2] > 5.0]
+    simplified = simplify_open_surface(model.vertices, cap, 0.05)
+    assert len(simplified) < len(cap)
+
+    def boundary_vertices(faces):
+        return np.unique(trimesh.Trimesh(model.vertices, faces, process=False).outline().vertex_nodes)
+    assert np.array_equal(boundary_vertices(simplified), boundary_vertices(cap))
+    assert np.array_equal(simplify_open_surface(model.vertices, cap, 0.05, accept=lambda faces: False), cap)
@@ -0,0 +1,64 @@
+import numpy as np
+import pytest
+import trimesh
+from scipy.spatial import cKDTree
+
+import mesh_crop
+import mesh_voxel
+
+def box(extents, center):
+    mesh = trimesh.creation.box(extents=extents)
+    mesh.apply_translation(center)
+    return mesh
+
+def test_grid_is_empty_for_an_intersection_of_disjoint_boxes():
+    assert mesh_voxel.voxel_grid([[0, 0, 0], [1, 1, 1]], [[2, 2, 2], [3, 3, 3]], 'intersection', 16) is None
+
+def test_grid_pitch_follows_the_overlap_and_covers_the_region():
+    model, tool = np.array([[0, 0, 0], [10, 4, 2]]), np.array([[8, 1, 1], [12, 3, 3]])
+    origin, pitch, shape = mesh_voxel.voxel_grid(model, tool, 'difference', 20)
+    assert pitch == pytest.approx(0.1)  # Longest overlap side (2) over the resolution
+    assert np.all(origin < model[0]) and np.all(origin + (np.array(shape) - 1) * pitch > model[1])
+    origin, pitch, shape = mesh_voxel.voxel_grid(model, tool, 'intersection', 20)
+    assert np.all(origin + (np.array(shape) - 1) * pitch < [12, 4, 3])  # Only the overlap
+
+def test_grid_is_coarsened_to_the_cell_cap():
+    origin, pitch, shape = mesh_voxel.voxel_grid([[0, 0, 0], [1, 1, 1]], [[0, 0, 0], [1, 1, 1]], 'union', 400, max_cells=10_000)
+    assert np.prod(shape) <= 10_000 and pitch > 1 / 400
+
+def test_unknown_operation_is_rejected():
+    with pytest.raises(ValueError):
+        mesh_voxel.voxel_grid([[0, 0, 0], [1, 1, 1]], [[0, 0, 0], [1, 1, 1]], 'xor', 16)
+
+@pytest.mark.parametrize('operation, volume', [('difference', 8 - 2), ('intersection', 2), ('union', 8 + 4 - 2)])
+def test_box_boolean_volumes(operation, volume):
+    a, b = box([2, 2, 2], [0, 0, 0]), box([1, 1, 4], [0.5, 0.5, 0])
+    vertices, faces, pitch = mesh_voxel.voxel_boolean(a.vertices, a.faces, b.vertices, b.faces, operation, 32, workers=1)
+    result = trimesh.Trimesh(vertices, faces)
+    assert result.is_watertight and result.volume > 0
+    assert result.volume == pytest.approx(volume, rel=0.02)
+
+def test_result_does_not_depend_on_the_worker_count():
+    a, b = box([2, 2, 2], [0, 0, 0]), box([1, 1, 4], [0.5, 0.5, 0])
+    single = mesh_voxel.voxel_boolean(a.vertices, a.faces, b.vertices, b.faces, 'difference', 24, workers=1)
+    pooled = mesh_voxel.voxel_boolean(a.vertices, a.faces, b.vertices, b.faces, 'difference', 24, workers=2)
+    assert np.array_equal(single[0], pooled[0]) and np.array_equal(single[1], pooled[1])
+
+def test_local_voxel_difference_is_bridged_into_the_exact_model():
+    model = trimesh.creation.icosphere(subdivisions=4, radius=10)
+    tool = box([3, 3, 3], [0, 0, 10])
+
+    def run_voxel(region, tool_mesh, operation):
+        vertices, faces, _ = mesh_voxel.voxel_boolean(region.vertices, region.faces, tool_mesh.vertices, tool_mesh.faces, operation, 32, workers=1)
+        return trimesh.Trimesh(vertices, faces, process=False), 'voxel'
+
+    bounds = np.array(tool.bounds) + [[-0.5] * 3, [0.5] * 3]
+    result, engine = mesh_crop.bridged_boolean(model, tool, 'difference', bounds, 0.5, run_voxel)
+    assert engine == 'voxel' and result.is_watertight and result.is_winding_consistent
+    # Away from the box the surface is the model's own (split along the box planes, not re-meshed).
+    split_vertices = mesh_crop.split_by_box(model.vertices, model.faces, bounds)[0]
+    outside = ~np.all((result.vertices >= bounds[0]) & (result.vertices <= bounds[1]), axis=1)
+    distance, _ = cKDTree(split_vertices).query(result.vertices[outside])
+    assert outside.sum() >= len(model.vertices) // 2 and distance.max() == 0.0
+    # About half the tool lies inside the sphere.
+    assert model.volume - 0.7 * tool.volume < result.volume < model.volume - 0.3 * tool.volume
@@ -0,0 +1,73 @@
+import numpy as np
+import pytest
+import trimesh
+
+import stl_io
+
+def triangles_of(vertices, faces):
+    return np.asarray(vertices)[np.asarray(faces)]
+
+@pytest.fixture
+def mesh():
+    # Coordinates exact in float32, so binary and ASCII files hold them without rounding.
+    mesh = trimesh.creation.icosphere(subdivisions=2)
+    mesh.vertices = np.round(mesh.vertices * 64) / 64
+    return mesh
+
+def test_merge_keeps_first_use_order_and_merges_signed_zeros():
+    triangles = np.array([[[0, 0, 0], [1, 0, 0], [0, 1, 0]],
+                          [[1, 0, 0], [-0.0, 0, 0], [0, 0, 1]]], dtype=np.float32)
+    vertices, faces = stl_io.merge_triangle_vertices(triangles)
+    assert vertices.tolist() == [[0, 0, 0], [1, 0, 0], [0, 1, 0], [0, 0, 1]]
+    assert faces.tolist() == [[0, 1, 2], [1, 0, 3]]
+
+def test_merge_drops_triangles_with_non_finite_coordinates():
+    triangles = np.array([[[0, 0, 0], [1, 0, 0], [0, 1, 0]],
+                          [[np.nan, 0, 0], [1, 0, 0], [0, 0, 1]]])
+    vertices, faces = stl_io.merge_triangle_vertices(triangles)
+    assert len(vertices) == 3 and faces.tolist() == [[0, 1, 2]]
+
+def test_hash_collisions_fall_back_to_an_exact_merge(monkeypatch, mesh):
+    triangles = triangles_of(mesh.vertices, mesh.faces).astype(np.float32)
+    expected = stl_io.merge_triangle_vertices(triangles, chunk_faces=64)
+    # Every corner gets the same key, so the hashed merge would collapse the mesh to one vertex.
+    monkeypatch.setattr(stl_io, '_mix64', lambda values: np.zeros_like(values))
+    vertices, faces = stl_io.merge_triangle_vertices(triangles, chunk_faces=64)
+    assert np.array_equal(vertices, expected[0]) and np.array_equal(faces, expected[1])
+    assert len(vertices) == len(mesh.vertices)
+
+def test_binary_round_trip(tmp_path, mesh):
+    path = str(tmp_path / 'mesh.stl')
+    stl_io.write_binary_stl(mesh.vertices, mesh.faces, path, chunk_faces=100)
+    assert stl_io.is_binary_stl(path)
+    records = np.fromfile(path, dtype=stl_io.STL_RECORD_DTYPE, offset=stl_io.STL_HEADER_SIZE + stl_io.STL_COUNT_SIZE)
+    assert np.allclose(records['normal'], mesh.face_normals, atol=1e-6)
+    vertices, faces = stl_io.read_stl_arrays(path)
+    assert len(vertices) == len(mesh.vertices)
+    assert np.array_equal(triangles_of(vertices, faces), triangles_of(mesh.vertices, mesh.faces))
+
+def test_binary_file_with_solid_header_is_detected_as_binary(tmp_path, mesh):
+    path = tmp_path / 'mesh.stl'
+    stl_io.write_binary_stl(mesh.vertices, mesh.faces, str(path))
+    data = bytearray(path.read_bytes())
+    data[:5] = b'solid'
+    path.write_bytes(bytes(data))
+    assert stl_io.is_binary_stl(str(path))
+    assert len(stl_io.read_stl_arrays(str(path))[1]) == len(mesh.faces)
+
+def test_ascii_round_trip_across_chunks(tmp_path, mesh):
+    path = str(tmp_path / 'mesh.stl')
+    stl_io.export_stl_mesh(mesh, path, 'ascii')
+    assert not stl_io.is_binary_stl(path)
+    triangles = stl_io.read_ascii_stl_triangles(path, chunk_bytes=1000)
+    assert np.array_equal(triangles, stl_io.read_ascii_stl_triangles(path))
+    vertices, faces = stl_io.merge_triangle_vertices(triangles)
+    assert len(vertices) == len(mesh.vertices)
+    assert np.array_equal(triangles_of(vertices, faces), triangles_of(mesh.vertices, mesh.faces))
+
+def test_malformed_ascii_vertex_line_is_rejected(tmp_path):
+    path = tmp_path / 'bad.stl'
+    path.write_text("solid bad\nfacet normal 0 0 1\nouter loop\nvertex 0 0\nvertex 1 0 0\nvertex 0 1 0\n"
+                    "endloop\nendfacet\nendsolid bad\n")
+    with pytest.raises(ValueError):
+        stl_io.read_ascii_stl_triangles(str(path))
@@ -0,0 +1,64 @@
+import pytest
+import trimesh
+
+import subtract_script
+from mesh_cache import MeshCache, file_digest
+from stl_io import export_stl_mesh, load_stl_mesh
+
+pytest.importorskip('pyvista')
+
+def box(extents, center):
+    mesh = trimesh.creation.box(extents=extents)
+    mesh.apply_translation(center)
+    return mesh
+
+@pytest.fixture
+def job(tmp_path, monkeypatch):
+    """A sphere model with a box logo through its whole height, and a fresh cache."""
+    cache = MeshCache(str(tmp_path / 'cache'))
+    monkeypatch.setattr(subtract_script, 'get_default_cache', lambda: cache)
+    monkeypatch.setattr(subtract_script, '_failed_thin_bands', set())
+    paths = {'model': str(tmp_path / 'model.stl'), 'logo': str(tmp_path / 'logo.stl')}
+    export_stl_mesh(trimesh.creation.icosphere(subdivisions=4, radius=10), paths['model'], 'binary')
+    export_stl_mesh(box([4, 4, 24], [0, 0, 0]), paths['logo'], 'binary')
+
+    def run(name, **options):
+        output = str(tmp_path / f'{name}.stl')
+        assert subtract_script.boolean_operation(paths['model'], paths['logo'], output, 'thin_intersection', 1.0, **options)
+        return load_stl_mesh(output)
+    run.cache, run.paths = cache, paths
+    return run
+
+@pytest.mark.parametrize('thin_offset', ['z', 'normal'])
+def test_band_matches_the_staged_thin_intersection(job, thin_offset):
+    band = job('band', thin_offset=thin_offset)
+    stages = job('stages', thin_offset=thin_offset, thin_engine='stages')
+    assert job.cache.get_mesh(job.cache.make_key(file_digest(job.paths['model']), f"thin_band_{thin_offset}_1.0")) is not None
+    assert band.is_watertight and stages.is_watertight
+    assert band.volume == pytest.approx(stages.volume, rel=1e-3)
+
+def test_failed_band_falls_back_to_the_stages_and_is_not_retried(job, monkeypatch):
+    run_boolean_engines = subtract_script.run_boolean_engines
+    band_attempts = []
+
+    def failing_band(mesh_a, mesh_b, operation, engine_mode='sequential', deadline=None, log_prefix="[Fallback]", voxel_resolution=None):
+        if log_prefix == "[Thin Band]":
+            band_attempts.append(engine_mode)
+            return None, None
+        return run_boolean_engines(mesh_a, mesh_b, operation, engine_mode, deadline, log_prefix, voxel_resolution)
+    monkeypatch.setattr(subtract_script, 'run_boolean_engines', failing_band)
+
+    result = job('band')
+    assert len(band_attempts) == subtract_script.THIN_BAND_ATTEMPTS
+    assert subtract_script._failed_thin_bands == {(file_digest(job.paths['model']), "thin_band_z_1.0")}
+    stages = job('stages', thin_engine='stages')
+    assert result.is_watertight and result.volume == pytest.approx(stages.volume, rel=1e-3)
+    # The model is remembered as failing, so the next job goes straight to the stages.
+    job('band_again')
+    assert len(band_attempts) == subtract_script.THIN_BAND_ATTEMPTS
+
+def test_cropped_band_matches_the_full_staged_thin_intersection(job):
+    cropped = job('cropped_band', crop=True)
+    full = job('full_stages', thin_engine='stages')
+    assert cropped.is_watertight
+    assert cropped.volume == pytest.approx(full.volume, rel=1e-3)